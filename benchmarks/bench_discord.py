@@ -0,0 +1,79 @@
+"""
+Benchmark — Discord delivery against the stand-in webhooks, no network needed.
+
+    python -m benchmarks.bench_discord --webhooks 6 --embeds 40 --desc-chars 1500
+    python -m benchmarks.bench_discord --webhook-limit 2 --burst-every 15 --burst-len 2
+
+Every webhook gets `--embeds` synthetic embeds (long descriptions force
+splitting). Checks that every webhook received all of its text, in order,
+with no payload rejected, and reports messages/sec and 429s.
+"""
+import io
+import sys
+import time
+import random
+import argparse
+import contextlib
+
+from benchmarks.replay import add_scenario_args, scenario_from_args, start_server, webhook_url
+from benchmarks.synthetic import FILLER
+
+
+def synthetic_embeds(rng: random.Random, count: int, desc_chars: int) -> list[dict]:
+    embeds = []
+    for i in range(count):
+        lines, size = [], 0
+        while size < desc_chars:
+            line = f"**{len(lines) + 1}.** " + " ".join(rng.choices(FILLER, k=rng.randint(4, 12)))
+            lines.append(line)
+            size += len(line) + 2
+        embeds.append({'title': f"Section {i + 1}", 'description': "\n\n".join(lines), 'color': 0x5865F2})
+    return embeds
+
+
+def received_text(payloads: list[dict]) -> str:
+    return "\n\n".join(e['description'] for p in payloads for e in p['embeds'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--webhooks", type=int, default=4)
+    parser.add_argument("--embeds", type=int, default=30, help="embeds per webhook")
+    parser.add_argument("--desc-chars", type=int, default=1200, help="description size per embed")
+    parser.add_argument("--verbose", action="store_true", help="show retry messages")
+    add_scenario_args(parser)
+    args = parser.parse_args()
+
+    scenario = scenario_from_args(args)
+    server = start_server(scenario)
+    from src.analysis.discord_delivery import deliver
+
+    rng = random.Random(args.seed)
+    routes = {webhook_url(server, f"w{i}"): synthetic_embeds(rng, args.embeds, args.desc_chars)
+              for i in range(args.webhooks)}
+
+    out = sys.stdout if args.verbose else io.StringIO()
+    with contextlib.redirect_stdout(out):
+        started = time.perf_counter()
+        results = deliver(routes)
+        elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    ok = True
+    for i, (url, embeds) in enumerate(routes.items()):
+        got = scenario.webhooks.get(f"w{i}", [])
+        expected = "\n\n".join(e['description'] for e in embeds)
+        same = received_text(got).replace("\n", "") == expected.replace("\n", "")
+        ok &= same and results[url]['sent'] == results[url]['messages']
+        print(f"  w{i}: {results[url]['sent']}/{results[url]['messages']} messages, "
+              f"contenu {'intact' if same else 'DIFFÉRENT'}")
+
+    sent = sum(r['sent'] for r in results.values())
+    print(f"\n📨 {sent} messages en {elapsed:.2f}s ({sent / elapsed:.1f} msg/s), "
+          f"{scenario.throttled} réponses 429, {scenario.rejected} rejets")
+    if not ok or scenario.rejected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark — end-to-end ingestion (fetch, parse, classify, score, write)
+against the local stand-in, no network needed.
+
+    python -m benchmarks.bench_ingest --posts 100 --latency-ms 80 --burst-every 40 --burst-len 3
+    python -m benchmarks.bench_ingest --captures captures/ --collectors reddit,google --runs 5
+
+Each collector runs its normal process_* entry point, pointed at the
+stand-in through its base-URL variable, into a throw-away database.
+Reports wall-clock time and records/sec per collector. Every run starts
+cold (empty HTTP cache, no item fingerprints, post scores or listing
+cursors) unless --warm is given.
+"""
+import io
+import os
+import sys
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import contextlib
+
+from benchmarks.replay import Scenario, add_scenario_args, scenario_from_args, start_server, base_url_env
+
+COLLECTORS = ("google", "reddit", "tiktok")
+
+
+def load_collectors(names):
+    """Import after the base-URL variables are set: they are read at import time."""
+    from src.collectors import google_trends, reddit_loader
+    runners = {
+        "google": google_trends.process_trends,
+        "reddit": reddit_loader.process_reddit_trends,
+    }
+    if "tiktok" in names:
+        try:
+            import playwright  # noqa: F401
+        except ImportError:
+            print("⚠️ Playwright absent : collecteur TikTok ignoré", file=sys.stderr)
+        else:
+            from src.collectors import tiktok_loader
+            runners["tiktok"] = tiktok_loader.process_tiktok_trends
+    return {name: runners[name] for name in names if name in runners}
+
+
+def reset_caches():
+    from sqlalchemy import text
+    from src.models.base import WriteSession
+    from src.collectors.http_cache import CACHE_DIR
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    session = WriteSession()
+    session.execute(text("DELETE FROM item_fingerprints"))
+    session.execute(text("DELETE FROM post_scores"))
+    session.execute(text("DELETE FROM watermarks WHERE name LIKE 'reddit_new:%'"))
+    session.commit()
+    session.close()
+
+
+def run(scenario: Scenario, names, runs: int, verbose: bool = False, warm: bool = False) -> dict:
+    server = start_server(scenario)
+    os.environ.update(base_url_env(server))
+    tmp = tempfile.TemporaryDirectory(prefix="viral_ingest_")
+    os.environ["VIRAL_DB_DIR"] = tmp.name
+
+    from src.models.base import init_db
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db()
+
+    results = {}
+    try:
+        for name, process in load_collectors(names).items():
+            timings, records = [], 0
+            before = scenario.requests, scenario.throttled
+            for _ in range(runs):
+                if not warm:
+                    reset_caches()
+                out = sys.stdout if verbose else io.StringIO()
+                with contextlib.redirect_stdout(out):
+                    started = time.perf_counter()
+                    count = process() or 0
+                    timings.append(time.perf_counter() - started)
+                records += count
+            median = statistics.median(timings)
+            results[name] = {
+                'runs': runs,
+                'records_per_run': records / runs,
+                'median_s': round(median, 3),
+                'best_s': round(min(timings), 3),
+                'records_per_s': round(records / runs / median, 1) if median else 0.0,
+                'requests': scenario.requests - before[0],
+                'throttled': scenario.throttled - before[1],
+            }
+    finally:
+        server.shutdown()
+        tmp.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collectors", default=",".join(COLLECTORS))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--out", help="write results as JSON here")
+    parser.add_argument("--warm", action="store_true", help="keep HTTP cache and fingerprints between runs")
+    parser.add_argument("--verbose", action="store_true", help="show the collectors' own output")
+    add_scenario_args(parser)
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.collectors.split(",") if n.strip()]
+    results = run(scenario_from_args(args), names, args.runs, args.verbose, args.warm)
+
+    print(f"\n{'collector':<10} {'records':>9} {'median':>9} {'best':>9} {'rec/s':>10} {'req':>6} {'429':>5}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['records_per_run']:>9.0f} {r['median_s']:>8.2f}s {r['best_s']:>8.2f}s "
+              f"{r['records_per_s']:>10,.1f} {r['requests']:>6} {r['throttled']:>5}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({'scenario': vars(args), 'results': results}, f, indent=2)
+        print(f"\n💾 {args.out}")
+
+
+if __name__ == "__main__":
+    main()
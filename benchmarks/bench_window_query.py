@@ -0,0 +1,95 @@
+"""
+Benchmark — the 24h analysis query as trend_metrics history grows.
+
+Seeds a throw-away database day by day and times the dashboard's
+`timestamp > now-24h ORDER BY velocity_score DESC` read with and without
+the storage-profile indexes. With them, the timing should stay flat.
+
+    python -m benchmarks.bench_window_query --days 180 --per-day 3000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+WINDOW_QUERY = """
+    SELECT t.niche, t.topic, m.volume, m.velocity_score, m.platform
+    FROM trends t
+    JOIN trend_metrics m ON t.id = m.trend_id
+    WHERE m.timestamp > datetime('now', '-1 day')
+    ORDER BY m.velocity_score DESC
+"""
+CHECKPOINTS = (1, 7, 30, 90, 180, 365)
+
+
+def seed_day(conn, day: int, per_day: int, rng: random.Random, next_id: int) -> int:
+    """Insert one day of trends + metrics `day` days ago (6 scan windows)."""
+    base = datetime.utcnow() - timedelta(days=day)
+    trends, metrics = [], []
+    for i in range(per_day):
+        tid = next_id + i
+        ts = base - timedelta(minutes=rng.randint(0, 24 * 60 - 1))
+        trends.append((tid, rng.choice(['Cinema', 'Sport', 'Music', 'General']),
+                       f"topic {tid}", 'Reddit', ts, ts))
+        metrics.append((tid, rng.choice(['Google', 'Reddit', 'TikTok']), rng.randint(0, 10**6),
+                        round(rng.uniform(0, 200), 1), ts.strftime(f"%Y-%m-%d_{ts.hour // 4 * 4:02d}"), ts))
+    conn.exec_driver_sql(
+        "INSERT INTO trends (id, niche, topic, source_platform, first_detected, last_updated) "
+        "VALUES (?, ?, ?, ?, ?, ?)", trends)
+    conn.exec_driver_sql(
+        "INSERT INTO trend_metrics (trend_id, platform, volume, velocity_score, scan_window, timestamp) "
+        "VALUES (?, ?, ?, ?, ?, ?)", metrics)
+    return next_id + per_day
+
+
+def time_query(engine, repeat: int) -> float:
+    best = float('inf')
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.exec_driver_sql(WINDOW_QUERY).fetchall()
+            best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--per-day", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["VIRAL_DB_DIR"] = tempfile.mkdtemp(prefix="viral_bench_")
+    from src.models.base import engine, init_db, MIGRATIONS
+
+    init_db()
+    rng = random.Random(42)
+    next_id = 1
+    seeded = 0
+    checkpoints = [c for c in CHECKPOINTS if c <= args.days] or [args.days]
+    print(f"{'history':>8} {'rows':>10} {'indexed ms':>11} {'no-index ms':>12}")
+
+    for target in checkpoints:
+        # Extend the history further back; the last 24h never changes.
+        with engine.begin() as conn:
+            for day in range(seeded, target):
+                next_id = seed_day(conn, day, args.per_day, rng, next_id)
+            conn.exec_driver_sql("ANALYZE")
+        seeded = target
+        indexed = time_query(engine, args.repeat)
+
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_metrics_window_cover")
+        plain = time_query(engine, args.repeat)
+        with engine.begin() as conn:
+            MIGRATIONS[1][2](conn)
+
+        print(f"{target:>7}d {target * args.per_day:>10,} {indexed:>11.1f} {plain:>12.1f}")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Check — the indexed clustering engine against the original pairwise loop.
+
+    python -m benchmarks.check_clustering [--fixtures 30] [--rows 400] [--seed 42]
+
+Builds seeded fixtures (synthetic topics from every platform, plus hand-made
+edge cases: substring matches, stop words, cross-niche look-alikes, one
+trend on several platforms), clusters each with legacy_cluster_rows() — the
+radar's loop before src.analysis.clustering — and with cluster_rows(), and
+exits 1 unless both give identical clusters.
+"""
+import sys
+import random
+import argparse
+
+from src.analysis.clustering import cluster_rows, jaccard_similarity, substring_match, SIMILARITY_THRESHOLD
+from benchmarks.synthetic import NICHE_WORDS, PLATFORMS, make_topic
+
+EDGE_CASES = [
+    # (topic, niche): matched through substring, stop words, or not at all across niches
+    ("GTA 6", 'General'), ("#GTA6Leak", 'General'), ("gta6 trailer leak", 'General'),
+    ("The Batman", 'Cinema'), ("batman", 'Cinema'), ("Batman Begins", 'Cinema'),
+    ("PSG vs OM", 'Sport'), ("psg om finale", 'Sport'), ("PSG", 'Sport'),
+    ("Dune", 'Cinema'), ("Dune", 'Music'), ("dune part two", 'Cinema'),
+    ("de la le", 'General'), ("the", 'General'), ("a", 'Sport'),
+]
+
+
+def legacy_cluster_rows(rows: list[dict]) -> list[dict]:
+    """The radar's original O(n²) greedy pass, kept verbatim as the reference."""
+    clusters = []
+    processed = set()
+    for row in rows:
+        if row['id'] in processed:
+            continue
+        cluster = {
+            'main_topic': row['topic'],
+            'niche': row['niche'],
+            'platforms': {row['platform']},
+            'trends': [row],
+            'total_volume': row['volume'],
+        }
+        processed.add(row['id'])
+        for other in rows:
+            if other['id'] in processed:
+                continue
+            same_niche = other['niche'] == row['niche']
+            sim = jaccard_similarity(row['topic'], other['topic'])
+            substr = substring_match(row['topic'], other['topic'])
+            if same_niche and (sim >= SIMILARITY_THRESHOLD or substr):
+                cluster['platforms'].add(other['platform'])
+                cluster['trends'].append(other)
+                cluster['total_volume'] += other['volume']
+                processed.add(other['id'])
+        clusters.append(cluster)
+    return clusters
+
+
+def fixture(rng: random.Random, n: int) -> list[dict]:
+    """Metric rows sorted by velocity desc, as the radar reads them. Some
+    trends show up on several platforms (same id, several rows)."""
+    topics = [(make_topic(rng, niche, platform, rng.randint(1, 50)), niche)
+              for niche, platform in ((rng.choice(list(NICHE_WORDS)), rng.choice(PLATFORMS)) for _ in range(n))]
+    topics += rng.sample(EDGE_CASES, rng.randint(3, len(EDGE_CASES)))
+    rows = []
+    for trend_id, (topic, niche) in enumerate(topics, 1):
+        for platform in rng.sample(PLATFORMS, rng.choice((1, 1, 1, 2, 3))):
+            rows.append({'id': trend_id, 'topic': topic, 'niche': niche, 'platform': platform,
+                         'velocity_score': round(rng.uniform(0, 200), 1), 'volume': rng.randint(0, 10**6)})
+    rows.sort(key=lambda r: r['velocity_score'], reverse=True)
+    return rows
+
+
+def _key(clusters: list[dict]) -> list[tuple]:
+    return [
+        (c['main_topic'], c['niche'], frozenset(c['platforms']), c['total_volume'],
+         tuple((t['id'], t['platform']) for t in c['trends']))
+        for c in clusters
+    ]
+
+
+def check(fixtures: int, rows: int, seed: int) -> list[int]:
+    """Seeds of the fixtures whose clusters differ."""
+    failed = []
+    for i in range(fixtures):
+        data = fixture(random.Random(seed + i), rows)
+        if _key(legacy_cluster_rows(data)) != _key(cluster_rows(data)):
+            failed.append(seed + i)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=400, help="synthetic topics per fixture")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    failed = check(args.fixtures, args.rows, args.seed)
+    if failed:
+        sys.exit(f"❌ Clusters différents pour les seeds : {', '.join(map(str, failed))}")
+    print(f"✅ {args.fixtures} fixtures : clusters identiques à la boucle d'origine.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+"""
+Record / replay harness — a local HTTP stand-in for Reddit, Google Trends,
+the TikTok Creative Center and Discord webhooks.
+
+    python -m benchmarks.replay record --out captures/
+    python -m benchmarks.replay serve --captures captures/ --port 8765 --latency-ms 80 --burst-every 40
+
+Point the collectors at it with their base-URL variables:
+
+    REDDIT_BASE_URL=http://127.0.0.1:8765
+    GOOGLE_TRENDS_BASE_URL=http://127.0.0.1:8765
+    TIKTOK_CC_BASE_URL=http://127.0.0.1:8765
+
+Captured payloads are replayed byte for byte. Anything not captured is
+synthesized from a seed, with a configurable number of items per payload,
+so the stand-in also works with no captures at all. Reddit listings (hot,
+rising, new) are served in pages following `limit` and the `after` cursor;
+/by_id/t3_a,t3_b.json returns posts of the listings served so far.
+
+POST /api/webhooks/<id>/<token> behaves like a Discord webhook: payloads
+over the embed limits get a 400, each webhook has a bucket of
+`webhook_limit` messages per `webhook_window` seconds announced in
+X-RateLimit-* headers (429 with retry_after past it), and accepted
+messages are kept in Scenario.webhooks for inspection.
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmarks.synthetic import NICHE_WORDS, FILLER, make_topic
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+CAPTURE_FILES = {
+    'reddit': "reddit/{sub}.{listing}.json",
+    'google': "google/{geo}.json",
+    'hashtag': "tiktok/hashtag.json",
+    'song': "tiktok/song.json",
+}
+TIKTOK_API = {
+    'hashtag': "/creative_radar_api/v1/popular_trend/hashtag/list",
+    'song': "/creative_radar_api/v1/popular_trend/sound/list",
+}
+TIKTOK_PAGES = {
+    "/business/creativecenter/inspiration/popular/hashtag/pc/en": 'hashtag',
+    "/business/creativecenter/inspiration/popular/music/pc/en": 'song',
+}
+REDDIT_LISTINGS = ("hot.json", "rising.json", "new.json")
+GOOGLE_PREFIX = ")]}',\n"
+DISCORD_LIMITS = {'embeds': 10, 'total': 6000, 'description': 4096, 'title': 256}
+
+
+class Scenario:
+    """What the stand-in serves and how badly it behaves.
+
+    latency_ms / jitter_ms delay every response. Every `burst_every`
+    requests, the next `burst_len` get a 429 with Retry-After. Reddit
+    responses announce a rate budget of `rate_budget` requests per
+    `rate_window` seconds in X-Ratelimit-* headers. Webhooks accept
+    `webhook_limit` messages per `webhook_window` seconds each."""
+
+    def __init__(self, captures: str | None = None, seed: int = 42, posts: int = 25,
+                 searches: int = 20, tiktok_items: int = 50, pad_bytes: int = 0,
+                 latency_ms: float = 0, jitter_ms: float = 0, burst_every: int = 0,
+                 burst_len: int = 0, retry_after: float = 1, rate_budget: int = 1000,
+                 rate_window: float = 1, webhook_limit: int = 5, webhook_window: float = 2):
+        self.captures = captures
+        self.seed = seed
+        self.posts = posts
+        self.searches = searches
+        self.tiktok_items = tiktok_items
+        self.pad = "x" * pad_bytes
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.burst_every = burst_every
+        self.burst_len = burst_len
+        self.retry_after = retry_after
+        self.rate_budget = rate_budget
+        self.rate_window = rate_window
+        self.webhook_limit = webhook_limit
+        self.webhook_window = webhook_window
+        self.requests = 0
+        self.throttled = 0
+        self.webhooks = {}           # webhook id -> accepted payloads, in arrival order
+        self.rejected = 0            # 400s: payloads over Discord's limits
+        self._webhook_windows = {}   # webhook id -> (window start, messages in it)
+        self._payloads = {}
+        self._listings = {}
+        self._lock = threading.Lock()
+
+    # ─── PAYLOADS ────────────────────────────────────────────────────
+    def _capture(self, relpath: str) -> bytes | None:
+        if not self.captures:
+            return None
+        path = os.path.join(self.captures, relpath)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def payload(self, key: str, build) -> bytes:
+        """Captured bytes if present, else a synthesized payload (built once)."""
+        with self._lock:
+            if key not in self._payloads:
+                self._payloads[key] = self._capture(key) or build(random.Random(f"{self.seed}:{key}"))
+            return self._payloads[key]
+
+    def reddit_hot(self, subreddit: str) -> bytes:
+        def build(rng):
+            now = time.time()
+            children = []
+            for i in range(self.posts):
+                niche = rng.choice(list(NICHE_WORDS))
+                children.append({'kind': 't3', 'data': {
+                    'id': f"{subreddit[:3].lower()}{i:04d}",
+                    'title': make_topic(rng, niche, 'Reddit', rng.randint(1, 10**6)),
+                    'score': int(rng.lognormvariate(6, 1.5)),
+                    'num_comments': int(rng.lognormvariate(4, 1.5)),
+                    'upvote_ratio': round(rng.uniform(0.5, 1.0), 2),
+                    'created_utc': now - rng.uniform(600, 86400),
+                    'permalink': f"/r/{subreddit}/comments/{i}/",
+                    'stickied': i == 0 and rng.random() < 0.3,
+                    'selftext': self.pad,
+                }})
+            return json.dumps({'kind': 'Listing', 'data': {'children': children}}).encode()
+        return self.payload(f"reddit/{subreddit}.json", build)
+
+    def reddit_listing(self, subreddit: str, listing: str) -> list[dict]:
+        """Every post of a listing, best first. Without a capture, `new` and
+        `rising` reorder the hot posts (newest first / newest third by score)."""
+        key = (subreddit, listing)
+        with self._lock:
+            cached = self._listings.get(key)
+        if cached is not None:
+            return cached
+        captured = self._capture(CAPTURE_FILES['reddit'].format(sub=subreddit, listing=listing))
+        if captured is not None:
+            children = json.loads(captured)['data']['children']
+        else:
+            children = json.loads(self.reddit_hot(subreddit))['data']['children']
+            if listing == 'new':
+                children = sorted(children, key=lambda c: -c['data']['created_utc'])
+            elif listing == 'rising':
+                young = sorted(children, key=lambda c: -c['data']['created_utc'])[:max(len(children) // 3, 1)]
+                children = sorted(young, key=lambda c: -c['data']['score'])
+        with self._lock:
+            self._listings[key] = children
+        return children
+
+    def reddit_page(self, subreddit: str, listing: str, limit: int, after: str | None) -> bytes:
+        """One page of a listing, `after` a t3_ fullname as Reddit's cursor."""
+        children = self.reddit_listing(subreddit, listing)
+        start = 0
+        if after:
+            ids = [f"t3_{c['data']['id']}" for c in children]
+            start = ids.index(after) + 1 if after in ids else len(children)
+        page = children[start:start + limit]
+        more = start + limit < len(children) and page
+        cursor = f"t3_{page[-1]['data']['id']}" if more else None
+        return json.dumps({'kind': 'Listing', 'data': {'children': page, 'after': cursor}}).encode()
+
+    def reddit_by_id(self, fullnames: list[str]) -> bytes:
+        """Posts by t3_ fullname, as /by_id does: among listings already served."""
+        with self._lock:
+            known = {f"t3_{c['data']['id']}": c for children in self._listings.values() for c in children}
+        children = [known[name] for name in fullnames if name in known]
+        return json.dumps({'kind': 'Listing', 'data': {'children': children, 'after': None}}).encode()
+
+    def google_daily(self, geo: str = "FR") -> bytes:
+        """Per-market searches; about a third are shared by every market."""
+        def build(rng):
+            shared = random.Random(f"{self.seed}:google")
+            days = []
+            for _ in range(2):
+                searches = []
+                for _ in range(self.searches):
+                    source = shared if rng.random() < 0.3 else rng
+                    niche = source.choice(list(NICHE_WORDS))
+                    searches.append({
+                        'title': {'query': make_topic(source, niche, 'Google', source.randint(1, 10**6))},
+                        'formattedTraffic': f"{rng.choice([10, 20, 50, 100, 200, 500])}K+",
+                        'articles': [{'title': " ".join(rng.sample(FILLER, 6)), 'snippet': self.pad}],
+                    })
+                days.append({'trendingSearches': searches})
+            body = {'default': {'trendingSearchesDays': days}}
+            return (GOOGLE_PREFIX + json.dumps(body)).encode()
+        return self.payload(CAPTURE_FILES['google'].format(geo=geo), build)
+
+    def tiktok_list(self, page_type: str) -> bytes:
+        def build(rng):
+            items = []
+            for _ in range(self.tiktok_items):
+                niche = rng.choice(list(NICHE_WORDS))
+                if page_type == 'hashtag':
+                    name = make_topic(rng, niche, 'TikTok', rng.randint(1, 10**6)).lstrip('#')
+                    items.append({'hashtag_name': name, 'video_views': rng.randint(10**3, 10**8),
+                                  'trend': self.pad})
+                else:
+                    items.append({'title': " ".join(rng.sample(NICHE_WORDS['Music'], 2)).title(),
+                                  'author': rng.choice(FILLER).title(),
+                                  'user_num': rng.randint(10**3, 10**7), 'trend': self.pad})
+            return json.dumps({'code': 0, 'data': {'list': items}}).encode()
+        return self.payload(CAPTURE_FILES[page_type], build)
+
+    @staticmethod
+    def tiktok_page(page_type: str) -> bytes:
+        """A page whose only job is to call the list API, like the real SPA does."""
+        return (f"<html><body><script>fetch('{TIKTOK_API[page_type]}?page=1&limit=50')"
+                f"</script></body></html>").encode()
+
+    # ─── BEHAVIOUR ───────────────────────────────────────────────────
+    def next_request(self) -> bool:
+        """Count a request; True if it falls inside a 429 burst."""
+        with self._lock:
+            self.requests += 1
+            if not self.burst_every or not self.burst_len:
+                return False
+            throttled = (self.requests - 1) % (self.burst_every + self.burst_len) >= self.burst_every
+            self.throttled += throttled
+            return throttled
+
+    def webhook_slot(self, webhook_id: str) -> tuple[int, float]:
+        """Take a message slot in the webhook's bucket: (remaining, reset_after).
+        remaining < 0 means the bucket was already empty."""
+        with self._lock:
+            now = time.monotonic()
+            start, used = self._webhook_windows.get(webhook_id, (now, 0))
+            if now - start >= self.webhook_window:
+                start, used = now, 0
+            used += 1
+            self._webhook_windows[webhook_id] = (start, min(used, self.webhook_limit + 1))
+            return self.webhook_limit - used, max(start + self.webhook_window - now, 0.0)
+
+    def accept_message(self, webhook_id: str, payload: dict):
+        with self._lock:
+            self.webhooks.setdefault(webhook_id, []).append(payload)
+
+    @staticmethod
+    def discord_errors(payload: dict) -> list[str]:
+        embeds = payload.get('embeds', [])
+        errors = []
+        if len(embeds) > DISCORD_LIMITS['embeds']:
+            errors.append(f"embeds: {len(embeds)} > {DISCORD_LIMITS['embeds']}")
+        total = 0
+        for i, embed in enumerate(embeds):
+            title, description = embed.get('title', ''), embed.get('description', '')
+            if len(title) > DISCORD_LIMITS['title']:
+                errors.append(f"embeds.{i}.title: {len(title)}")
+            if len(description) > DISCORD_LIMITS['description']:
+                errors.append(f"embeds.{i}.description: {len(description)}")
+            total += len(title) + len(description) + len(embed.get('footer', {}).get('text', ''))
+            total += sum(len(f.get('name', '')) + len(f.get('value', '')) for f in embed.get('fields', ()))
+        if total > DISCORD_LIMITS['total']:
+            errors.append(f"embeds: {total} characters > {DISCORD_LIMITS['total']}")
+        return errors
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    scenario: Scenario = None
+    protocol_version = "HTTP/1.1"     # Keep-alive, like the real endpoints
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_payload(self, body: bytes, headers=None):
+        """200 with an ETag, or 304 when the client already holds this payload."""
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        headers = dict(headers or {}, ETag=etag)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send(200, body, headers=headers)
+
+    def do_GET(self):
+        scenario = self.scenario
+        url = urlsplit(self.path)
+        scenario.delay()
+
+        if url.path in TIKTOK_PAGES:
+            return self._send(200, scenario.tiktok_page(TIKTOK_PAGES[url.path]), "text/html")
+        if scenario.next_request():
+            return self._send(429, b'{"message": "Too Many Requests"}',
+                              headers={"Retry-After": str(scenario.retry_after)})
+
+        parts = url.path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "r" and parts[2] in REDDIT_LISTINGS:
+            rate = {"X-Ratelimit-Remaining": str(scenario.rate_budget),
+                    "X-Ratelimit-Reset": str(scenario.rate_window)}
+            query = parse_qs(url.query)
+            limit = int(query.get("limit", ["25"])[0])
+            page = scenario.reddit_page(parts[1], parts[2][:-len(".json")], limit, query.get("after", [None])[0])
+            return self._send_payload(page, headers=rate)
+        if len(parts) == 2 and parts[0] == "by_id" and parts[1].endswith(".json"):
+            rate = {"X-Ratelimit-Remaining": str(scenario.rate_budget),
+                    "X-Ratelimit-Reset": str(scenario.rate_window)}
+            return self._send_payload(scenario.reddit_by_id(parts[1][:-len(".json")].split(",")), headers=rate)
+        if url.path == "/trends/api/dailytrends":
+            geo = parse_qs(url.query).get("geo", ["FR"])[0]
+            return self._send_payload(scenario.google_daily(geo))
+        for page_type, path in TIKTOK_API.items():
+            if url.path == path:
+                return self._send_payload(scenario.tiktok_list(page_type))
+        self._send(404, b'{"message": "Not Found"}')
+
+    def do_POST(self):
+        scenario = self.scenario
+        parts = urlsplit(self.path).path.strip("/").split("/")
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        scenario.delay()
+        if len(parts) != 4 or parts[:2] != ["api", "webhooks"]:
+            return self._send(404, b'{"message": "Unknown Webhook", "code": 10015}')
+
+        webhook_id = parts[2]
+        if scenario.next_request():
+            retry = {"message": "You are being rate limited.", "retry_after": scenario.retry_after, "global": True}
+            return self._send(429, json.dumps(retry).encode(),
+                              headers={"Retry-After": str(scenario.retry_after), "X-RateLimit-Global": "true"})
+
+        remaining, reset_after = scenario.webhook_slot(webhook_id)
+        rate = {
+            "X-RateLimit-Limit": str(scenario.webhook_limit),
+            "X-RateLimit-Remaining": str(max(remaining, 0)),
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": hashlib.sha1(webhook_id.encode()).hexdigest()[:16],
+        }
+        if remaining < 0:
+            with scenario._lock:
+                scenario.throttled += 1
+            retry = {"message": "You are being rate limited.", "retry_after": round(reset_after, 3), "global": False}
+            return self._send(429, json.dumps(retry).encode(), headers=rate)
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._send(400, b'{"message": "Cannot send an empty message", "code": 50006}', headers=rate)
+        errors = scenario.discord_errors(payload)
+        if errors:
+            with scenario._lock:
+                scenario.rejected += 1
+            return self._send(400, json.dumps({"message": "Invalid Form Body", "code": 50035,
+                                               "errors": errors}).encode(), headers=rate)
+        scenario.accept_message(webhook_id, payload)
+        self._send(204, b"", headers=rate)
+
+
+def start_server(scenario: Scenario, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve `scenario` from a daemon thread; the bound address is server.server_address."""
+    handler = type("Handler", (StandInHandler,), {"scenario": scenario})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="replay-server", daemon=True).start()
+    return server
+
+
+def base_url_env(server: ThreadingHTTPServer) -> dict:
+    """The environment that points every collector at `server`."""
+    host, port = server.server_address[:2]
+    url = f"http://{host}:{port}"
+    return {"REDDIT_BASE_URL": url, "GOOGLE_TRENDS_BASE_URL": url, "TIKTOK_CC_BASE_URL": url}
+
+
+def webhook_url(server: ThreadingHTTPServer, webhook_id: str) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/api/webhooks/{webhook_id}/stand-in-token"
+
+
+# ─── RECORD ──────────────────────────────────────────────────────────
+def record(out: str, tiktok: bool = True):
+    """Capture live payloads into `out` in the layout `serve` replays."""
+    from src.collectors import google_trends, reddit_loader
+    from src.collectors.http_pool import make_session
+
+    def save(relpath, body: bytes):
+        path = os.path.join(out, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(body)
+        print(f"  💾 {relpath} ({len(body):,} octets)")
+
+    http = make_session(reddit_loader.HEADERS)
+    for subreddits in reddit_loader.SOURCES.values():
+        for sub in subreddits:
+            for listing in ("hot", "rising", "new"):
+                url = f"{reddit_loader.BASE_URL}/r/{sub}/{listing}.json?limit={reddit_loader.PAGE_SIZE}"
+                resp = http.get(url, timeout=10)
+                if resp.status_code == 200:
+                    save(CAPTURE_FILES['reddit'].format(sub=sub, listing=listing), resp.content)
+                else:
+                    print(f"  ❌ r/{sub}/{listing}: HTTP {resp.status_code}")
+                time.sleep(1)   # Stay polite with the live API
+
+    for geo, hl in google_trends.MARKETS:
+        resp = http.get(google_trends.api_url(geo, hl), headers=google_trends.market_headers(geo, hl), timeout=15)
+        if resp.status_code == 200:
+            save(CAPTURE_FILES['google'].format(geo=geo), resp.content)
+        else:
+            print(f"  ❌ Google {geo}: HTTP {resp.status_code}")
+
+    if tiktok:
+        from src.collectors import tiktok_loader
+        for page_type, items in tiktok_loader.intercept_tiktok_data().items():
+            if items:
+                save(CAPTURE_FILES[page_type], json.dumps({'code': 0, 'data': {'list': items}}).encode())
+
+
+def add_scenario_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--captures", help="directory written by `record` (missing payloads are synthesized)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--posts", type=int, default=25, help="posts per synthetic subreddit listing")
+    parser.add_argument("--searches", type=int, default=20, help="synthetic Google searches per day")
+    parser.add_argument("--tiktok-items", type=int, default=50, help="items per synthetic TikTok list")
+    parser.add_argument("--pad-bytes", type=int, default=0, help="extra bytes per synthetic item")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--burst-every", type=int, default=0, help="requests between 429 bursts (0: never)")
+    parser.add_argument("--burst-len", type=int, default=0, help="429 responses per burst")
+    parser.add_argument("--retry-after", type=float, default=1)
+    parser.add_argument("--rate-budget", type=int, default=1000, help="announced X-Ratelimit-Remaining")
+    parser.add_argument("--rate-window", type=float, default=1, help="announced X-Ratelimit-Reset (s)")
+    parser.add_argument("--webhook-limit", type=int, default=5, help="messages per webhook bucket")
+    parser.add_argument("--webhook-window", type=float, default=2, help="webhook bucket window (s)")
+
+
+def scenario_from_args(args) -> Scenario:
+    return Scenario(
+        captures=args.captures, seed=args.seed, posts=args.posts, searches=args.searches,
+        tiktok_items=args.tiktok_items, pad_bytes=args.pad_bytes, latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms, burst_every=args.burst_every, burst_len=args.burst_len,
+        retry_after=args.retry_after, rate_budget=args.rate_budget, rate_window=args.rate_window,
+        webhook_limit=args.webhook_limit, webhook_window=args.webhook_window,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="capture live payloads")
+    rec.add_argument("--out", default="captures")
+    rec.add_argument("--no-tiktok", action="store_true")
+    serve = sub.add_parser("serve", help="run the stand-in server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    add_scenario_args(serve)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.out, tiktok=not args.no_tiktok)
+        return
+
+    server = start_server(scenario_from_args(args), args.host, args.port)
+    print("🎭 Stand-in prêt :")
+    for name, value in base_url_env(server).items():
+        print(f"  export {name}={value}")
+    print(f"  export DISCORD_WEBHOOK_URL={webhook_url(server, 'briefing')}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Benchmark suite — storage and analysis hot paths on synthetic data.
+
+    python -m benchmarks.run --sizes 10k,100k,1m --out bench.json
+    python -m benchmarks.run --sizes 10k --compare bench.json   # exit 1 on regression
+
+Each size runs in its own process against a fresh, seeded database
+(VIRAL_DB_DIR points at a temp dir), so results only depend on the code.
+Timings are best/median wall-clock milliseconds over --repeat runs.
+"""
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INGEST_BATCH = 500        # Records per simulated collector scan
+NEW_SIGNALS = 200         # Metrics added before timing an incremental radar run
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    for suffix, factor in (('k', 1_000), ('m', 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * factor)
+    return int(value)
+
+
+# ─── WORKER (one size, one fresh DB) ────────────────────────────────
+def run_worker(size: int, seed: int, repeat: int) -> dict:
+    from src.models.base import engine, init_db, WriteSession, upsert_trend, add_metric, bulk_ingest
+    from src.analysis import clustering, cross_platform_radar, dashboard_terminal, hook_generator, discord_briefing
+    from src.analysis import momentum
+    from benchmarks.synthetic import generate, ingest_records
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db()
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        counts = generate(conn, size, seed=seed)
+        conn.exec_driver_sql("ANALYZE")
+    counts['seed_s'] = round(time.perf_counter() - started, 2)
+
+    results = {}
+
+    def bench(name, fn):
+        """fn() returns its own elapsed seconds, so setup/rollback stay untimed."""
+        times = [fn() * 1000 for _ in range(repeat)]
+        results[name] = {
+            'best_ms': round(min(times), 3),
+            'median_ms': round(statistics.median(times), 3),
+            'runs': repeat,
+        }
+
+    def timed(fn):
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                fn()
+                return time.perf_counter() - t0
+        return run
+
+    records = ingest_records(INGEST_BATCH, seed=seed)
+
+    def per_row_ingest():
+        session = WriteSession()
+        t0 = time.perf_counter()
+        for rec in records:
+            trend = upsert_trend(session, rec['topic'], rec['niche'], rec['platform'])
+            add_metric(session, trend, rec['platform'], rec['volume'], rec['velocity_score'])
+        session.flush()
+        elapsed = time.perf_counter() - t0
+        session.rollback()
+        session.close()
+        return elapsed
+
+    def bulk():
+        session = WriteSession()
+        t0 = time.perf_counter()
+        bulk_ingest(session, records)
+        session.flush()
+        elapsed = time.perf_counter() - t0
+        session.rollback()
+        session.close()
+        return elapsed
+
+    def window_rows():
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql("""
+                SELECT t.id, t.topic, t.niche, m.platform, m.velocity_score, m.volume
+                FROM trends t
+                JOIN trend_metrics m ON t.id = m.trend_id
+                WHERE m.timestamp > datetime('now', '-1 day')
+                ORDER BY m.velocity_score DESC
+            """).fetchall()
+        return [{'id': r[0], 'topic': r[1], 'niche': r[2], 'platform': r[3],
+                 'velocity_score': r[4] or 0, 'volume': r[5] or 0} for r in rows]
+
+    def cluster():
+        t0 = time.perf_counter()
+        clustering.cluster_rows(window_rows())
+        return time.perf_counter() - t0
+
+    def radar_full():
+        session = WriteSession()
+        t0 = time.perf_counter()
+        cross_platform_radar.update_radar(session)
+        elapsed = time.perf_counter() - t0
+        session.rollback()
+        session.close()
+        return elapsed
+
+    def momentum_full():
+        session = WriteSession()
+        t0 = time.perf_counter()
+        momentum.update_momentum(session)
+        elapsed = time.perf_counter() - t0
+        session.rollback()
+        session.close()
+        return elapsed
+
+    bench('ingest.upsert_trend+add_metric', per_row_ingest)
+    bench('ingest.bulk_ingest', bulk)
+    bench('query.dashboard', timed(dashboard_terminal.show_dashboard))
+    bench('query.hook_generator', timed(hook_generator.generate_viral_brief))
+    bench('query.briefing_top30', timed(discord_briefing.fetch_top_trends))
+    bench('momentum.update', momentum_full)
+    bench('radar.cluster_rows', cluster)
+    bench('radar.update_full', radar_full)
+
+    # Incremental radar: persist the full state once, then time only the delta.
+    session = WriteSession()
+    cross_platform_radar.update_radar(session)
+    session.commit()
+    session.close()
+    fresh = ingest_records(NEW_SIGNALS, seed=seed + 1)
+
+    def radar_incremental():
+        session = WriteSession()
+        bulk_ingest(session, fresh)
+        session.flush()
+        t0 = time.perf_counter()
+        cross_platform_radar.update_radar(session)
+        elapsed = time.perf_counter() - t0
+        session.rollback()
+        session.close()
+        return elapsed
+
+    bench('radar.update_incremental', radar_incremental)
+    return {'dataset': counts, 'benchmarks': results}
+
+
+# ─── DRIVER ─────────────────────────────────────────────────────────
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print per-benchmark ratios; return the regressions beyond `threshold`."""
+    regressions = []
+    print(f"\n📊 vs {baseline['meta'].get('revision')} (seuil x{threshold})")
+    for size, result in current['results'].items():
+        base = baseline['results'].get(size, {}).get('benchmarks', {})
+        for name, stats in result['benchmarks'].items():
+            if name not in base:
+                continue
+            ratio = stats['median_ms'] / max(base[name]['median_ms'], 1e-6)
+            flag = "❌" if ratio > threshold else "✅"
+            print(f"  {flag} {size:>8} {name:<32} {base[name]['median_ms']:>10.2f} → "
+                  f"{stats['median_ms']:>10.2f} ms  (x{ratio:.2f})")
+            if ratio > threshold:
+                regressions.append(f"{size} {name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k", help="metric rows per dataset, e.g. 10k,100k,1m")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="write results as JSON here")
+    parser.add_argument("--compare", help="baseline JSON from a previous --out")
+    parser.add_argument("--threshold", type=float, default=1.25, help="median ratio counted as a regression")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.seed, args.repeat)))
+        return
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': {},
+    }
+    for label in args.sizes.split(','):
+        size = parse_size(label)
+        with tempfile.TemporaryDirectory(prefix="viral_bench_") as tmp:
+            env = dict(os.environ, VIRAL_DB_DIR=tmp)
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.run", "--worker", str(size),
+                 "--seed", str(args.seed), "--repeat", str(args.repeat)],
+                cwd=ROOT, env=env, capture_output=True, text=True,
+            )
+        if proc.returncode != 0:
+            sys.exit(f"❌ {label}: worker failed\n{proc.stderr}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        report['results'][str(size)] = result
+
+        ds = result['dataset']
+        print(f"\n🧪 {label}: {ds['trends']:,} trends, {ds['metrics']:,} metrics (seed {ds['seed_s']}s)")
+        for name, stats in result['benchmarks'].items():
+            print(f"  {name:<32} best {stats['best_ms']:>10.2f} ms   median {stats['median_ms']:>10.2f} ms")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(f"\n❌ Régressions : {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
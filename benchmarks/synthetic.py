@@ -0,0 +1,121 @@
+"""
+Seeded synthetic data for benchmarks.
+
+Fills trends / trend_metrics with topic text shaped like each platform's
+(Google queries, Reddit titles, TikTok hashtags), configured niches, and
+metrics spread over scan windows in the last `days`. The same seed always
+produces the same database.
+"""
+import random
+import calendar
+from datetime import datetime, timedelta
+
+from src.models.config import WINDOW_MINUTES
+
+PLATFORMS = ('Google', 'Reddit', 'TikTok')
+NICHE_WORDS = {
+    'Cinema': ['trailer', 'netflix', 'marvel', 'série', 'film', 'oscar', 'premiere', 'dune',
+               'batman', 'anime', 'casting', 'saison', 'disney', 'hbo', 'cannes', 'avatar'],
+    'Sport':  ['psg', 'mbappe', 'nba', 'lakers', 'ufc', 'transfert', 'ligue', 'finale',
+               'tennis', 'f1', 'verstappen', 'champions', 'goal', 'blessure', 'olympique', 'match'],
+    'Music':  ['album', 'concert', 'tour', 'rap', 'kpop', 'clip', 'feat', 'single', 'remix',
+               'grammy', 'spotify', 'taylor', 'drake', 'aya', 'lyrics', 'tournée'],
+    'General': ['météo', 'grève', 'élection', 'iphone', 'bitcoin', 'tesla', 'paris', 'prix',
+                'loi', 'santé', 'budget', 'nasa', 'google', 'openai', 'vacances', 'train'],
+}
+FILLER = ['the', 'new', 'first', 'why', 'everyone', 'is', 'talking', 'about', 'just', 'announced',
+          'officially', 'confirmed', 'leak', 'reaction', 'de', 'la', 'nouveau', 'enfin', '2025']
+
+
+def make_topic(rng: random.Random, niche: str, platform: str, serial: int) -> str:
+    """Platform-shaped text; `serial` keeps topics unique like the real UNIQUE(topic)."""
+    words = NICHE_WORDS[niche]
+    if platform == 'Google':
+        return f"{' '.join(rng.sample(words, rng.randint(1, 3)))} {serial}"
+    if platform == 'TikTok':
+        return f"#{''.join(rng.sample(words, rng.randint(1, 2)))}{serial}"
+    title = rng.sample(words, rng.randint(1, 3)) + rng.sample(FILLER, rng.randint(3, 8))
+    rng.shuffle(title)
+    return f"{' '.join(title).capitalize()} ({serial})"
+
+
+WINDOW_SECONDS = WINDOW_MINUTES * 60   # Same windows as base.get_window_bucket
+
+
+def window_bucket(ts: datetime) -> int:
+    epoch = calendar.timegm(ts.timetuple())
+    return epoch - epoch % WINDOW_SECONDS
+
+
+def scan_window(ts: datetime) -> str:
+    start = datetime.utcfromtimestamp(window_bucket(ts))
+    return start.strftime("%Y-%m-%d_%H" if WINDOW_SECONDS % 3600 == 0 else "%Y-%m-%d_%H%M")
+
+
+def generate(conn, rows: int, seed: int = 42, days: int = 30, metrics_per_trend: int = 3,
+             batch: int = 50_000) -> dict:
+    """Insert ~`rows` metric rows (and rows / metrics_per_trend trends) through
+    a SQLAlchemy connection. Returns counts."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    n_trends = max(rows // metrics_per_trend, 1)
+    niches = list(NICHE_WORDS)
+    trends, metrics = [], []
+    total_metrics = 0
+
+    def flush():
+        if trends:
+            conn.exec_driver_sql(
+                "INSERT INTO trends (id, niche, topic, source_platform, first_detected, last_updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)", trends)
+        if metrics:
+            conn.exec_driver_sql(
+                "INSERT OR IGNORE INTO trend_metrics "
+                "(trend_id, platform, volume, velocity_score, scan_window, window_bucket, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", metrics)
+        trends.clear()
+        metrics.clear()
+
+    for tid in range(1, n_trends + 1):
+        niche = rng.choices(niches, weights=(3, 3, 3, 1))[0]
+        platform = rng.choices(PLATFORMS, weights=(2, 5, 3))[0]
+        first = now - timedelta(minutes=rng.randint(0, days * 24 * 60 - 1))
+        trends.append((tid, niche, make_topic(rng, niche, platform, tid), platform, first, first))
+
+        # A trend is re-measured in following windows, sometimes on other platforms.
+        volume = int(rng.lognormvariate(8, 2))
+        for k in range(metrics_per_trend):
+            ts = first + timedelta(seconds=WINDOW_SECONDS * k + rng.randint(0, WINDOW_SECONDS // 8))
+            if ts > now:
+                break
+            plat = platform if rng.random() < 0.8 else rng.choice(PLATFORMS)
+            volume = int(volume * rng.uniform(0.7, 2.5))
+            metrics.append((tid, plat, volume, round(rng.uniform(0, 200), 1), scan_window(ts), window_bucket(ts), ts))
+            total_metrics += 1
+
+        if len(metrics) >= batch:
+            flush()
+    flush()
+    # Revisions as if every row had been ingested on its own (see base.next_revision).
+    conn.exec_driver_sql("UPDATE trend_metrics SET revision = id WHERE revision IS NULL")
+    conn.exec_driver_sql(
+        "INSERT INTO watermarks (name, value) SELECT 'metric_revision', COALESCE(MAX(revision), 0) FROM trend_metrics WHERE 1 "
+        "ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)")
+    return {'trends': n_trends, 'metrics': total_metrics}
+
+
+def ingest_records(n: int, seed: int = 7) -> list[dict]:
+    """A collector-sized batch of records for upsert_trend/add_metric/bulk_ingest."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        niche = rng.choice(list(NICHE_WORDS))
+        platform = rng.choice(PLATFORMS)
+        records.append({
+            'topic': make_topic(rng, niche, platform, 10**9 + i),
+            'niche': niche,
+            'platform': platform,
+            'volume': rng.randint(0, 10**6),
+            'velocity_score': round(rng.uniform(0, 200), 1),
+        })
+    return records
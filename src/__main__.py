@@ -0,0 +1,213 @@
+"""
+Viral Watch — unified command line.
+
+    python -m src collect [google|reddit|tiktok ...]
+    python -m src repoll [--top 20] [--hours 12]
+    python -m src radar | momentum | dashboard | brief | hooks
+    python -m src dashboard --watch [--interval 5]
+    python -m src engine [--run-now] [--once] [--no-tiktok]
+    python -m src retention [--days N] [--backup PATH]
+    python -m src archive export | stats | query [--topic T] [--days N]
+    python -m src metrics [--job reddit] [--days 7]
+    python -m src serve [--host 127.0.0.1] [--port 8686]
+    python -m src --import-profile dashboard
+
+Every command imports what it needs inside its handler, so `dashboard`
+never loads SQLAlchemy, requests or Playwright.
+"""
+import sys
+import time
+import argparse
+import builtins
+
+COLLECTORS = ('google', 'reddit', 'tiktok')
+
+
+# ─── IMPORT PROFILER ────────────────────────────────────────────────
+class ImportProfiler:
+    """Times every first-time import while installed (self and cumulative ms)."""
+
+    def __init__(self):
+        self.records = []   # (module, self_ms, cumulative_ms)
+        self._stack = []
+        self._original = builtins.__import__
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        self._stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - started
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += total
+            self.records.append((name, (total - children) * 1000, total * 1000))
+
+    def __enter__(self):
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
+
+    def report(self, top: int = 25):
+        total = sum(r[1] for r in self.records)
+        print(f"\n⏱️ IMPORTS | {len(self.records)} modules, {total:.1f} ms", file=sys.stderr)
+        print(f"{'self ms':>9} {'cumul ms':>9}  module", file=sys.stderr)
+        for name, self_ms, cumulative_ms in sorted(self.records, key=lambda r: -r[2])[:top]:
+            print(f"{self_ms:>9.1f} {cumulative_ms:>9.1f}  {name}", file=sys.stderr)
+
+
+# ─── COMMANDS ───────────────────────────────────────────────────────
+def cmd_collect(args):
+    from src.models.base import init_db
+    from src.telemetry import track_run
+
+    init_db()
+    for name in args.sources or COLLECTORS:
+        if name == 'google':
+            from src.collectors.google_trends import process_trends as process
+        elif name == 'reddit':
+            from src.collectors.reddit_loader import process_reddit_trends as process
+        elif name == 'tiktok':
+            from src.collectors.tiktok_loader import process_tiktok_trends as process
+        with track_run(name):
+            process()
+
+
+def cmd_repoll(args):
+    from src.collectors import repoll
+    sys.argv = ['src.collectors.repoll', *args.rest]
+    repoll.main()
+
+
+def cmd_radar(args):
+    from src.models.base import init_db
+    from src.telemetry import track_run
+    from src.analysis.cross_platform_radar import find_cross_platform_opportunities
+
+    init_db()
+    with track_run('radar'):
+        find_cross_platform_opportunities()
+
+
+def cmd_momentum(args):
+    from src.analysis import momentum
+    sys.argv = ['src.analysis.momentum', *args.rest]
+    momentum.main()
+
+
+def cmd_archive(args):
+    from src.models import archive
+    sys.argv = ['src.models.archive', *args.rest]
+    archive.main()
+
+
+def cmd_dashboard(args):
+    from src.analysis.dashboard_terminal import show_dashboard, watch
+    if args.watch:
+        watch(args.interval, args.top)
+    else:
+        show_dashboard(args.top)
+
+
+def cmd_brief(args):
+    from src.telemetry import track_run
+    from src.analysis.discord_briefing import send_briefing
+    with track_run('briefing'):
+        send_briefing()
+
+
+def cmd_hooks(args):
+    from src.analysis.hook_generator import generate_viral_brief
+    generate_viral_brief()
+
+
+def cmd_engine(args):
+    from src import engine
+    sys.argv = ['src.engine', *args.rest]
+    engine.main()
+
+
+def cmd_metrics(args):
+    from src import telemetry
+    sys.argv = ['src.telemetry', *args.rest]
+    telemetry.main()
+
+
+def cmd_serve(args):
+    from src import api
+    sys.argv = ['src.api', *args.rest]
+    api.main()
+
+
+def cmd_retention(args):
+    from src.models import retention
+    sys.argv = ['src.models.retention', *args.rest]
+    retention.main()
+
+
+def collector(name: str) -> str:
+    # Checked per value: `choices` with nargs="*" rejects the empty (default: all) list.
+    if name not in COLLECTORS:
+        raise argparse.ArgumentTypeError(f"invalid choice: {name!r} (choose from {', '.join(COLLECTORS)})")
+    return name
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src", description="Viral Watch Engine")
+    parser.add_argument("--import-profile", action="store_true",
+                        help="report import time per module on stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("collect", help="run collectors (default: all)")
+    p.add_argument("sources", nargs="*", type=collector, metavar="source",
+                   help=f"any of {', '.join(COLLECTORS)}")
+    p.set_defaults(func=cmd_collect)
+
+    sub.add_parser("radar", help="update and print cross-platform opportunities").set_defaults(func=cmd_radar)
+    p = sub.add_parser("dashboard", help="top trends per niche (last 24h)")
+    p.add_argument("--watch", action="store_true", help="stay open and redraw what changed")
+    p.add_argument("--interval", type=float, default=5.0, help="seconds between polls in --watch")
+    p.add_argument("--top", type=int, default=5, help="rows per niche")
+    p.set_defaults(func=cmd_dashboard)
+    sub.add_parser("brief", help="send (or print) the Discord briefing").set_defaults(func=cmd_brief)
+    sub.add_parser("hooks", help="print the hook-writing prompt").set_defaults(func=cmd_hooks)
+
+    for name, func, help_text in (
+        ("engine", cmd_engine, "scheduler daemon (see python -m src.engine -h)"),
+        ("repoll", cmd_repoll, "re-measure the fastest accelerating trends (see python -m src.collectors.repoll -h)"),
+        ("retention", cmd_retention, "rollup, prune and compact (see python -m src.models.retention -h)"),
+        ("archive", cmd_archive, "columnar history archive (see python -m src.models.archive -h)"),
+        ("momentum", cmd_momentum, "growth / acceleration / EWMA pass (see python -m src.analysis.momentum -h)"),
+        ("serve", cmd_serve, "JSON read API with cached responses (see python -m src.api -h)"),
+        ("metrics", cmd_metrics, "per-stage p50/p95 of recorded runs (see python -m src.telemetry -h)"),
+    ):
+        # Options are forwarded untouched to the module's own parser.
+        sub.add_parser(name, help=help_text, add_help=False).set_defaults(func=func, passthrough=True)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, rest = parser.parse_known_args(argv)
+    if getattr(args, 'passthrough', False):
+        args.rest = rest
+    elif rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    if not args.import_profile:
+        return args.func(args)
+
+    with ImportProfiler() as profiler:
+        try:
+            return args.func(args)
+        finally:
+            profiler.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Clustering engine for the cross-platform radar.
+
+Rows are tokenized once, then candidate pairs come from a token → rows
+inverted index (Jaccard) and a character n-gram index (substring match)
+instead of comparing every pair. Matches are merged with a union-find
+rooted on the seed row, so the output is identical to the original greedy
+pass: rows are visited by descending velocity, each unclaimed row seeds a
+cluster and claims every unclaimed same-niche row that matches the seed.
+"""
+import re
+from collections import defaultdict
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+SIMILARITY_THRESHOLD = 0.25  # Jaccard index minimum for matching
+NGRAM = 4                    # substring_match() only fires on strings > 3 chars
+
+STOP_WORDS = frozenset({
+    'le', 'la', 'les', 'de', 'du', 'des', 'un', 'une', 'en', 'au', 'aux',
+    'the', 'a', 'an', 'in', 'on', 'of', 'for', 'to', 'is', 'and', 'et',
+    'vs', 'sur', 'with', 'from', 'has', 'are', 'was', 'not', 'but',
+})
+
+
+def normalize(text: str) -> str:
+    return re.sub(r'[^\w\s]', '', text.lower().replace('#', ''))
+
+
+def get_tokens(text: str) -> set[str]:
+    words = normalize(text).split()
+    return {w for w in words if w not in STOP_WORDS and len(w) > 2}
+
+
+def jaccard_similarity(a: str, b: str) -> float:
+    sa, sb = get_tokens(a), get_tokens(b)
+    if not sa or not sb:
+        return 0.0
+    return len(sa & sb) / len(sa | sb)
+
+
+def substring_match(a: str, b: str) -> bool:
+    """Check if one normalized topic contains the other (handles 'GTA 6' vs '#GTA6Leak')."""
+    na, nb = normalize(a).replace(' ', ''), normalize(b).replace(' ', '')
+    return (len(na) > 3 and na in nb) or (len(nb) > 3 and nb in na)
+
+
+class UnionFind:
+    """Disjoint sets over row indices; the first argument of union() stays root."""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, root: int, other: int):
+        self.parent[self.find(other)] = self.find(root)
+
+
+def signature(topic: str) -> tuple[frozenset, str]:
+    """(tokens, compact form) — everything the matchers need, computed once."""
+    normalized = normalize(topic)
+    tokens = frozenset(w for w in normalized.split() if w not in STOP_WORDS and len(w) > 2)
+    return tokens, normalized.replace(' ', '')
+
+
+def seed_keys(tokens: frozenset, compact: str) -> set[str]:
+    """Lookup keys stored for a persisted cluster seed: its tokens, every
+    n-gram of its compact form and its leading n-gram."""
+    keys = {f"t:{tok}" for tok in tokens}
+    if len(compact) >= NGRAM:
+        keys.update(f"g:{compact[j:j + NGRAM]}" for j in range(len(compact) - NGRAM + 1))
+        keys.add(f"p:{compact[:NGRAM]}")
+    return keys
+
+
+def probe_keys(tokens: frozenset, compact: str) -> set[str]:
+    """Keys to look up for a signal: every seed it can match (SignalIndex.match_keys)
+    is stored under one of them. Jaccard needs a shared token; the signal
+    inside a seed means the seed holds the signal's first n-gram; a seed
+    inside the signal starts with one of the signal's n-grams."""
+    keys = {f"t:{tok}" for tok in tokens}
+    if len(compact) >= NGRAM:
+        keys.add(f"g:{compact[:NGRAM]}")
+        keys.update(f"p:{compact[j:j + NGRAM]}" for j in range(len(compact) - NGRAM + 1))
+    return keys
+
+
+class SignalIndex:
+    """Signatures and inverted indexes over the distinct topics of a batch.
+
+    A trend is tokenized once however many platforms or windows it shows up
+    in, and every index is partitioned by niche since rows never match across
+    niches. Postings hold topic keys; `key_rows` maps them back to rows.
+    Rows can be added incrementally, which the incremental radar relies on."""
+
+    def __init__(self, rows: list[dict] = ()):
+        self.rows = []
+        self.row_key = []
+        self.key_rows = []                   # key -> row indices
+        self.key_tokens = []
+        self.key_compact = []
+        self.key_niche = []
+        self.by_token = defaultdict(list)    # (niche, token) -> keys
+        self.by_gram = defaultdict(list)     # (niche, n-gram) -> keys containing it
+        self.by_prefix = defaultdict(list)   # (niche, leading n-gram) -> keys
+        self._keys = {}
+        for row in rows:
+            self.add(row)
+
+    def add(self, row: dict, tokens: frozenset | None = None) -> int:
+        """Index a row ('id', 'topic', 'niche'); returns its row index.
+        Pass `tokens` to reuse a stored token signature."""
+        i = len(self.rows)
+        self.rows.append(row)
+        niche = row['niche']
+        ident = (row['id'], niche, row['topic'])
+        k = self._keys.get(ident)
+        if k is None:
+            k = self._keys[ident] = len(self.key_rows)
+            sig_tokens, compact = signature(row['topic'])
+            tokens = sig_tokens if tokens is None else tokens
+            self.key_rows.append([])
+            self.key_tokens.append(tokens)
+            self.key_compact.append(compact)
+            self.key_niche.append(niche)
+
+            for tok in tokens:
+                self.by_token[(niche, tok)].append(k)
+            if len(compact) >= NGRAM:
+                for gram in {compact[j:j + NGRAM] for j in range(len(compact) - NGRAM + 1)}:
+                    self.by_gram[(niche, gram)].append(k)
+                self.by_prefix[(niche, compact[:NGRAM])].append(k)
+        self.key_rows[k].append(i)
+        self.row_key.append(k)
+        return i
+
+    def match_keys(self, niche: str, tokens: frozenset, compact: str, skip=lambda k: False) -> set[int]:
+        """Keys in `niche` whose topic matches (Jaccard or substring) the given signature."""
+        found = set()
+
+        # Jaccard >= threshold > 0 implies at least one shared token.
+        for tok in tokens:
+            for o in self.by_token.get((niche, tok), ()):
+                if o in found or skip(o):
+                    continue
+                other = self.key_tokens[o]
+                if len(tokens & other) / len(tokens | other) >= SIMILARITY_THRESHOLD:
+                    found.add(o)
+
+        if len(compact) >= NGRAM:
+            # Topic inside other: other holds every n-gram of topic, so scan the rarest one.
+            grams = {compact[j:j + NGRAM] for j in range(len(compact) - NGRAM + 1)}
+            rarest = min((self.by_gram.get((niche, g), ()) for g in grams), key=len)
+            for o in rarest:
+                if not skip(o) and compact in self.key_compact[o]:
+                    found.add(o)
+
+            # Other inside topic: other starts with one of topic's n-grams.
+            for j in range(len(compact) - NGRAM + 1):
+                for o in self.by_prefix.get((niche, compact[j:j + NGRAM]), ()):
+                    if not skip(o) and compact.startswith(self.key_compact[o], j):
+                        found.add(o)
+
+        return found
+
+    def candidates(self, i: int, claimed: set = frozenset()) -> list[int]:
+        """Rows in the same niche that match row i (Jaccard or substring),
+        ignoring rows whose trend id is in `claimed`."""
+        rows, key_rows = self.rows, self.key_rows
+        k = self.row_key[i]
+
+        def skip(o):
+            return o == k or rows[key_rows[o][0]]['id'] in claimed
+
+        found = []
+        for o in self.match_keys(self.key_niche[k], self.key_tokens[k], self.key_compact[k], skip):
+            found.extend(key_rows[o])
+        return found
+
+
+def cluster_rows(rows: list[dict]) -> list[dict]:
+    """Group metric rows (sorted by velocity desc) into radar clusters."""
+    index = SignalIndex(rows)
+    uf = UnionFind(len(rows))
+    processed = set()   # trend ids already claimed, as in the original pass
+    seeds = []
+
+    for i, row in enumerate(rows):
+        if row['id'] in processed:
+            continue
+        processed.add(row['id'])
+        seeds.append(i)
+
+        for j in sorted(index.candidates(i, processed)):
+            if rows[j]['id'] in processed:
+                continue
+            uf.union(i, j)
+            processed.add(rows[j]['id'])
+
+    members = defaultdict(list)
+    for i in range(len(rows)):
+        members[uf.find(i)].append(i)
+
+    clusters = []
+    for seed in seeds:
+        seed_row = rows[seed]
+        trends = [rows[j] for j in members[seed]]
+        clusters.append({
+            'main_topic': seed_row['topic'],
+            'niche': seed_row['niche'],
+            'platforms': {t['platform'] for t in trends},
+            'trends': trends,
+            'total_volume': sum(t['volume'] for t in trends),
+        })
+    return clusters
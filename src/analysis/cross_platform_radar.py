@@ -1,14 +1,20 @@
-import re
 import math
-from datetime import datetime
+from datetime import datetime, timedelta
 from collections import defaultdict
 
-from sqlalchemy import text
-from src.models.base import Session, Trend, TrendMetric, init_db
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.telemetry import stage, count
+from src.models.base import (
+    WriteSession, Trend, TrendMetric, RadarCluster, RadarMember, RadarKey, init_db,
+    get_watermark, set_watermark, bump_watermark, seal_revision, _chunks,
+)
+from src.analysis.clustering import signature, seed_keys, probe_keys, SignalIndex
 
 # ─── CONFIG ──────────────────────────────────────────────────────────
-SIMILARITY_THRESHOLD = 0.25  # Jaccard index minimum for matching
 MIN_PLATFORMS = 2            # Minimum platforms for a "gold" opportunity
+WINDOW_HOURS = 24            # Members older than this leave their cluster
+WATERMARK = 'radar_metrics'  # Last trend_metrics.revision assigned to a cluster
 
 # Platform weight: cross-platform signals from bigger platforms count more
 PLATFORM_WEIGHT = {
@@ -17,34 +23,6 @@ PLATFORM_WEIGHT = {
     'Reddit': 1.0,   # Reddit = early signal, niche communities
 }
 
-STOP_WORDS = frozenset({
-    'le', 'la', 'les', 'de', 'du', 'des', 'un', 'une', 'en', 'au', 'aux',
-    'the', 'a', 'an', 'in', 'on', 'of', 'for', 'to', 'is', 'and', 'et',
-    'vs', 'sur', 'with', 'from', 'has', 'are', 'was', 'not', 'but',
-})
-
-
-def normalize(text: str) -> str:
-    return re.sub(r'[^\w\s]', '', text.lower().replace('#', ''))
-
-
-def get_tokens(text: str) -> set[str]:
-    words = normalize(text).split()
-    return {w for w in words if w not in STOP_WORDS and len(w) > 2}
-
-
-def jaccard_similarity(a: str, b: str) -> float:
-    sa, sb = get_tokens(a), get_tokens(b)
-    if not sa or not sb:
-        return 0.0
-    return len(sa & sb) / len(sa | sb)
-
-
-def substring_match(a: str, b: str) -> bool:
-    """Check if one normalized topic contains the other (handles 'GTA 6' vs '#GTA6Leak')."""
-    na, nb = normalize(a).replace(' ', ''), normalize(b).replace(' ', '')
-    return (len(na) > 3 and na in nb) or (len(nb) > 3 and nb in na)
-
 
 def compute_opportunity_score(cluster: dict) -> float:
     """
@@ -64,73 +42,209 @@ def compute_opportunity_score(cluster: dict) -> float:
     return round(weighted_velocity * platform_bonus * (1 + volume_factor * 0.1), 1)
 
 
-def find_cross_platform_opportunities():
-    session = Session()
-
-    # Fetch all metrics from last 24h
-    results = session.execute(text("""
-        SELECT t.id, t.topic, t.niche, m.platform, m.velocity_score, m.volume
-        FROM trends t
-        JOIN trend_metrics m ON t.id = m.trend_id
-        WHERE m.timestamp > datetime('now', '-1 day')
-        ORDER BY m.velocity_score DESC
-    """)).fetchall()
+def _candidate_index(session, signals: set[tuple]) -> SignalIndex:
+    """SignalIndex over the persisted clusters that can match any of the
+    (trend_id, topic, niche) signals, found through radar_keys, in the
+    order the radar prefers them (best score first)."""
+    probes = defaultdict(set)
+    for _, topic, niche in signals:
+        probes[niche].update(probe_keys(*signature(topic)))
+    candidates = set()
+    for niche, keys in probes.items():
+        for chunk in _chunks(list(keys)):
+            candidates.update(session.execute(
+                select(RadarKey.cluster_id).where(RadarKey.niche == niche, RadarKey.key.in_(chunk))
+            ).scalars())
 
-    session.close()
-
-    if not results:
-        print("⚠️ Pas assez de données récentes pour l'analyse.")
-        return []
-
-    print(f"🔄 Analyse de {len(results)} signaux bruts...")
-
-    # Convert to dicts for easier manipulation
-    rows = [
-        {'id': r[0], 'topic': r[1], 'niche': r[2], 'platform': r[3],
-         'velocity_score': r[4] or 0, 'volume': r[5] or 0}
-        for r in results
-    ]
-
-    # ─── CLUSTERING ──────────────────────────────────────────────────
     clusters = []
-    processed = set()
-
-    for row in rows:
-        if row['id'] in processed:
-            continue
-
-        cluster = {
-            'main_topic': row['topic'],
-            'niche': row['niche'],
-            'platforms': {row['platform']},
-            'trends': [row],
-            'total_volume': row['volume'],
+    for chunk in _chunks(list(candidates)):
+        clusters.extend(session.execute(
+            select(RadarCluster.id, RadarCluster.niche, RadarCluster.main_topic,
+                   RadarCluster.signature, RadarCluster.score)
+            .where(RadarCluster.id.in_(chunk))
+        ).all())
+    index = SignalIndex()
+    for cluster_id, niche, topic, sig, _ in sorted(clusters, key=lambda c: (-(c.score or 0), c.id)):
+        index.add({'id': cluster_id, 'topic': topic, 'niche': niche}, frozenset((sig or '').split()))
+    return index
+
+
+def update_radar(session) -> dict:
+    """Bring the persisted clusters up to date with metrics written since the last run.
+
+    Only metrics whose revision is above the watermark (inserted, or
+    re-measured in place by an upsert) are assigned: to the cluster already
+    holding their trend, else to the best-scored cluster whose seed matches,
+    else to a new cluster they seed. Only the clusters of those trends and
+    the ones sharing a lookup key with them are read (radar_keys). Members older than WINDOW_HOURS expire
+    and only touched clusters are re-scored."""
+    cutoff = datetime.utcnow() - timedelta(hours=WINDOW_HOURS)
+    dirty = set()
+
+    # ─── EXPIRE ──────────────────────────────────────────────────────
+    expired = session.execute(
+        select(RadarMember.id, RadarMember.cluster_id).where(RadarMember.timestamp <= cutoff)
+    ).all()
+    for chunk in _chunks([member_id for member_id, _ in expired]):
+        session.execute(delete(RadarMember).where(RadarMember.id.in_(chunk)))
+    dirty.update(cluster_id for _, cluster_id in expired)
+
+    # ─── ASSIGN NEW SIGNALS ──────────────────────────────────────────
+    mark = get_watermark(session, WATERMARK)
+    top = seal_revision(session)
+    new_rows = session.execute(
+        select(TrendMetric.id, Trend.id, Trend.topic, Trend.niche, TrendMetric.platform,
+               TrendMetric.velocity_score, TrendMetric.volume, TrendMetric.timestamp)
+        .join(Trend, Trend.id == TrendMetric.trend_id)
+        .where(TrendMetric.revision > mark, TrendMetric.revision <= top, TrendMetric.timestamp > cutoff)
+        .order_by(TrendMetric.velocity_score.desc())
+    ).all()
+
+    members = {}
+    if new_rows:
+        trend_ids = list({row[1] for row in new_rows})
+        trend_cluster = {}
+        for chunk in _chunks(trend_ids):
+            trend_cluster.update(session.execute(
+                select(RadarMember.trend_id, RadarMember.cluster_id).where(RadarMember.trend_id.in_(chunk))
+            ).all())
+        index = _candidate_index(session, {
+            (trend_id, topic, niche) for _, trend_id, topic, niche, *_ in new_rows if trend_id not in trend_cluster
+        })
+        # Writers are serialized (WriteSession): new cluster ids can be handed out
+        # here and every new cluster written in one statement.
+        next_id = (session.execute(select(func.max(RadarCluster.id))).scalar() or 0) + 1
+        new_clusters, new_keys = [], []
+
+        for metric_id, trend_id, topic, niche, platform, velocity, volume, ts in new_rows:
+            cluster_id = trend_cluster.get(trend_id)
+            if cluster_id is None:
+                tokens, compact = signature(topic)
+                keys = index.match_keys(niche, tokens, compact)
+                if keys:
+                    cluster_id = index.rows[index.key_rows[min(keys)][0]]['id']
+                else:
+                    cluster_id, next_id = next_id, next_id + 1
+                    new_clusters.append({'id': cluster_id, 'niche': niche, 'main_topic': topic,
+                                         'signature': ' '.join(sorted(tokens))})
+                    index.add({'id': cluster_id, 'topic': topic, 'niche': niche}, tokens)
+                    new_keys.extend({'cluster_id': cluster_id, 'key': key, 'niche': niche}
+                                    for key in seed_keys(tokens, compact))
+                trend_cluster[trend_id] = cluster_id
+
+            key = (cluster_id, trend_id, platform)
+            if key not in members or metric_id > members[key]['metric_id']:
+                members[key] = {
+                    'cluster_id': cluster_id, 'trend_id': trend_id, 'metric_id': metric_id,
+                    'platform': platform, 'velocity_score': velocity or 0,
+                    'volume': volume or 0, 'timestamp': ts,
+                }
+            dirty.add(cluster_id)
+
+        if new_clusters:
+            session.execute(RadarCluster.__table__.insert(), new_clusters)
+            session.execute(RadarKey.__table__.insert(), new_keys)
+
+    if members:
+        stmt = sqlite_insert(RadarMember)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RadarMember.cluster_id, RadarMember.trend_id, RadarMember.platform],
+            set_={col: stmt.excluded[col] for col in
+                  ('metric_id', 'velocity_score', 'volume', 'timestamp')},
+            where=stmt.excluded.metric_id >= RadarMember.metric_id,   # Same id: re-measured in place
+        )
+        session.execute(stmt, list(members.values()))
+
+    # ─── RE-SCORE TOUCHED CLUSTERS ───────────────────────────────────
+    grouped = defaultdict(list)
+    for chunk in _chunks(list(dirty)):
+        for cluster_id, platform, velocity, volume in session.execute(
+            select(RadarMember.cluster_id, RadarMember.platform,
+                   RadarMember.velocity_score, RadarMember.volume)
+            .where(RadarMember.cluster_id.in_(chunk))
+        ):
+            grouped[cluster_id].append({'platform': platform, 'velocity_score': velocity, 'volume': volume})
+
+    updates = []
+    for cluster_id, trends in grouped.items():
+        platforms = {t['platform'] for t in trends}
+        cluster = {'trends': trends, 'platforms': platforms,
+                   'total_volume': sum(t['volume'] for t in trends)}
+        updates.append({
+            'id': cluster_id,
+            'platforms': ','.join(sorted(platforms)),
+            'platform_count': len(platforms),
+            'total_volume': cluster['total_volume'],
+            'score': compute_opportunity_score(cluster),
+        })
+    if updates:
+        session.execute(update(RadarCluster), updates)
+
+    empty = list(dirty - grouped.keys())
+    for chunk in _chunks(empty):
+        session.execute(delete(RadarKey).where(RadarKey.cluster_id.in_(chunk)))
+        session.execute(delete(RadarCluster).where(RadarCluster.id.in_(chunk)))
+
+    set_watermark(session, WATERMARK, max(top, mark))
+    if dirty:
+        bump_watermark(session, 'radar')
+    return {'new': len(new_rows), 'expired': len(expired), 'rescored': len(updates), 'dropped': len(empty)}
+
+
+def load_opportunities(session, limit: int | None = None) -> list[dict]:
+    """Gold clusters (>= MIN_PLATFORMS) from the persisted radar state, best first."""
+    query = (
+        select(RadarCluster)
+        .where(RadarCluster.platform_count >= MIN_PLATFORMS)
+        .order_by(RadarCluster.score.desc())
+    )
+    if limit:
+        query = query.limit(limit)
+    clusters = session.execute(query).scalars().all()
+
+    trends = defaultdict(list)
+    for chunk in _chunks([c.id for c in clusters]):
+        for cluster_id, topic, platform, velocity, volume in session.execute(
+            select(RadarMember.cluster_id, Trend.topic, RadarMember.platform,
+                   RadarMember.velocity_score, RadarMember.volume)
+            .join(Trend, Trend.id == RadarMember.trend_id)
+            .where(RadarMember.cluster_id.in_(chunk))
+            .order_by(RadarMember.velocity_score.desc())
+        ):
+            trends[cluster_id].append({'topic': topic, 'platform': platform,
+                                       'velocity_score': velocity, 'volume': volume})
+
+    return [
+        {
+            'id': c.id,
+            'main_topic': c.main_topic,
+            'niche': c.niche,
+            'platforms': set(c.platforms.split(',')),
+            'trends': trends[c.id],
+            'total_volume': c.total_volume,
+            'score': c.score,
         }
-        processed.add(row['id'])
-
-        for other in rows:
-            if other['id'] in processed:
-                continue
-
-            # Match within same niche OR if text similarity is very high
-            same_niche = other['niche'] == row['niche']
-            sim = jaccard_similarity(row['topic'], other['topic'])
-            substr = substring_match(row['topic'], other['topic'])
+        for c in clusters
+    ]
 
-            if same_niche and (sim >= SIMILARITY_THRESHOLD or substr):
-                cluster['platforms'].add(other['platform'])
-                cluster['trends'].append(other)
-                cluster['total_volume'] += other['volume']
-                processed.add(other['id'])
 
-        clusters.append(cluster)
+def find_cross_platform_opportunities(report: bool = True):
+    session = WriteSession()
+    with stage('cluster'):
+        stats = update_radar(session)
+    with stage('write'):
+        session.commit()
+    with stage('load'):
+        gold = load_opportunities(session)
+    session.close()
+    count('rows_inserted', stats['new'])
+    count('rows_updated', stats['rescored'])
 
-    # ─── FILTER & SCORE ──────────────────────────────────────────────
-    gold = [c for c in clusters if len(c['platforms']) >= MIN_PLATFORMS]
-    for c in gold:
-        c['score'] = compute_opportunity_score(c)
+    if not report:
+        return gold
 
-    gold.sort(key=lambda x: x['score'], reverse=True)
+    print(f"🔄 Radar: {stats['new']} nouveaux signaux, {stats['expired']} expirés, "
+          f"{stats['rescored']} clusters recalculés.")
 
     # ─── REPORT ──────────────────────────────────────────────────────
     print(f"\n💎 CROSS-PLATFORM RADAR | {datetime.now().strftime('%Y-%m-%d %H:%M')}")
@@ -153,4 +267,5 @@ def find_cross_platform_opportunities():
 
 
 if __name__ == "__main__":
+    init_db()
     find_cross_platform_opportunities()
\ No newline at end of file
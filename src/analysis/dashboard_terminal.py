@@ -1,40 +1,224 @@
-from datetime import datetime
-from sqlalchemy import text
-from src.models.base import Session, init_db
+"""
+Terminal dashboard — top trends per niche over the last 24h.
 
+    python -m src.analysis.dashboard_terminal [--watch] [--interval 5] [--top 5]
 
-def show_dashboard():
-    session = Session()
+--watch keeps one read-only connection and a top-K min-heap per niche.
+Each tick only reads metric rows above a revision watermark (new rows and
+rows re-measured in place), expires entries that left the window and
+redraws the lines that changed. A niche is refilled from the DB when one
+of its rows expires or a row on the board changes in place.
+"""
+import sys
+import time
+import heapq
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from src.models import readonly
+from src.collectors.niche_classifier import niche_names
 
-    results = session.execute(text("""
-        SELECT t.niche, t.topic, m.volume, m.velocity_score, m.platform
-        FROM trends t
-        JOIN trend_metrics m ON t.id = m.trend_id
-        WHERE m.timestamp > datetime('now', '-1 day')
-        ORDER BY m.velocity_score DESC
-    """)).fetchall()
+# ─── CONFIG ──────────────────────────────────────────────────────────
+TOP_K = 5
+WINDOW_HOURS = 24
+POLL_SECONDS = 5.0
+SHOWN_FIRST = ('Sport', 'Cinema', 'Music')   # Board order; other niches follow niches.json
 
-    session.close()
+TOP_SQL = """
+    SELECT m.id, t.topic, m.volume, m.velocity_score, m.platform, m.timestamp
+    FROM trend_metrics m
+    JOIN trends t ON t.id = m.trend_id
+    WHERE t.niche = ? AND m.timestamp > ?
+    ORDER BY m.velocity_score DESC
+    LIMIT ?
+"""
+DELTA_SQL = """
+    SELECT m.revision, m.id, t.niche, t.topic, m.volume, m.velocity_score, m.platform, m.timestamp
+    FROM trend_metrics m
+    JOIN trends t ON t.id = m.trend_id
+    WHERE m.revision > ?
+"""
+MARK_SQL = "SELECT COALESCE(MAX(revision), 0) FROM trend_metrics"
 
-    print(f"\n🚀 VIRAL WATCH DASHBOARD | {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    print("=" * 60)
 
-    if not results:
-        print("⚠️ Aucune donnée récente. Lance les collecteurs !")
-        return
+def _cutoff() -> str:
+    # Same text format SQLAlchemy stores (UTC): plain string comparison works.
+    return (datetime.utcnow() - timedelta(hours=WINDOW_HOURS)).strftime("%Y-%m-%d %H:%M:%S")
 
-    for niche in ['Sport', 'Cinema', 'Music']:
-        print(f"\n📱 NICHE: {niche.upper()}")
-        subset = [r for r in results if r[0] == niche][:5]
 
+class NicheTop:
+    """Top-K metric rows (id, topic, volume, velocity, platform, timestamp) of one
+    niche. A min-heap on velocity: heap[0] is the row the next better one evicts."""
+
+    def __init__(self, k: int = TOP_K):
+        self.k = k
+        self.heap = []
+        self.ids = set()
+
+    def seed(self, conn, niche: str, cutoff: str):
+        self.heap, self.ids = [], set()
+        for row in conn.execute(TOP_SQL, (niche, cutoff, self.k)):
+            self.offer(row)
+
+    def offer(self, row: tuple) -> bool:
+        if row[0] in self.ids:
+            return False
+        item = (row[3] or 0, row[0], row)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item > self.heap[0]:
+            self.ids.discard(heapq.heapreplace(self.heap, item)[1])
+        else:
+            return False
+        self.ids.add(row[0])
+        return True
+
+    def expire(self, cutoff: str) -> bool:
+        """Drop rows older than the window. True if any left: rows once
+        evicted may now belong in the top, so the caller re-seeds."""
+        kept = [item for item in self.heap if item[2][5] > cutoff]
+        if len(kept) == len(self.heap):
+            return False
+        self.heap = kept
+        heapq.heapify(self.heap)
+        self.ids = {item[1] for item in kept}
+        return True
+
+    def rows(self) -> list[tuple]:
+        return [item[2] for item in sorted(self.heap, reverse=True)]
+
+
+def load_board(conn, k: int = TOP_K) -> dict[str, NicheTop]:
+    cutoff = _cutoff()
+    board = {}
+    for niche in niche_names(lead=SHOWN_FIRST):
+        board[niche] = NicheTop(k)
+        board[niche].seed(conn, niche, cutoff)
+    return board
+
+
+def render(board: dict[str, NicheTop] | None, status: str = "") -> list[str]:
+    lines = ["", f"🚀 VIRAL WATCH DASHBOARD | {datetime.now().strftime('%Y-%m-%d %H:%M')}{status}", "=" * 60]
+    if not board or not any(top.heap for top in board.values()):
+        lines.append("⚠️ Aucune donnée récente. Lance les collecteurs !")
+        return lines
+
+    for niche, top in board.items():
+        lines += ["", f"📱 NICHE: {niche.upper()}"]
+        subset = top.rows()
         if not subset:
-            print("   (Pas de données)")
+            lines.append("   (Pas de données)")
             continue
+        for i, (_, topic, volume, velocity, platform, _) in enumerate(subset, 1):
+            lines.append(f"  {i}. [Vel: {int(velocity or 0)}] {topic[:60]}")
+            lines.append(f"     {platform} | Vol: {volume or 0:,}")
+    return lines
+
+
+def show_dashboard(k: int = TOP_K):
+    # Plain sqlite3, read-only: the dashboard must start instantly.
+    try:
+        conn = readonly.connect()
+        board = load_board(conn, k)
+        conn.close()
+    except sqlite3.OperationalError:
+        board = None
+    print("\n".join(render(board)))
+
+
+# ─── WATCH MODE ─────────────────────────────────────────────────────
+class Screen:
+    """Redraws only the lines that changed since the previous frame.
+    Not a terminal (piped to a log): the whole frame, only when it changed."""
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.ansi = stream.isatty()
+        self.lines = []
+
+    def draw(self, lines: list[str]) -> int:
+        if not self.ansi:
+            changed = lines[2:] != self.lines[2:]      # Ignore the clock in the header
+            if changed:
+                self.stream.write("\n".join(lines) + "\n")
+            self.lines = lines
+            self.stream.flush()
+            return len(lines) if changed else 0
+
+        out = ["\x1b[?25l\x1b[2J"] if not self.lines else []
+        changed = 0
+        for i, line in enumerate(lines):
+            if i >= len(self.lines) or self.lines[i] != line:
+                out.append(f"\x1b[{i + 1};1H{line}\x1b[K")
+                changed += 1
+        if len(lines) < len(self.lines):
+            out.append(f"\x1b[{len(lines) + 1};1H\x1b[J")
+        out.append(f"\x1b[{len(lines) + 1};1H")
+        self.stream.write("".join(out))
+        self.stream.flush()
+        self.lines = lines
+        return changed
+
+    def close(self):
+        if self.ansi:
+            self.stream.write("\x1b[?25h\n")
+            self.stream.flush()
+
+
+def watch(interval: float = POLL_SECONDS, k: int = TOP_K, stream=sys.stdout):
+    screen = Screen(stream)
+    conn, board, mark = None, None, 0
+    try:
+        while True:
+            status = f" | ⟳ {interval:g}s"
+            try:
+                if conn is None:
+                    conn = readonly.connect()
+                if board is None:
+                    mark = conn.execute(MARK_SQL).fetchone()[0]
+                    board = load_board(conn, k)
+                else:
+                    cutoff = _cutoff()
+                    changed = set()
+                    for revision, metric_id, niche, *row in conn.execute(DELTA_SQL, (mark,)):
+                        mark = max(mark, revision)
+                        top = board.get(niche)
+                        if top is None:
+                            continue
+                        if metric_id in top.ids:
+                            changed.add(niche)   # Re-measured in place: its rank may have dropped
+                        elif row[4] > cutoff:
+                            top.offer((metric_id, *row))
+                    for niche, top in board.items():
+                        if top.expire(cutoff) or niche in changed:
+                            top.seed(conn, niche, cutoff)
+            except sqlite3.OperationalError as e:
+                # No DB yet, or it was replaced: reconnect on the next tick.
+                if conn is not None:
+                    conn.close()
+                conn, board = None, None
+                status += f" | ⚠️ {e}"
+            screen.draw(render(board, status))
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        screen.close()
+        if conn is not None:
+            conn.close()
+
 
-        for i, row in enumerate(subset, 1):
-            print(f"  {i}. [Vel: {int(row[3])}] {row[1][:60]}")
-            print(f"     {row[4]} | Vol: {row[2]:,}")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Top trends per niche (last 24h)")
+    parser.add_argument("--watch", action="store_true", help="stay open and refresh in place")
+    parser.add_argument("--interval", type=float, default=POLL_SECONDS, help=f"seconds between polls (default {POLL_SECONDS:g})")
+    parser.add_argument("--top", type=int, default=TOP_K, help=f"rows per niche (default {TOP_K})")
+    args = parser.parse_args(argv)
+    if args.watch:
+        watch(args.interval, args.top)
+    else:
+        show_dashboard(args.top)
 
 
 if __name__ == "__main__":
-    show_dashboard()
\ No newline at end of file
+    main()
@@ -5,18 +5,23 @@ from datetime import datetime
 
 from sqlalchemy import text
 from src.models.base import Session, init_db
+from src.telemetry import stage
 from src.analysis.cross_platform_radar import find_cross_platform_opportunities
+from src.analysis.timeseries import series_batch, sparkline
+from src.collectors.niche_classifier import niche_names, niche_emoji
 
 # ─── CONFIG ──────────────────────────────────────────────────────────
-DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL", "")
-
-# Niche emojis for visual scanning
-NICHE_EMOJI = {
-    'Cinema': '🎬',
-    'Sport': '⚽',
-    'Music': '🎵',
-    'General': '📌',
-}
+DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL", "")   # Full briefing
+
+# One channel per niche, as Niche=webhook pairs: "Cinema=https://...,Sport=https://..."
+NICHE_WEBHOOKS = dict(
+    pair.strip().split("=", 1)
+    for pair in os.environ.get("DISCORD_NICHE_WEBHOOKS", "").split(",")
+    if "=" in pair
+)
+
+SPARK_RESOLUTION = '4h'      # Velocity trail shown next to each top trend
+SPARK_DAYS = 2
 
 PLATFORM_EMOJI = {
     'Google': '🔍',
@@ -25,29 +30,43 @@ PLATFORM_EMOJI = {
 }
 
 
-def build_briefing() -> dict:
-    """Build the Discord embed payload from current data."""
+def fetch_top_trends(limit: int = 30) -> list:
+    """Top trends by velocity (last 24h): (topic, niche, platform, velocity, volume, trend_id)."""
     session = Session()
-
-    # Top trends by velocity (last 24h)
     top_trends = session.execute(text("""
-        SELECT t.topic, t.niche, m.platform, m.velocity_score, m.volume
+        SELECT t.topic, t.niche, m.platform, m.velocity_score, m.volume, t.id
         FROM trends t
         JOIN trend_metrics m ON t.id = m.trend_id
         WHERE m.timestamp > datetime('now', '-1 day')
         ORDER BY m.velocity_score DESC
-        LIMIT 30
-    """)).fetchall()
-
+        LIMIT :limit
+    """), {'limit': limit}).fetchall()
     session.close()
+    return top_trends
+
+
+def fetch_trails(trend_ids) -> dict[int, dict[str, list[dict]]]:
+    """Recent bucketed history of the listed trends, in one query."""
+    session = Session()
+    try:
+        return series_batch(session, trend_ids, SPARK_RESOLUTION, SPARK_DAYS)
+    finally:
+        session.close()
+
+
+def build_sections() -> list[tuple[str | None, dict]]:
+    """Briefing embeds in order, each with the niche it covers
+    (None: every channel, '*': the main channel only)."""
+    top_trends = fetch_top_trends()
+    trails = fetch_trails(t[5] for t in top_trends)
 
     # Cross-platform gold opportunities
-    gold = find_cross_platform_opportunities()
+    gold = find_cross_platform_opportunities(report=False)
 
     # ─── BUILD EMBED ─────────────────────────────────────────────────
     now = datetime.now().strftime("%A %d %B %Y — %H:%M")
 
-    embeds = []
+    sections = []
 
     # Main header embed
     header = {
@@ -55,13 +74,13 @@ def build_briefing() -> dict:
         "description": f"*Généré le {now}*\nVoici les sujets à plus fort potentiel viral pour aujourd'hui.",
         "color": 0xFF4500,  # Reddit orange
     }
-    embeds.append(header)
+    sections.append((None, header))
 
     # Gold opportunities section
     if gold:
         gold_lines = []
         for i, opp in enumerate(gold[:5], 1):
-            niche_e = NICHE_EMOJI.get(opp['niche'], '📌')
+            niche_e = niche_emoji(opp['niche'])
             platforms = " + ".join(
                 PLATFORM_EMOJI.get(p, p) for p in sorted(opp['platforms'])
             )
@@ -70,15 +89,15 @@ def build_briefing() -> dict:
                 f"   Score: `{opp['score']}` | {platforms}"
             )
 
-        embeds.append({
+        sections.append(('*', {
             "title": "💎 SIGNAUX CROSS-PLATFORM (Or massif)",
             "description": "\n\n".join(gold_lines) if gold_lines else "Aucun signal croisé.",
             "color": 0xFFD700,
-        })
+        }))
 
     # Top by niche
-    for niche in ['Cinema', 'Sport', 'Music']:
-        emoji = NICHE_EMOJI.get(niche, '📌')
+    for niche in niche_names():
+        emoji = niche_emoji(niche)
         niche_trends = [t for t in top_trends if t[1] == niche][:5]
 
         if not niche_trends:
@@ -87,39 +106,64 @@ def build_briefing() -> dict:
         lines = []
         for i, t in enumerate(niche_trends, 1):
             plat_e = PLATFORM_EMOJI.get(t[2], t[2])
+            trail = [p['velocity_max'] for p in trails.get(t[5], {}).get(t[2], [])]
             lines.append(
                 f"**{i}.** {t[0][:60]}\n"
                 f"   {plat_e} Vel: `{int(t[3])}` | Vol: `{t[4]:,}`"
+                + (f" | {sparkline(trail)}" if len(trail) > 1 else "")
             )
 
-        embeds.append({
+        sections.append((niche, {
             "title": f"{emoji} TOP {niche.upper()}",
             "description": "\n\n".join(lines),
             "color": 0x5865F2,
-        })
+        }))
+
+    return sections
 
-    return {"embeds": embeds}
+
+def build_briefing() -> dict:
+    """Build the Discord embed payload from current data (before splitting)."""
+    return {"embeds": [embed for _, embed in build_sections()]}
+
+
+def route_sections(sections, default_url: str = DISCORD_WEBHOOK_URL,
+                   niche_webhooks: dict | None = None) -> dict[str, list[dict]]:
+    """{webhook: embeds}: the default webhook gets everything, a niche
+    webhook the header and its own niche's section."""
+    niche_webhooks = NICHE_WEBHOOKS if niche_webhooks is None else niche_webhooks
+    routes = {}
+    if default_url:
+        routes[default_url] = [embed for _, embed in sections]
+    for niche, url in niche_webhooks.items():
+        embeds = [embed for scope, embed in sections if scope is None or scope == niche]
+        if len(embeds) > 1:                                # More than the header alone
+            routes.setdefault(url, []).extend(embeds)
+    return routes
 
 
 def send_briefing():
-    """Send the briefing to Discord via webhook."""
-    if not DISCORD_WEBHOOK_URL:
+    """Send the briefing to every configured Discord webhook."""
+    if not DISCORD_WEBHOOK_URL and not NICHE_WEBHOOKS:
         print("⚠️ DISCORD_WEBHOOK_URL not set. Printing to stdout instead.")
         payload = build_briefing()
         print(json.dumps(payload, indent=2, ensure_ascii=False))
         return
 
-    import requests
+    from src.analysis.discord_delivery import deliver, mask
 
-    payload = build_briefing()
-    try:
-        resp = requests.post(DISCORD_WEBHOOK_URL, json=payload, timeout=10)
-        if resp.status_code in (200, 204):
-            print(f"✅ Briefing envoyé sur Discord à {datetime.now().strftime('%H:%M')}")
-        else:
-            print(f"❌ Discord error: {resp.status_code} — {resp.text[:200]}")
-    except Exception as e:
-        print(f"❌ Discord send failed: {e}")
+    with stage('query'):
+        routes = route_sections(build_sections())
+    with stage('send'):
+        results = deliver(routes)
+
+    failed = {url: r for url, r in results.items() if r['sent'] < r['messages']}
+    messages = sum(r['sent'] for r in results.values())
+    if not failed:
+        print(f"✅ Briefing envoyé sur Discord à {datetime.now().strftime('%H:%M')} "
+              f"({messages} messages, {len(results)} webhooks)")
+    for url, r in failed.items():
+        print(f"❌ Discord {mask(url)}: {r['sent']}/{r['messages']} messages envoyés")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,239 @@
+"""
+Discord delivery — webhook messages over pooled connections, within Discord's limits.
+
+    deliver({webhook_url: [embed, ...], ...})
+
+- Embeds are packed into as few messages as Discord accepts: at most 10
+  embeds and 6000 characters per message, 4096 per description. A longer
+  description is cut on paragraph boundaries into continuation embeds.
+- Webhooks are served concurrently; the messages of one webhook are sent
+  in order, one after the other.
+- Every route follows its X-RateLimit-* headers (RateBucket): `remaining`
+  requests until the reset, then a full bucket. Routes reporting the same
+  X-RateLimit-Bucket share one. A 429 pauses the bucket (or every bucket,
+  when global) for retry_after and the message is retried; 5xx and network
+  errors back off.
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.telemetry import count, propagate
+from src.collectors.http_pool import make_session
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+MAX_EMBEDS = 10              # Per message
+MAX_MESSAGE_CHARS = 6000     # Sum over every embed of a message
+MAX_DESCRIPTION = 4096
+MAX_TITLE = 256
+
+WEBHOOK_LIMIT = 5            # Discord's webhook bucket until headers say otherwise
+MAX_WORKERS = 8              # Webhooks in flight at once
+MAX_RETRIES = 5              # Attempts per message
+BACKOFF = 1.0                # Seconds, doubled per failed attempt (5xx / network)
+TIMEOUT = 10
+
+
+def embed_length(embed: dict) -> int:
+    """Characters Discord counts towards the 6000 limit."""
+    total = len(embed.get('title', '')) + len(embed.get('description', ''))
+    total += len(embed.get('footer', {}).get('text', '')) + len(embed.get('author', {}).get('name', ''))
+    for field in embed.get('fields', ()):
+        total += len(field.get('name', '')) + len(field.get('value', ''))
+    return total
+
+
+def _cut(text: str, size: int) -> list[str]:
+    """Pieces of at most `size` chars, cut between paragraphs, else lines, else anywhere."""
+    pieces = []
+    while len(text) > size:
+        cut = text.rfind("\n\n", 0, size)
+        if cut <= 0:
+            cut = text.rfind("\n", 0, size)
+        if cut <= 0:
+            cut = size
+        pieces.append(text[:cut].rstrip())
+        text = text[cut:].lstrip("\n")
+    pieces.append(text)
+    return pieces
+
+
+def fit_embed(embed: dict) -> list[dict]:
+    """One embed, or several when its description is over the limit."""
+    embed = dict(embed, title=embed.get('title', '')[:MAX_TITLE]) if 'title' in embed else embed
+    budget = min(MAX_DESCRIPTION, MAX_MESSAGE_CHARS - (embed_length(embed) - len(embed.get('description', ''))))
+    description = embed.get('description', '')
+    if len(description) <= budget:
+        return [embed]
+
+    parts = _cut(description, budget - len(" (suite)"))
+    out = [dict(embed, description=parts[0])]
+    for part in parts[1:]:
+        follow = {k: v for k, v in embed.items() if k not in ('fields', 'footer', 'image', 'thumbnail')}
+        if 'title' in follow:
+            follow['title'] = f"{follow['title'][:MAX_TITLE - 8]} (suite)"
+        follow['description'] = part
+        out.append(follow)
+    return out
+
+
+def split_messages(embeds: list[dict]) -> list[dict]:
+    """Message payloads carrying `embeds` in order, each within Discord's limits."""
+    messages, current, size = [], [], 0
+    for embed in (piece for e in embeds for piece in fit_embed(e)):
+        length = embed_length(embed)
+        if current and (len(current) == MAX_EMBEDS or size + length > MAX_MESSAGE_CHARS):
+            messages.append({'embeds': current})
+            current, size = [], 0
+        current.append(embed)
+        size += length
+    if current:
+        messages.append({'embeds': current})
+    return messages
+
+
+def mask(url: str) -> str:
+    """Webhook URL without its token, for logs."""
+    head, _, _ = url.rstrip("/").rpartition("/")
+    return f"{head}/…"
+
+
+class RateBucket:
+    """Discord's bucket model: `remaining` requests until `reset_at`, then `limit` again.
+
+    Unlike http_pool.TokenBucket nothing is spread over the window: Discord
+    refills the whole bucket at once, so waiting only happens when it is empty."""
+
+    def __init__(self, limit: int = WEBHOOK_LIMIT):
+        self.limit = limit
+        self.remaining = limit
+        self.reset_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self.reset_at and self.remaining <= 0:
+                    self.remaining = self.limit
+                if self.remaining > 0:
+                    self.remaining -= 1
+                    return
+                wait = self.reset_at - now
+            time.sleep(wait)
+
+    def update(self, limit: int | None, remaining: int, reset_after: float):
+        with self._lock:
+            self.limit = limit or self.limit
+            self.remaining = remaining
+            self.reset_at = time.monotonic() + reset_after
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.remaining = 0
+            self.reset_at = max(self.reset_at, time.monotonic() + seconds)
+
+
+class RouteLimits:
+    """Rate buckets per webhook, merged when Discord reports a shared bucket."""
+
+    def __init__(self):
+        self._by_url = {}
+        self._by_bucket = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url: str) -> RateBucket:
+        with self._lock:
+            if url not in self._by_url:
+                self._by_url[url] = RateBucket()
+            return self._by_url[url]
+
+    def update(self, url: str, headers):
+        bucket = headers.get("X-RateLimit-Bucket")
+        with self._lock:
+            if bucket:
+                shared = self._by_bucket.setdefault(bucket, self._by_url[url])
+                self._by_url[url] = shared
+            limiter = self._by_url[url]
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None:
+            try:
+                limit = headers.get("X-RateLimit-Limit")
+                limiter.update(int(limit) if limit else None, int(remaining), float(reset_after))
+            except ValueError:
+                pass
+
+    def pause(self, url: str, seconds: float, is_global: bool = False):
+        with self._lock:
+            limiters = set(self._by_url.values()) if is_global else {self._by_url[url]}
+        for limiter in limiters:
+            limiter.pause(seconds)
+
+
+def _retry_after(resp) -> tuple[float, bool]:
+    try:
+        body = resp.json()
+    except ValueError:
+        body = {}
+    value = body.get('retry_after') or resp.headers.get("Retry-After") or BACKOFF
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        seconds = BACKOFF
+    is_global = bool(body.get('global')) or resp.headers.get("X-RateLimit-Global") == "true"
+    return max(seconds, 0.05), is_global
+
+
+def send_message(http, url: str, payload: dict, limits: RouteLimits) -> bool:
+    """POST one message, retrying 429s, 5xx and network errors. True once accepted."""
+    limiter = limits.limiter(url)
+    for attempt in range(1, MAX_RETRIES + 1):
+        limiter.acquire()
+        try:
+            resp = http.post(url, json=payload, timeout=TIMEOUT)
+        except Exception as e:
+            reason, wait = f"exception: {e}", BACKOFF * 2 ** (attempt - 1)
+        else:
+            limits.update(url, resp.headers)
+            limiter = limits.limiter(url)
+            if resp.status_code in (200, 204):
+                return True
+            if resp.status_code == 429:
+                wait, is_global = _retry_after(resp)
+                limits.pause(url, wait, is_global)
+                reason, wait = f"rate-limited{' (global)' if is_global else ''}, retry in {wait:.1f}s", 0
+            elif resp.status_code >= 500:
+                reason, wait = f"HTTP {resp.status_code}", BACKOFF * 2 ** (attempt - 1)
+            else:
+                print(f"  ❌ Discord {mask(url)}: HTTP {resp.status_code} — {resp.text[:200]}")
+                return False
+        if attempt < MAX_RETRIES:
+            print(f"  ⚠️ Discord {mask(url)}: {reason} ({attempt}/{MAX_RETRIES})")
+            count('http_retries')
+            time.sleep(wait)
+    print(f"  ❌ Discord {mask(url)}: abandon après {MAX_RETRIES} essais ({reason})")
+    return False
+
+
+def deliver(routes: dict[str, list[dict]], http=None, max_workers: int = MAX_WORKERS) -> dict[str, dict]:
+    """Send each webhook its embeds, split into as many messages as needed.
+    Returns {webhook_url: {'messages': n, 'sent': n}}; a webhook stops at
+    its first failed message so the rest never arrives out of order."""
+    routes = {url: split_messages(embeds) for url, embeds in routes.items() if embeds}
+    if not routes:
+        return {}
+    http = http or make_session(pool_size=max_workers)
+    limits = RouteLimits()
+
+    def task(url, messages):
+        sent = 0
+        for payload in messages:
+            if not send_message(http, url, payload, limits):
+                break
+            sent += 1
+        return {'messages': len(messages), 'sent': sent}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(routes))) as pool:
+        futures = {url: pool.submit(propagate(task), url, messages) for url, messages in routes.items()}
+        return {url: future.result() for url, future in futures.items()}
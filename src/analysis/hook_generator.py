@@ -5,6 +5,12 @@ to generate viral video hooks from today's top trends.
 from datetime import datetime
 from sqlalchemy import text
 from src.models.base import Session, init_db
+from src.collectors.niche_classifier import niche_names
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+# Prompt order, and which niche keeps a topic listed under several; other
+# niches follow niches.json.
+SHOWN_FIRST = ('Sport', 'Cinema', 'Music')
 
 
 def generate_viral_brief():
@@ -38,7 +44,7 @@ def generate_viral_brief():
     lines.append(f"\n# DONNÉES DU {datetime.now().strftime('%d/%m/%Y')}")
 
     seen = set()
-    for niche in ['Sport', 'Cinema', 'Music']:
+    for niche in niche_names(lead=SHOWN_FIRST):
         subset = [r for r in results if r[0] == niche][:2]
         for row in subset:
             topic = row[1]
@@ -0,0 +1,197 @@
+"""
+Momentum engine — real velocity from trend_metrics history.
+
+    python -m src.analysis.momentum [--hours 72]
+
+The collectors' velocity_score is a one-snapshot heuristic. This pass loads
+the recent scan windows into one DataFrame and, per (trend, platform) series:
+
+- growth_rate:   change in log-volume per metric window (0.69 ≈ doubled)
+- acceleration:  change in growth_rate per metric window
+
+(windows are VIRAL_WINDOW_MINUTES long, the re-poll interval by default)
+- ewma_velocity: growth_rate smoothed with an EWMA over the last windows
+
+Everything is computed in a single vectorized pass; only rows whose
+values changed are written back, in one executemany. The last sample before
+the loaded range is read along with it and seeds each series with its
+stored growth and EWMA, so a run continues the previous ones instead of
+restarting every series at the edge of the range (context rows are never
+written).
+"""
+import time
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from src import telemetry
+from src.models.base import WriteSession, init_db, bump_watermark
+from src.models.config import WINDOW_MINUTES
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+HISTORY_HOURS = 72      # Windows recomputed per run
+WINDOW_HOURS = WINDOW_MINUTES / 60   # One metric window; rates are expressed per window
+EWMA_SPAN = 3           # Windows
+MIN_GAP_HOURS = WINDOW_HOURS / 8    # Floor on the time between two samples
+TOLERANCE = 1e-4        # Smaller differences with the stored value are not written
+
+# Driver-level SQL: rows come back as plain tuples, no per-value type processing.
+LOAD_SQL = """
+    SELECT id, trend_id, platform, volume, timestamp, growth_rate, acceleration, ewma_velocity
+    FROM trend_metrics
+    WHERE timestamp > ?
+"""
+
+# Latest sample at or before the range start of every series present in it.
+CONTEXT_SQL = """
+    SELECT m.id, m.trend_id, m.platform, m.volume, m.timestamp, m.growth_rate, m.acceleration, m.ewma_velocity
+    FROM (SELECT DISTINCT trend_id, platform FROM trend_metrics WHERE timestamp > ?) s
+    JOIN trend_metrics m ON m.id = (
+        SELECT x.id FROM trend_metrics x
+        WHERE x.trend_id = s.trend_id AND x.platform = s.platform AND x.timestamp <= ?
+        ORDER BY x.timestamp DESC LIMIT 1
+    )
+"""
+
+UPDATE_SQL = text("""
+    UPDATE trend_metrics
+    SET growth_rate = :growth_rate, acceleration = :acceleration, ewma_velocity = :ewma_velocity
+    WHERE id = :id
+""")
+
+COLUMNS = ['id', 'trend_id', 'platform', 'volume', 'timestamp', 'growth_rate', 'acceleration', 'ewma_velocity']
+OUTPUTS = ['growth_rate', 'acceleration', 'ewma_velocity']
+
+
+def compute_momentum(df: pd.DataFrame) -> pd.DataFrame:
+    """Add growth_rate, acceleration and ewma_velocity to metric rows
+    ('trend_id', 'platform', 'volume', 'timestamp'). The first sample of a
+    series has no growth (NaN), the first two no acceleration.
+
+    Rows flagged in an optional boolean 'context' column start their series
+    with the 'growth_rate' / 'ewma_velocity' they carry (computed on an
+    earlier run) and keep them."""
+    df = df.sort_values(['trend_id', 'platform', 'timestamp'], kind='stable').reset_index(drop=True)
+    same = (df['trend_id'].eq(df['trend_id'].shift())) & (df['platform'].eq(df['platform'].shift()))
+
+    windows = df['timestamp'].diff().dt.total_seconds().div(3600).clip(lower=MIN_GAP_HOURS) / WINDOW_HOURS
+    log_volume = np.log1p(df['volume'].clip(lower=0).astype(float))
+
+    growth = log_volume.diff().div(windows).where(same)
+    smoothed = growth
+    has_growth = same
+    if 'context' in df:
+        context = df['context'].astype(bool)
+        growth = growth.mask(context, df['growth_rate'])
+        smoothed = growth.mask(context, df['ewma_velocity'])
+        has_growth = same | context
+    accel = growth.diff().div(windows).where(same & has_growth.shift(fill_value=False))
+
+    if 'context' in df:
+        accel = accel.mask(context, df['acceleration'])
+    df['growth_rate'] = growth
+    df['acceleration'] = accel
+    df['ewma_velocity'] = segmented_ewma(smoothed.to_numpy(dtype=float), ~same.to_numpy())
+    return df
+
+
+def segmented_ewma(values: np.ndarray, starts: np.ndarray, span: int = EWMA_SPAN) -> np.ndarray:
+    """EWMA (adjust=False, NaN skipped) restarting wherever `starts` is True.
+
+    Steps over the position inside each series rather than over series:
+    a handful of vectorized steps (series length) for any number of series."""
+    alpha = 2 / (span + 1)
+    n = len(values)
+    index = np.arange(n)
+    position = index - np.maximum.accumulate(np.where(starts, index, 0))
+    order = np.argsort(position, kind='stable')
+    bounds = np.searchsorted(position[order], np.arange(position.max() + 2))
+
+    out = np.full(n, np.nan)
+    for k in range(len(bounds) - 1):
+        rows = order[bounds[k]:bounds[k + 1]]
+        current = values[rows]
+        if k == 0:
+            out[rows] = current
+            continue
+        prev = out[rows - 1]
+        smoothed = prev + alpha * (current - prev)
+        out[rows] = np.where(np.isnan(prev), current, np.where(np.isnan(current), prev, smoothed))
+    return out
+
+
+def _changed(new: pd.Series, old: pd.Series) -> np.ndarray:
+    same = (new.isna() & old.isna()) | ((new - old).abs() <= TOLERANCE)
+    return ~same.to_numpy()
+
+
+def update_momentum(session, hours: int = HISTORY_HOURS) -> dict:
+    """Recompute momentum over the last `hours` and write back changed rows."""
+    since = (datetime.utcnow() - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S.%f")
+    with telemetry.stage('load'):
+        conn = session.connection()
+        rows = conn.exec_driver_sql(LOAD_SQL, (since,)).fetchall()
+        context = conn.exec_driver_sql(CONTEXT_SQL, (since, since)).fetchall() if rows else []
+    if not rows:
+        return {'rows': 0, 'updated': 0}
+
+    with telemetry.stage('score'):
+        df = pd.DataFrame.from_records(rows, columns=COLUMNS)
+        stored = df[['id', *OUTPUTS]].set_index('id')
+        df = df.assign(context=False)
+        if context:
+            df = pd.concat([df, pd.DataFrame.from_records(context, columns=COLUMNS).assign(context=True)],
+                           ignore_index=True)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df[OUTPUTS] = df[OUTPUTS].astype(float)
+
+        df = compute_momentum(df)
+        df = df[~df['context']].set_index('id')
+        df[OUTPUTS] = df[OUTPUTS].round(6)
+        stored = stored.reindex(df.index).astype(float)
+        changed = np.zeros(len(df), dtype=bool)
+        for col in OUTPUTS:
+            changed |= _changed(df[col], stored[col])
+
+    with telemetry.stage('write'):
+        out = df.loc[changed, OUTPUTS].astype(object)
+        out = out.where(out.notna(), None)
+        params = [
+            {'id': int(i), 'growth_rate': g, 'acceleration': a, 'ewma_velocity': e}
+            for i, g, a, e in zip(out.index, out['growth_rate'], out['acceleration'], out['ewma_velocity'])
+        ]
+        if params:
+            session.execute(UPDATE_SQL, params)
+            bump_watermark(session, 'momentum')
+    telemetry.count('rows_updated', len(params))
+    telemetry.count('rows_skipped', len(df) - len(params))
+    return {'rows': len(df), 'updated': len(params)}
+
+
+def run(hours: int = HISTORY_HOURS) -> dict:
+    session = WriteSession()
+    try:
+        stats = update_momentum(session, hours)
+        session.commit()
+    finally:
+        session.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute growth / acceleration / EWMA momentum")
+    parser.add_argument("--hours", type=int, default=HISTORY_HOURS, help=f"history loaded (default {HISTORY_HOURS})")
+    args = parser.parse_args()
+
+    init_db()
+    started = time.perf_counter()
+    stats = run(args.hours)
+    print(f"📈 Momentum : {stats['rows']:,} métriques analysées, {stats['updated']:,} mises à jour "
+          f"en {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Time series — a trend's (or a radar cluster's) metrics per platform, bucketed.
+
+    python -m src.analysis.timeseries --trend 42 [--resolution day] [--days 7]
+    python -m src.analysis.timeseries --cluster 7 --resolution 4h
+
+Buckets are aligned on UTC epoch multiples of the resolution (weeks start
+on Monday) and aggregated in SQLite: max volume, mean / max velocity, mean
+growth and the number of raw samples folded in. Reads go through the
+(trend_id, platform, timestamp) index, which also covers volume, velocity
+and growth (migrations 5 and 10). series_batch() fetches hundreds of trends in one
+statement (ids passed as one JSON array).
+"""
+import json
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from src.models.base import Session, Trend
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+RESOLUTIONS = {'4h': 4 * 3600, 'day': 86400, 'week': 7 * 86400}
+WEEK_OFFSET = 3 * 86400      # 1970-01-01 was a Thursday: shift so weeks start on Monday
+DEFAULT_DAYS = 7
+SPARK = "▁▂▃▄▅▆▇█"
+
+SERIES_SQL = """
+    SELECT trend_id, platform,
+           (CAST(strftime('%s', timestamp) AS INTEGER) + ?) / ? AS bucket,
+           MAX(volume), AVG(velocity_score), MAX(velocity_score), AVG(growth_rate), COUNT(*)
+    FROM trend_metrics
+    WHERE trend_id IN (SELECT value FROM json_each(?)) AND timestamp > ?
+    GROUP BY trend_id, platform, bucket
+    ORDER BY trend_id, platform, bucket
+"""
+
+# Member trends of a cluster folded per platform: volumes add up, velocity keeps the best trend.
+CLUSTER_SQL = """
+    SELECT platform, bucket, SUM(volume), MAX(velocity), MAX(velocity_max), AVG(growth), SUM(samples)
+    FROM (
+        SELECT m.platform,
+               (CAST(strftime('%s', m.timestamp) AS INTEGER) + ?) / ? AS bucket,
+               MAX(m.volume) AS volume, AVG(m.velocity_score) AS velocity,
+               MAX(m.velocity_score) AS velocity_max, AVG(m.growth_rate) AS growth, COUNT(*) AS samples
+        FROM trend_metrics m
+        WHERE m.trend_id IN (SELECT trend_id FROM radar_members WHERE cluster_id = ?) AND m.timestamp > ?
+        GROUP BY m.trend_id, m.platform, bucket
+    )
+    GROUP BY platform, bucket
+    ORDER BY platform, bucket
+"""
+
+
+def _bucket_args(resolution: str) -> tuple[int, int]:
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    size = RESOLUTIONS[resolution]
+    return (WEEK_OFFSET if resolution == 'week' else 0), size
+
+
+def _since(days: float) -> str:
+    return (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _point(bucket: int, offset: int, size: int, volume, velocity, velocity_max, growth, samples) -> dict:
+    start = datetime.fromtimestamp(bucket * size - offset, tz=timezone.utc)
+    return {
+        'start': start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'volume': volume or 0,
+        'velocity': round(velocity or 0, 2),
+        'velocity_max': round(velocity_max or 0, 2),
+        'growth': None if growth is None else round(growth, 4),
+        'samples': samples,
+    }
+
+
+def series_batch(session, trend_ids, resolution: str = '4h', days: float = DEFAULT_DAYS) -> dict[int, dict[str, list[dict]]]:
+    """{trend_id: {platform: [point, ...]}} for every id, oldest bucket first.
+    Trends without metrics in the range map to {}."""
+    offset, size = _bucket_args(resolution)
+    ids = sorted({int(i) for i in trend_ids})
+    out = {trend_id: {} for trend_id in ids}
+    if not ids:
+        return out
+    rows = session.connection().exec_driver_sql(SERIES_SQL, (offset, size, json.dumps(ids), _since(days)))
+    for trend_id, platform, bucket, *values in rows:
+        out[trend_id].setdefault(platform, []).append(_point(bucket, offset, size, *values))
+    return out
+
+
+def series(session, trend_id: int, resolution: str = '4h', days: float = DEFAULT_DAYS) -> dict[str, list[dict]]:
+    return series_batch(session, [trend_id], resolution, days)[int(trend_id)]
+
+
+def cluster_series(session, cluster_id: int, resolution: str = '4h', days: float = DEFAULT_DAYS) -> dict[str, list[dict]]:
+    """{platform: [point, ...]} over the trends currently in a radar cluster."""
+    offset, size = _bucket_args(resolution)
+    out = {}
+    rows = session.connection().exec_driver_sql(CLUSTER_SQL, (offset, size, int(cluster_id), _since(days)))
+    for platform, bucket, *values in rows:
+        out.setdefault(platform, []).append(_point(bucket, offset, size, *values))
+    return out
+
+
+def sparkline(values: list[float]) -> str:
+    """'▁▃▇' style mini chart, scaled between the series' min and max."""
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK[len(SPARK) // 2] * len(values)
+    scale = (len(SPARK) - 1) / (high - low)
+    return "".join(SPARK[round((v - low) * scale)] for v in values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bucketed metric history of a trend or radar cluster")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--trend", type=int, help="trend id")
+    target.add_argument("--topic", help="exact topic text")
+    target.add_argument("--cluster", type=int, help="radar cluster id")
+    parser.add_argument("--resolution", choices=list(RESOLUTIONS), default='4h')
+    parser.add_argument("--days", type=float, default=DEFAULT_DAYS)
+    args = parser.parse_args()
+
+    session = Session()
+    try:
+        if args.cluster is not None:
+            title = f"cluster #{args.cluster}"
+            data = cluster_series(session, args.cluster, args.resolution, args.days)
+        else:
+            query = select(Trend.id, Trend.topic)
+            query = query.where(Trend.topic == args.topic) if args.topic else query.where(Trend.id == args.trend)
+            found = session.execute(query).first()
+            if found is None:
+                print("❌ Sujet introuvable.")
+                return
+            title = f"#{found.id} {found.topic}"
+            data = series(session, found.id, args.resolution, args.days)
+    finally:
+        session.close()
+
+    print(f"\n📈 {title} — pas {args.resolution}, {args.days:g} jours")
+    if not data:
+        print("   (Pas de données)")
+    for platform, points in data.items():
+        print(f"\n  {platform}  {sparkline([p['volume'] for p in points])}")
+        for p in points:
+            growth = "" if p['growth'] is None else f" | Croiss.: {p['growth']:+.2f}"
+            print(f"    {p['start']}  Vol: {p['volume']:>10,} | Vel: {p['velocity']:>6.1f} "
+                  f"(max {p['velocity_max']:.1f}){growth} | n={p['samples']}")
+
+
+if __name__ == "__main__":
+    main()
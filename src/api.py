@@ -0,0 +1,353 @@
+"""
+Read API — trends, radar opportunities and trend history as JSON over HTTP.
+
+    python -m src.api [--host 127.0.0.1] [--port 8686]
+
+    GET /trends?niche=Cinema&limit=5&hours=24    top trends per niche
+    GET /opportunities?limit=20                  cross-platform clusters (radar state)
+    GET /trends/<id>/history?resolution=4h&days=7      one trend's metrics per platform, bucketed
+    GET /series?ids=1,2,3&resolution=day&days=30       the same for many trends in one query
+    GET /opportunities/<cluster>/history?resolution=day  a radar cluster's summed history
+    GET /health                                  data version and cache counters
+
+One asyncio process answers every consumer. Responses are built once per
+data version (the ingest / radar / momentum / retention watermarks, see
+base.DATA_VERSION_MARKS, checked at most every VERSION_TTL seconds) and per
+CLOCK_SECONDS, since relative windows ("last 24h") move with the clock. They
+are kept in an LRU cache; concurrent misses for the same URL share one query.
+Every response carries an ETag of its body: a client sending it back in
+If-None-Match gets a bodiless 304 until the data it shows changes (a new
+data version alone does not change the ETag).
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, parse_qs
+
+from sqlalchemy import select, text, bindparam, DateTime
+
+from src.models.base import Session, Trend, RadarCluster, Watermark, DATA_VERSION_MARKS, init_db
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+HOST = os.environ.get("VIRAL_API_HOST", "127.0.0.1")
+PORT = int(os.environ.get("VIRAL_API_PORT", "8686"))
+CACHE_ENTRIES = 256
+VERSION_TTL = 1.0       # Seconds between two data-version reads
+CLOCK_SECONDS = 60      # Cached bodies are rebuilt at least this often
+IDLE_TIMEOUT = 30       # Keep-alive connections idle longer are closed
+MAX_LIMIT = 200
+
+TOP_BY_NICHE_SQL = """
+    SELECT niche, trend_id, topic, platform, velocity_score, volume, timestamp FROM (
+        SELECT t.niche, t.id AS trend_id, t.topic, m.platform, m.velocity_score, m.volume, m.timestamp,
+               ROW_NUMBER() OVER (PARTITION BY t.niche ORDER BY m.velocity_score DESC) AS rank
+        FROM trend_metrics m
+        JOIN trends t ON t.id = m.trend_id
+        WHERE m.timestamp > :since {niche_filter}
+    )
+    WHERE rank <= :limit
+    ORDER BY niche, rank
+"""
+
+MAX_SERIES_IDS = 500
+
+
+class BadRequest(Exception):
+    pass
+
+
+class NotFound(Exception):
+    pass
+
+
+# ─── QUERIES (worker threads) ───────────────────────────────────────
+def _int_param(params: dict, name: str, default: int, low: int = 1, high: int = MAX_LIMIT) -> int:
+    raw = params.get(name, [None])[0]
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    if not low <= value <= high:
+        raise BadRequest(f"{name} must be between {low} and {high}")
+    return value
+
+
+def top_trends(session, params: dict) -> dict:
+    limit = _int_param(params, 'limit', 5)
+    hours = _int_param(params, 'hours', 24, high=24 * 30)
+    niche = params.get('niche', [None])[0]
+    sql = text(TOP_BY_NICHE_SQL.format(niche_filter="AND t.niche = :niche" if niche else ""))
+    sql = sql.bindparams(bindparam('since', type_=DateTime))
+    bind = {'since': datetime.utcnow() - timedelta(hours=hours), 'limit': limit, 'niche': niche}
+    niches = {}
+    for niche_name, trend_id, topic, platform, velocity, volume, ts in session.execute(sql, bind):
+        niches.setdefault(niche_name, []).append({
+            'trend_id': trend_id, 'topic': topic, 'platform': platform,
+            'velocity_score': velocity, 'volume': volume, 'timestamp': ts,
+        })
+    return {'hours': hours, 'limit': limit, 'niches': niches}
+
+
+def opportunities(session, params: dict) -> dict:
+    from src.analysis.cross_platform_radar import load_opportunities
+    limit = _int_param(params, 'limit', 20)
+    gold = load_opportunities(session, limit)
+    for opp in gold:
+        opp['platforms'] = sorted(opp['platforms'])
+    return {'opportunities': gold}
+
+
+def _series_params(params: dict) -> tuple[str, int]:
+    from src.analysis.timeseries import RESOLUTIONS
+    resolution = params.get('resolution', ['4h'])[0]
+    if resolution not in RESOLUTIONS:
+        raise BadRequest(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    return resolution, _int_param(params, 'days', 7, high=365)
+
+
+def trend_history(session, params: dict, trend_id: int) -> dict:
+    from src.analysis.timeseries import series
+    resolution, days = _series_params(params)
+    trend = session.execute(
+        select(Trend.id, Trend.topic, Trend.niche, Trend.source_platform, Trend.first_detected)
+        .where(Trend.id == trend_id)
+    ).first()
+    if trend is None:
+        raise NotFound(f"trend {trend_id} not found")
+    return {
+        'trend': dict(trend._mapping),
+        'resolution': resolution,
+        'days': days,
+        'series': series(session, trend_id, resolution, days),
+    }
+
+
+def many_series(session, params: dict) -> dict:
+    from src.analysis.timeseries import series_batch
+    resolution, days = _series_params(params)
+    raw = ",".join(params.get('ids', [])).split(",")
+    if not all(part.strip().isdigit() for part in raw):
+        raise BadRequest("ids must be a comma-separated list of trend ids")
+    ids = {int(part) for part in raw}
+    if len(ids) > MAX_SERIES_IDS:
+        raise BadRequest(f"at most {MAX_SERIES_IDS} ids")
+    data = series_batch(session, ids, resolution, days)
+    return {'resolution': resolution, 'days': days, 'series': {str(k): v for k, v in data.items()}}
+
+
+def cluster_history(session, params: dict, cluster_id: int) -> dict:
+    from src.analysis.timeseries import cluster_series
+    resolution, days = _series_params(params)
+    cluster = session.execute(
+        select(RadarCluster.id, RadarCluster.main_topic, RadarCluster.niche).where(RadarCluster.id == cluster_id)
+    ).first()
+    if cluster is None:
+        raise NotFound(f"cluster {cluster_id} not found")
+    return {
+        'cluster': dict(cluster._mapping),
+        'resolution': resolution,
+        'days': days,
+        'series': cluster_series(session, cluster_id, resolution, days),
+    }
+
+
+def data_version() -> str:
+    session = Session()
+    try:
+        marks = dict(session.execute(
+            select(Watermark.name, Watermark.value).where(Watermark.name.in_(DATA_VERSION_MARKS))
+        ).all())
+    finally:
+        session.close()
+    return ".".join(str(marks.get(name, 0)) for name in DATA_VERSION_MARKS)
+
+
+def build(path: str, params: dict) -> bytes:
+    """Route a GET and render its JSON body."""
+    parts = path.strip("/").split("/")
+    session = Session()
+    try:
+        if parts == ["trends"]:
+            payload = top_trends(session, params)
+        elif parts == ["opportunities"]:
+            payload = opportunities(session, params)
+        elif parts == ["series"]:
+            payload = many_series(session, params)
+        elif len(parts) == 3 and parts[0] in ("trends", "opportunities") and parts[2] == "history":
+            if not parts[1].isdigit():
+                raise BadRequest("id must be an integer")
+            history = trend_history if parts[0] == "trends" else cluster_history
+            payload = history(session, params, int(parts[1]))
+        else:
+            raise NotFound(f"no route for {path}")
+    finally:
+        session.close()
+    return json.dumps(payload, ensure_ascii=False, default=str).encode()
+
+
+# ─── CACHE ──────────────────────────────────────────────────────────
+class LRUCache:
+    """{key: (version, etag, body)}, least recently used evicted first."""
+
+    def __init__(self, size: int = CACHE_ENTRIES):
+        self.size = size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, version, body: bytes):
+        entry = (version, f'"{hashlib.sha1(body).hexdigest()[:20]}"', body)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ─── SERVER ─────────────────────────────────────────────────────────
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class ReadAPI:
+    def __init__(self, cache_size: int = CACHE_ENTRIES):
+        self.cache = LRUCache(cache_size)
+        self._inflight = {}
+        self._version = None
+        self._version_at = 0.0
+
+    async def version(self) -> str:
+        if self._version is None or time.monotonic() - self._version_at >= VERSION_TTL:
+            self._version = await asyncio.to_thread(data_version)
+            self._version_at = time.monotonic()
+        return self._version
+
+    async def entry(self, path: str, query: str):
+        params = parse_qs(query)
+        key = (path.rstrip("/"), tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        version = (await self.version(), int(time.time() // CLOCK_SECONDS))
+        entry = self.cache.get(key, version)
+        if entry is not None:
+            return entry
+
+        task = self._inflight.get((key, version))
+        if task is None:
+            task = asyncio.ensure_future(asyncio.to_thread(build, path, params))
+            self._inflight[(key, version)] = task
+            task.add_done_callback(lambda _: self._inflight.pop((key, version), None))
+        body = await asyncio.shield(task)
+        return self.cache.put(key, version, body)
+
+    async def respond(self, method: str, target: str, headers: dict) -> tuple[int, bytes, dict]:
+        if method not in ("GET", "HEAD"):
+            return 405, b'{"error": "GET only"}', {"Allow": "GET, HEAD"}
+        url = urlsplit(target)
+        if url.path.rstrip("/") == "/health":
+            body = json.dumps({'version': await self.version(), 'cache': {
+                'entries': len(self.cache), 'hits': self.cache.hits, 'misses': self.cache.misses}}).encode()
+            return 200, body, {}
+        try:
+            _, etag, body = await self.entry(url.path, url.query)
+        except BadRequest as e:
+            return 400, json.dumps({'error': str(e)}).encode(), {}
+        except NotFound as e:
+            return 404, json.dumps({'error': str(e)}).encode(), {}
+        except Exception as e:
+            print(f"❌ API {url.path}: {e!r}")
+            return 500, b'{"error": "internal error"}', {}
+
+        extra = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in (tag.strip() for tag in headers.get("if-none-match", "").split(",")):
+            return 304, b"", extra
+        return 200, body, extra
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    await self._write(writer, "GET", 400, b'{"error": "bad request line"}', {}, keep_alive=False)
+                    break
+                headers = {}
+                while True:
+                    header = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get("content-length"):
+                    await reader.readexactly(int(headers["content-length"]))
+
+                status, body, extra = await self.respond(method, target, headers)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._write(writer, method, status, body, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer, method: str, status: int, body: bytes, extra: dict, keep_alive: bool):
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+        if status != 304:
+            head.append("Content-Type: application/json; charset=utf-8")
+        head.append(f"Content-Length: {len(body)}")
+        head.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        head.extend(f"{name}: {value}" for name, value in extra.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        if method != "HEAD":
+            writer.write(body)
+        await writer.drain()
+
+
+async def serve(host: str = HOST, port: int = PORT, ready: asyncio.Event | None = None):
+    api = ReadAPI()
+    server = await asyncio.start_server(api.handle, host, port)
+    bound = server.sockets[0].getsockname()
+    print(f"🌐 API de lecture sur http://{bound[0]}:{bound[1]}", flush=True)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON read API over the trends database")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    init_db()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,41 @@
-import requests
+import os
 import json
-from datetime import datetime
-from src.models.base import Session, Trend, TrendMetric, init_db, upsert_trend, add_metric
+import time
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from src.models.base import Session, init_db, unchanged_items, remember_items
+from src.collectors.niche_classifier import get_classifier
+from src.collectors.http_cache import cached_get
+from src.collectors.http_pool import make_session
+from src.collectors.pipeline import run_pipeline, classify_with, IngestSink
+from src.telemetry import count, propagate
 
 # ─── CONFIG ──────────────────────────────────────────────────────────
-API_URL = "https://trends.google.com/trends/api/dailytrends?hl=fr&geo=FR&ns=15"
+BASE_URL = os.environ.get("GOOGLE_TRENDS_BASE_URL", "https://trends.google.com")  # Replay: benchmarks.replay
+CACHE_TTL = 30 * 60    # Re-runs within 30 min reuse the stored payload without any request
+BATCH_ITEMS = 100      # Folded items per pipeline batch
+
+# Markets scanned each run, as GEO:language pairs: "FR:fr,BE:fr,US:en"
+MARKETS = [
+    tuple(pair.strip().split(":", 1)) if ":" in pair else (pair.strip(), "en")
+    for pair in os.environ.get("VIRAL_GOOGLE_MARKETS", "FR:fr").split(",")
+    if pair.strip()
+]
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
                   "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Accept": "application/json, text/plain, */*",
-    "Referer": "https://trends.google.com/trends/trendingsearches/daily?geo=FR&hl=fr",
 }
 
-NICHES = {
-    'Cinema': ['film', 'movie', 'trailer', 'netflix', 'série', 'cinéma', 'acteur', 'actrice',
-               'disney', 'marvel', 'hbo', 'prime video', 'star wars', 'dc', 'oscar', 'cannes'],
-    'Sport':  ['match', 'score', 'goal', 'ufc', 'nba', 'football', 'ligue', 'jo', 'athlète',
-               'vs', 'prix', 'course', 'tennis', 'f1', 'psg', 'real madrid', 'champions league',
-               'olympique', 'transfert', 'blessure'],
-    'Music':  ['lyrics', 'concert', 'album', 'song', 'feat', 'rap', 'musique', 'clip',
-               'chanteur', 'chanteuse', 'grammy', 'spotify', 'tournée', 'tour', 'single'],
-}
+
+def api_url(geo: str, hl: str) -> str:
+    return f"{BASE_URL}/trends/api/dailytrends?hl={hl}&geo={geo}&ns=15"
+
+
+def market_headers(geo: str, hl: str) -> dict:
+    return dict(HEADERS, Referer=f"https://trends.google.com/trends/trendingsearches/daily?geo={geo}&hl={hl}")
 
 
 def parse_volume(traffic_str: str) -> int:
@@ -37,12 +51,14 @@ def parse_volume(traffic_str: str) -> int:
         return 0
 
 
-def fetch_daily_trends() -> list[dict]:
-    """Fetch raw trending searches from Google's internal JSON API."""
+def fetch_daily_trends(http=None, geo: str = "FR", hl: str = "fr", ttl: float = CACHE_TTL) -> list[dict]:
+    """Fetch raw trending searches for one market from Google's internal JSON
+    API, through the on-disk HTTP cache (a payload younger than `ttl` seconds
+    is reused as is). Pass a pooled session as `http` to reuse its connection."""
     try:
-        resp = requests.get(API_URL, headers=HEADERS, timeout=15)
+        resp = cached_get(api_url(geo, hl), http, headers=market_headers(geo, hl), ttl=ttl, timeout=15)
         if resp.status_code != 200:
-            print(f"❌ Google HTTP {resp.status_code}")
+            print(f"❌ Google {geo} HTTP {resp.status_code}")
             return []
 
         content = resp.text
@@ -70,17 +86,13 @@ def fetch_daily_trends() -> list[dict]:
         return results
 
     except Exception as e:
-        print(f"❌ Google Parsing Error: {e}")
+        print(f"❌ Google {geo} Parsing Error: {e}")
         return []
 
 
 def classify_niche(topic: str, context: str) -> str:
     """Match topic+context against niche keywords."""
-    combined = (topic + " " + context).lower()
-    for niche, keywords in NICHES.items():
-        if any(kw in combined for kw in keywords):
-            return niche
-    return 'General'
+    return get_classifier('google').classify(topic + " " + context)
 
 
 def compute_velocity(volume: int, rank: int, total: int) -> float:
@@ -99,38 +111,130 @@ def compute_velocity(volume: int, rank: int, total: int) -> float:
     return round(base + rank_boost, 1)
 
 
-def process_trends():
+def market_labels(markets) -> dict[tuple[str, str], str]:
+    """{(geo, hl): label}: the geo alone ('FR'), or 'CH:de' for a country
+    scanned in several languages (in `markets` or MARKETS). Labels key the
+    fetched payloads and make up the 'geo' tag of stored metrics."""
+    languages = defaultdict(set)
+    for geo, hl in [*MARKETS, *markets]:
+        languages[geo].add(hl)
+    return {(geo, hl): f"{geo}:{hl}" if len(languages[geo]) > 1 else geo for geo, hl in markets}
+
+
+def fetch_all_markets(markets=None, http=None, ttl: float = CACHE_TTL) -> dict[str, list[dict]]:
+    """Fetch every market concurrently over one pooled session: {label: items}
+    (see market_labels). A run takes as long as the slowest market, not the sum of them."""
+    markets = markets or MARKETS
+    if not markets:
+        print("⚠️ Google: aucun marché configuré (VIRAL_GOOGLE_MARKETS vide)")
+        return {}
+    labels = market_labels(markets)
+    own = http is None
+    http = http or make_session(HEADERS, pool_size=max(1, len(markets)))
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(markets))) as pool:
+            futures = {labels[geo, hl]: pool.submit(propagate(fetch_daily_trends), http, geo, hl, ttl)
+                       for geo, hl in markets}
+            return {label: future.result() for label, future in futures.items()}
+    finally:
+        if own:
+            http.close()
+
+
+def fold_markets(per_geo: dict[str, list[dict]]) -> list[dict]:
+    """One item per topic across markets, scored within its own market first.
+
+    Velocity uses the item's rank in its market's list. Within a market the
+    strongest sighting of a topic counts (today and yesterday overlap);
+    across markets volumes add up, velocity keeps the best market and
+    'geo' lists the label of every market the topic trends in."""
+    folded = {}
+    for geo, items in per_geo.items():
+        total = len(items)
+        best = {}
+        for rank, item in enumerate(items):
+            velocity = compute_velocity(item['volume'], rank, total)
+            seen = best.get(item['topic'])
+            if seen is None or item['volume'] > seen['volume']:
+                best[item['topic']] = dict(item, velocity_score=velocity)
+
+        for topic, item in best.items():
+            entry = folded.get(topic)
+            if entry is None:
+                folded[topic] = dict(item, geos=[geo])
+                continue
+            entry['volume'] += item['volume']
+            entry['velocity_score'] = max(entry['velocity_score'], item['velocity_score'])
+            entry['geos'].append(geo)
+            entry['context'] = entry['context'] or item['context']
+
+    for entry in folded.values():
+        entry['geo'] = ",".join(sorted(entry.pop('geos')))
+    return list(folded.values())
+
+
+def fingerprint(items: list[dict]) -> dict[str, str]:
+    """{topic: digest} over everything that ends up in a record."""
+    parts = {}
+    for item in items:
+        parts.setdefault(item['topic'], []).append(
+            f"{item['volume']}\x00{item['velocity_score']}\x00{item.get('geo')}\x00{item['context']}"
+        )
+    return {topic: hashlib.sha1("\x01".join(p).encode()).hexdigest() for topic, p in parts.items()}
+
+
+def drop_unchanged(batch: list[dict]) -> list[dict]:
+    """Items identical to the last scan skip classification and writes.
+    The others become records carrying their fingerprint (stored by the sink)."""
+    digests = fingerprint(batch)
     session = Session()
-    items = fetch_daily_trends()
-
-    if not items:
-        print("⚠️ Google: aucun flux récupéré.")
-        return
-
-    print(f"🔍 Google: {len(items)} sujets récupérés")
-    count_new = 0
-    total = len(items)
-
-    for rank, item in enumerate(items):
-        topic = item['topic']
-        volume = item['volume']
-        niche = classify_niche(topic, item['context'])
-        velocity = compute_velocity(volume, rank, total)
-
-        trend = upsert_trend(session, topic, niche, 'Google')
-        if trend.id is None:
-            session.flush()
-        was_new = trend.first_detected == trend.last_updated
-        add_metric(session, trend, 'Google', volume, velocity)
-
-        if was_new:
-            count_new += 1
-            print(f"  [+] {topic} ({niche}) — Vol: {volume:,} — Vel: {velocity}")
-
-    session.commit()
-    session.close()
-    print(f"✅ Google: terminé. {count_new} nouveaux sujets.")
-
+    try:
+        unchanged = unchanged_items(session, 'google', digests)
+    finally:
+        session.close()
+    count('rows_skipped', len(unchanged))
+    if unchanged:
+        print(f"  ⏭️ {len(unchanged)} sujets inchangés depuis le dernier scan")
+    return [
+        {
+            'topic': item['topic'],
+            'text': item['topic'] + " " + item['context'],
+            'platform': 'Google',
+            'volume': item['volume'],
+            'velocity_score': item['velocity_score'],
+            'geo': item['geo'],
+            'digest': digests[item['topic']],
+        }
+        for item in batch if item['topic'] not in unchanged
+    ]
+
+
+def process_trends(http=None, markets=None):
+    fetched = []
+
+    def source():
+        # Velocity is a rank within each market and topics fold across
+        # markets: scoring needs every market, so batches start after the fetch.
+        started = time.monotonic()
+        per_geo = fetch_all_markets(markets, http)
+        items = fold_markets(per_geo)
+        if not items:
+            print("⚠️ Google: aucun flux récupéré.")
+            return
+        fetched.append(len(items))
+        counts = ", ".join(f"{geo}: {len(found)}" for geo, found in per_geo.items())
+        print(f"🔍 Google: {len(items)} sujets récupérés ({counts}) en {time.monotonic() - started:.1f}s")
+        for i in range(0, len(items), BATCH_ITEMS):
+            yield items[i:i + BATCH_ITEMS]
+
+    sink = IngestSink(
+        on_write=lambda session, records: remember_items(session, 'google', {r['topic']: r['digest'] for r in records}),
+        describe=lambda rec: f"{rec['topic']} ({rec['niche']}, {rec['geo']}) — Vol: {rec['volume']:,} — Vel: {rec['velocity_score']}",
+    )
+    run_pipeline(source(), normalize=drop_unchanged, classify=classify_with('google'), sink=sink)
+    if fetched:
+        print(f"✅ Google: terminé. {sink.new_topics} nouveaux sujets.")
+    return sink.records
 
 if __name__ == "__main__":
     init_db()
@@ -0,0 +1,99 @@
+"""
+On-disk HTTP cache for the collectors.
+
+    resp = cached_get(url, http, headers=HEADERS, ttl=1800)
+    resp.source   # 'cache' (no request), 'revalidated' (304) or 'network'
+
+A response younger than `ttl` is served from disk without any request.
+Past that, the stored ETag / Last-Modified are sent back as
+If-None-Match / If-Modified-Since, and a 304 refreshes the entry without
+downloading the body again. Only 200 responses are stored.
+"""
+import os
+import json
+import time
+import hashlib
+
+import requests
+from src.models.config import DB_DIR
+from src.telemetry import count
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+CACHE_DIR = os.environ.get("VIRAL_HTTP_CACHE_DIR", os.path.join(DB_DIR, "http_cache"))
+
+
+class CachedResponse:
+    def __init__(self, status_code: int, content: bytes, source: str, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.source = source
+        self.headers = headers or {}
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def _paths(url: str, cache_dir: str) -> tuple[str, str]:
+    key = hashlib.sha1(url.encode()).hexdigest()
+    return os.path.join(cache_dir, f"{key}.json"), os.path.join(cache_dir, f"{key}.body")
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _load(meta_path: str, body_path: str) -> tuple[dict | None, bytes | None]:
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            return meta, f.read()
+    except (OSError, ValueError):
+        return None, None
+
+
+def cached_get(url: str, http=None, headers: dict | None = None, ttl: float = 0,
+               timeout: float = 15, cache_dir: str = CACHE_DIR) -> CachedResponse:
+    """GET through the on-disk cache (see module docstring)."""
+    meta_path, body_path = _paths(url, cache_dir)
+    meta, body = _load(meta_path, body_path)
+    now = time.time()
+
+    if meta is not None and now - meta['fetched_at'] < ttl:
+        count('http_cache_hits')
+        return CachedResponse(200, body, 'cache', meta.get('headers'))
+
+    conditional = dict(headers or {})
+    if meta is not None:
+        if meta.get('etag'):
+            conditional["If-None-Match"] = meta['etag']
+        if meta.get('last_modified'):
+            conditional["If-Modified-Since"] = meta['last_modified']
+
+    resp = (http or requests).get(url, headers=conditional, timeout=timeout)
+    if resp.status_code == 304 and meta is not None:
+        meta['fetched_at'] = now
+        _write_atomic(meta_path, json.dumps(meta).encode())
+        return CachedResponse(200, body, 'revalidated', meta.get('headers'))
+    if resp.status_code != 200:
+        return CachedResponse(resp.status_code, resp.content, 'network', dict(resp.headers))
+
+    kept = {k: resp.headers[k] for k in ("Content-Type",) if k in resp.headers}
+    meta = {
+        'url': url,
+        'fetched_at': now,
+        'etag': resp.headers.get("ETag"),
+        'last_modified': resp.headers.get("Last-Modified"),
+        'headers': kept,
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_atomic(body_path, resp.content)
+    _write_atomic(meta_path, json.dumps(meta).encode())
+    return CachedResponse(200, resp.content, 'network', kept)
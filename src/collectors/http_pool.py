@@ -0,0 +1,70 @@
+import time
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.telemetry import http_response_hook
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+POOL_SIZE = 16          # Keep-alive connections per host
+
+
+def make_session(headers: dict | None = None, pool_size: int = POOL_SIZE) -> requests.Session:
+    """One pooled, keep-alive HTTP session to share across a whole scan.
+    Responses are counted per status code in the current run (src.telemetry)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    session.hooks['response'].append(http_response_hook)
+    return session
+
+
+class TokenBucket:
+    """Thread-safe token bucket that can be re-shaped from server rate-limit headers.
+
+    `rate` tokens are added per second up to `capacity`. `acquire()` blocks until
+    a token is available. `update()` re-shapes the bucket from the remaining
+    budget announced by the server, and `pause()` freezes it after a 429."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._last
+        self._last = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def update(self, remaining: float, reset_seconds: float):
+        """Spread the remaining budget evenly over the time left in the server window."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, max(remaining, 0))
+            if remaining <= 0:
+                self._paused_until = max(self._paused_until, time.monotonic() + reset_seconds)
+            elif reset_seconds > 0:
+                self.rate = max(remaining / reset_seconds, 0.01)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._tokens = 0
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
@@ -0,0 +1,124 @@
+"""
+Shared niche classifier for every collector.
+
+Niche definitions live in niches.json (override with VIRAL_NICHES_FILE):
+per niche, one keyword list per source profile plus the subreddits Reddit
+scans for it. Each profile compiles once into a single regex, so an item
+is scanned in one pass instead of once per niche; that pass still grows
+with the total number of keywords (re tries the alternation branch by
+branch), not with the number of niches alone.
+
+- Text and keywords are accent-folded ('série' matches 'serie').
+- "word" profiles only match whole words (an optional plural 's' is allowed),
+  so 'dc' no longer fires on 'podcast' nor 'jo' on 'joker'.
+- "none" profiles match anywhere; TikTok hashtags have no word separators.
+- Niche order in the file is the priority order when several match.
+"""
+import os
+import re
+import json
+import unicodedata
+from bisect import bisect_right
+from functools import lru_cache
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+NICHES_FILE = os.environ.get(
+    "VIRAL_NICHES_FILE", os.path.join(os.path.dirname(__file__), "niches.json")
+)
+DEFAULT_NICHE = 'General'
+SEPARATOR = "\x00"   # Never inside a keyword, so batch matches can't straddle items
+
+
+def fold(text: str) -> str:
+    """Lower-case and strip accents: 'Tournée' -> 'tournee'."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+@lru_cache(maxsize=1)
+def load_definitions() -> dict:
+    with open(NICHES_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def niche_names(lead: tuple[str, ...] = ()) -> list[str]:
+    """Configured niches in priority order (without the 'General' fallback).
+    Niches listed in `lead` come first, in that order (display order)."""
+    names = list(load_definitions()["niches"])
+    return [n for n in lead if n in names] + [n for n in names if n not in lead]
+
+
+def niche_emoji(niche: str, default: str = '📌') -> str:
+    return load_definitions()["niches"].get(niche, {}).get("emoji", default)
+
+
+def subreddit_sources() -> dict[str, list[str]]:
+    """{niche: [subreddit, ...]} for the Reddit collector."""
+    return {
+        name: spec.get("subreddits", [])
+        for name, spec in load_definitions()["niches"].items()
+        if spec.get("subreddits")
+    }
+
+
+class NicheClassifier:
+    """One compiled regex over every niche's keywords.
+
+    The pattern is a zero-width lookahead tried at each position, with niches
+    as alternation groups in priority order, so overlapping keywords from
+    different niches are all seen in a single left-to-right pass."""
+
+    def __init__(self, keywords: dict[str, list[str]], word_boundary: bool = True):
+        self.names = list(keywords)
+        groups = []
+        for i, name in enumerate(self.names):
+            words = sorted({fold(kw) for kw in keywords[name]}, key=len, reverse=True)
+            if words:
+                groups.append(f"(?P<n{i}>{'|'.join(re.escape(w) for w in words)})")
+
+        if not groups:
+            self.pattern = None
+        elif word_boundary:
+            self.pattern = re.compile(rf"(?<!\w)(?=(?:{'|'.join(groups)})s?(?!\w))")
+        else:
+            self.pattern = re.compile(rf"(?=(?:{'|'.join(groups)}))")
+
+    def _best(self, match) -> int:
+        # Only one group can be set per match: the highest-priority one at that position.
+        return int(match.lastgroup[1:])
+
+    def classify(self, text: str) -> str:
+        if self.pattern is None:
+            return DEFAULT_NICHE
+        best = min((self._best(m) for m in self.pattern.finditer(fold(text))), default=None)
+        return DEFAULT_NICHE if best is None else self.names[best]
+
+    def classify_batch(self, texts: list[str]) -> list[str]:
+        """Classify many texts with a single regex scan over their concatenation."""
+        if self.pattern is None:
+            return [DEFAULT_NICHE] * len(texts)
+
+        folded = [fold(t) for t in texts]
+        starts = []
+        offset = 0
+        for t in folded:
+            starts.append(offset)
+            offset += len(t) + len(SEPARATOR)
+
+        best = [None] * len(texts)
+        for m in self.pattern.finditer(SEPARATOR.join(folded)):
+            item = bisect_right(starts, m.start()) - 1
+            niche = self._best(m)
+            if best[item] is None or niche < best[item]:
+                best[item] = niche
+
+        return [DEFAULT_NICHE if b is None else self.names[b] for b in best]
+
+
+@lru_cache(maxsize=None)
+def get_classifier(profile: str) -> NicheClassifier:
+    """Compiled classifier for a source profile ('google', 'tiktok', ...)."""
+    definitions = load_definitions()
+    settings = definitions.get("profiles", {}).get(profile, {})
+    keywords = {name: spec.get(profile, []) for name, spec in definitions["niches"].items()}
+    return NicheClassifier(keywords, word_boundary=settings.get("boundary", "word") == "word")
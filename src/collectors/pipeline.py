@@ -0,0 +1,176 @@
+"""
+Ingestion pipeline — source → normalize → classify → score → sink, shared by every collector.
+
+    run_pipeline(source(), normalize=..., classify=classify_with('google'), sink=IngestSink())
+
+The source is a generator yielding batches (lists of items) as soon as they
+are fetched; normalize / classify / score each map a batch to a batch and
+may be left out. Every stage runs in its own thread, joined to the next by
+a bounded queue: when the writer falls behind, the stages upstream block
+instead of piling fetched data up in memory, and fetching overlaps with DB
+writes. The sink is the only stage holding the write session; it commits
+every CHUNK_ROWS records, so a scan that dies midway keeps what was
+already written. Stage time goes to telemetry as fetch / parse / classify
+/ score / write.
+"""
+import queue
+import threading
+
+from src.telemetry import stage, propagate
+from src.models.base import WriteSession, bulk_ingest
+from src.collectors.niche_classifier import get_classifier
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+QUEUE_BATCHES = 4       # Batches waiting between two stages
+CHUNK_ROWS = 500        # Records per commit
+POLL = 0.1              # Seconds between checks for a failed stage while blocked
+
+_DONE = object()
+
+
+class IngestSink:
+    """Single writer: bulk_ingest() + commit per chunk of `chunk_rows` records.
+
+    `on_write(session, records)` runs in each chunk's transaction (e.g. to
+    store item fingerprints with the rows they describe). `describe(record)`
+    prints one line per topic that did not exist before."""
+
+    def __init__(self, chunk_rows: int = CHUNK_ROWS, on_write=None, describe=None):
+        self.chunk_rows = chunk_rows
+        self.on_write = on_write
+        self.describe = describe
+        self.records = 0
+        self.new_topics = 0
+        self.commits = 0
+        self._pending = []
+        self._session = None
+
+    def write(self, batch: list[dict]):
+        self._pending.extend(batch)
+        if len(self._pending) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        records, self._pending = self._pending, []
+        if self._session is None:
+            self._session = WriteSession()
+        try:
+            new_topics = bulk_ingest(self._session, records)
+            if self.on_write:
+                self.on_write(self._session, records)
+            self._session.commit()
+        except BaseException:
+            self._session.rollback()
+            raise
+        self.records += len(records)
+        self.new_topics += len(new_topics)
+        self.commits += 1
+        if self.describe:
+            for rec in records:
+                if rec['topic'] in new_topics:
+                    new_topics.discard(rec['topic'])
+                    print(f"  [+] {self.describe(rec)}")
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+def classify_with(name: str):
+    """Classify stage: fills 'niche' on items that have none, from their 'text'
+    (default: the topic), with the named classifier (niche_classifier)."""
+    def classify(batch: list[dict]) -> list[dict]:
+        todo = [item for item in batch if not item.get('niche')]
+        if todo:
+            niches = get_classifier(name).classify_batch([item.pop('text', item['topic']) for item in todo])
+            for item, niche in zip(todo, niches):
+                item['niche'] = niche
+        return batch
+    return classify
+
+
+def run_pipeline(source, normalize=None, classify=None, score=None, sink: IngestSink | None = None,
+                 queue_size: int = QUEUE_BATCHES) -> IngestSink:
+    """Drive `source` batches through the stages into `sink` (written from the
+    calling thread). Re-raises the first stage failure once the batches
+    already past it are written."""
+    sink = sink or IngestSink()
+    steps = [(name, fn) for name, fn in (('parse', normalize), ('classify', classify), ('score', score)) if fn]
+    queues = [queue.Queue(queue_size) for _ in range(len(steps) + 1)]
+    failed = threading.Event()
+    errors = []
+
+    def put(q, item) -> bool:
+        while True:
+            try:
+                q.put(item, timeout=POLL)
+                return True
+            except queue.Full:
+                if failed.is_set():
+                    return False
+
+    def get(q):
+        while True:
+            try:
+                return q.get(timeout=POLL)
+            except queue.Empty:
+                if failed.is_set():
+                    return _DONE
+
+    def fail(e: BaseException):
+        errors.append(e)
+        failed.set()
+
+    def run_source(outbox):
+        batches = iter(source)
+        try:
+            while True:
+                with stage('fetch'):
+                    batch = next(batches, _DONE)
+                if batch is _DONE or not put(outbox, batch):
+                    break
+        except BaseException as e:
+            fail(e)
+        finally:
+            if hasattr(batches, 'close'):
+                batches.close()
+            put(outbox, _DONE)
+
+    def run_step(name, fn, inbox, outbox):
+        try:
+            while (batch := get(inbox)) is not _DONE:
+                with stage(name):
+                    batch = fn(batch)
+                if batch and not put(outbox, batch):
+                    break
+        except BaseException as e:
+            fail(e)
+        finally:
+            put(outbox, _DONE)
+
+    threads = [threading.Thread(target=propagate(run_source), args=(queues[0],), name="pipeline-fetch", daemon=True)]
+    for i, (name, fn) in enumerate(steps):
+        threads.append(threading.Thread(target=propagate(run_step), args=(name, fn, queues[i], queues[i + 1]),
+                                        name=f"pipeline-{name}", daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        while (batch := get(queues[-1])) is not _DONE:
+            with stage('write'):
+                sink.write(batch)
+        with stage('write'):
+            sink.flush()
+    except BaseException as e:
+        fail(e)
+    finally:
+        for thread in threads:
+            thread.join()
+        sink.close()
+
+    if errors:
+        raise errors[0]
+    return sink
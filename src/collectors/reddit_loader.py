@@ -1,55 +1,216 @@
-import requests
+import os
 import time
 import math
 from datetime import datetime
-from src.models.base import Session, init_db, upsert_trend, add_metric
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from src.telemetry import count, propagate
+from src.collectors.http_pool import make_session, TokenBucket
+from src.collectors.pipeline import run_pipeline, IngestSink
+from src.models.base import Session, WriteSession, init_db, get_watermark, set_watermark, moved_posts, remember_posts
+from src.collectors.niche_classifier import subreddit_sources
 
 # ─── CONFIG ──────────────────────────────────────────────────────────
-SOURCES = {
-    'Cinema': ['movies', 'boxoffice', 'netflix', 'television'],
-    'Sport':  ['soccer', 'nba', 'formula1', 'sports'],
-    'Music':  ['popheads', 'hiphopheads', 'music', 'kpop'],
-}
+SOURCES = subreddit_sources()   # {niche: [subreddit, ...]} from niches.json
+BASE_URL = os.environ.get("REDDIT_BASE_URL", "https://www.reddit.com")  # Replay: benchmarks.replay
 
 HEADERS = {
     "User-Agent": "ViralWatchBot/2.0 (trend-monitoring-research)"
 }
 
+# Listings paged each scan, as listing:pages pairs: "hot:2,rising:1,new:2"
+LISTINGS = {
+    name.strip(): int(pages)
+    for name, _, pages in (pair.partition(":") for pair in os.environ.get("VIRAL_REDDIT_LISTINGS", "hot:2,rising:1,new:2").split(","))
+    if name.strip()
+}
+PAGE_SIZE = 100        # Posts per page (Reddit's maximum)
+
 MIN_ENGAGEMENT = 100   # Minimum (score + comments) to consider
+MIN_ENGAGEMENT_EARLY = 20   # Same for posts younger than EARLY_HOURS (mostly from rising / new)
+EARLY_HOURS = 3
+
+# A post already stored is written again only if score + comments moved by
+# MIN_DELTA and MIN_DELTA_RATIO of the stored value (or once the stored one
+# is FINGERPRINT_REFRESH_HOURS old, see base.moved_posts).
+MIN_DELTA = 10
+MIN_DELTA_RATIO = 0.05
+
+MAX_WORKERS = 8        # Concurrent in-flight requests
+RATE_PER_SEC = 1.0     # Initial budget, re-shaped by X-Ratelimit-* headers
+RATE_BURST = 4
+MAX_RETRIES = 4        # Attempts per subreddit on 429 / transient errors
+DEFAULT_RETRY_AFTER = 5.0
 
 
-def fetch_subreddit_hot(subreddit: str) -> list[dict]:
-    """Fetch 'Hot' posts from a subreddit via public JSON API."""
-    url = f"https://www.reddit.com/r/{subreddit}/hot.json?limit=25"
+class Throttled(Exception):
+    """Raised on HTTP 429 so the subreddit can be re-queued."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _apply_rate_headers(limiter: TokenBucket, headers):
+    """Feed Reddit's X-Ratelimit-Remaining / X-Ratelimit-Reset into the limiter."""
+    remaining = headers.get("X-Ratelimit-Remaining")
+    reset = headers.get("X-Ratelimit-Reset")
+    if remaining is None or reset is None:
+        return
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-
-        if resp.status_code == 429:
-            print(f"  ⚠️ Rate-limited on r/{subreddit}, sleeping 5s...")
-            time.sleep(5)
-            return []
-        if resp.status_code != 200:
-            print(f"  ❌ r/{subreddit}: HTTP {resp.status_code}")
-            return []
-
-        posts = []
-        for item in resp.json().get('data', {}).get('children', []):
-            post = item['data']
-            if post.get('stickied'):
+        limiter.update(float(remaining), float(reset))
+    except ValueError:
+        pass
+
+
+def _retry_after(headers) -> float:
+    for name in ("Retry-After", "X-Ratelimit-Reset"):
+        value = headers.get(name)
+        if value:
+            try:
+                return max(float(value), 1.0)
+            except ValueError:
                 continue
-            posts.append({
-                'title': post['title'][:250],
-                'score': post['score'],
-                'comments': post['num_comments'],
-                'upvote_ratio': post.get('upvote_ratio', 0.5),
-                'created_utc': post['created_utc'],
-                'url': post.get('permalink', ''),
-            })
-        return posts
-
-    except Exception as e:
-        print(f"  ❌ r/{subreddit} exception: {e}")
+    return DEFAULT_RETRY_AFTER
+
+
+def fetch_listing(subreddit: str, listing: str = "hot", after: str | None = None, http=None,
+                  limiter: TokenBucket | None = None, limit: int = PAGE_SIZE) -> tuple[list[dict], str | None]:
+    """One page of a subreddit listing (hot, rising, new) via the public JSON API:
+    (posts, cursor of the next page or None).
+    Raises Throttled on HTTP 429 so callers can retry instead of dropping it."""
+    url = f"{BASE_URL}/r/{subreddit}/{listing}.json?limit={limit}"
+    if after:
+        url += f"&after={after}"
+    http = http or make_session(HEADERS)
+    if limiter:
+        limiter.acquire()
+
+    resp = http.get(url, timeout=10)
+    if limiter:
+        _apply_rate_headers(limiter, resp.headers)
+
+    if resp.status_code == 429:
+        raise Throttled(_retry_after(resp.headers))
+    if resp.status_code != 200:
+        print(f"  ❌ r/{subreddit}/{listing}: HTTP {resp.status_code}")
+        return [], None
+
+    data = resp.json().get('data', {})
+    return _parse_posts(data.get('children', [])), data.get('after')
+
+
+def _parse_posts(children: list[dict]) -> list[dict]:
+    posts = []
+    for item in children:
+        post = item['data']
+        if post.get('stickied'):
+            continue
+        posts.append({
+            'id': post['id'],
+            'title': post['title'][:250],
+            'score': post['score'],
+            'comments': post['num_comments'],
+            'upvote_ratio': post.get('upvote_ratio', 0.5),
+            'created_utc': post['created_utc'],
+            'url': post.get('permalink', ''),
+        })
+    return posts
+
+
+def fetch_by_id(post_ids: list[str], http=None, limiter: TokenBucket | None = None) -> list[dict]:
+    """Current state of up to PAGE_SIZE known posts in one request (/by_id).
+    Raises Throttled on HTTP 429, like fetch_listing."""
+    url = f"{BASE_URL}/by_id/{','.join('t3_' + post_id for post_id in post_ids)}.json?limit={len(post_ids)}"
+    http = http or make_session(HEADERS)
+    if limiter:
+        limiter.acquire()
+
+    resp = http.get(url, timeout=10)
+    if limiter:
+        _apply_rate_headers(limiter, resp.headers)
+
+    if resp.status_code == 429:
+        raise Throttled(_retry_after(resp.headers))
+    if resp.status_code != 200:
+        print(f"  ❌ by_id ({len(post_ids)} posts): HTTP {resp.status_code}")
         return []
+    return _parse_posts(resp.json().get('data', {}).get('children', []))
+
+
+def fetch_subreddit_hot(subreddit: str, http=None, limiter: TokenBucket | None = None) -> list[dict]:
+    """First page of 'Hot' posts."""
+    return fetch_listing(subreddit, "hot", None, http, limiter)[0]
+
+
+def iter_subreddits(subreddits: list[str], http=None, max_workers: int = MAX_WORKERS,
+                    listings: dict[str, int] | None = None, known_until: dict[str, float] | None = None):
+    """Page through every listing of many subreddits concurrently over one
+    pooled session, yielding (subreddit, listing, posts) per page as it completes.
+
+    Each listing follows its `after` cursor for up to listings[name] pages.
+    `new` also stops at the first page reaching known_until[subreddit] (the
+    newest post of the previous scan): older posts were seen already.
+    Throughput is bounded by a shared token bucket that follows Reddit's
+    rate-limit headers; throttled pages are re-queued after Retry-After
+    instead of being dropped."""
+    listings = listings or LISTINGS
+    known_until = known_until or {}
+    http = http or make_session(HEADERS, pool_size=max_workers)
+    limiter = TokenBucket(RATE_PER_SEC, RATE_BURST)
+    attempts = {}
+
+    def task(sub, listing, after, page):
+        attempts[sub, listing, page] = attempts.get((sub, listing, page), 0) + 1
+        return fetch_listing(sub, listing, after, http, limiter)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        def submit(*key):
+            pending[pool.submit(propagate(task), *key)] = key
+
+        pending = {}
+        for sub in subreddits:
+            for listing, pages in listings.items():
+                if pages > 0:
+                    submit(sub, listing, None, 1)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                sub, listing, after, page = key = pending.pop(future)
+                label = f"r/{sub}/{listing}" + (f" p{page}" if page > 1 else "")
+                try:
+                    posts, cursor = future.result()
+                except Throttled as e:
+                    limiter.pause(e.retry_after)
+                    reason = f"rate-limited, retry in {e.retry_after:.0f}s"
+                except Exception as e:
+                    reason = f"exception: {e}"
+                else:
+                    caught_up = listing == "new" and any(p['created_utc'] <= known_until.get(sub, 0) for p in posts)
+                    if cursor and page < listings[listing] and not caught_up:
+                        submit(sub, listing, cursor, page + 1)
+                    yield sub, listing, posts
+                    continue
+
+                if attempts[sub, listing, page] < MAX_RETRIES:
+                    print(f"  ⚠️ {label}: {reason} ({attempts[sub, listing, page]}/{MAX_RETRIES})")
+                    count('http_retries')
+                    submit(*key)
+                else:
+                    print(f"  ❌ {label}: abandon après {attempts[sub, listing, page]} essais ({reason})")
+                    yield sub, listing, []
+
+
+def fetch_all_subreddits(subreddits: list[str], http=None, max_workers: int = MAX_WORKERS,
+                         listings: dict[str, int] | None = None) -> dict[str, list[dict]]:
+    """{subreddit: posts} once every page is fetched (see iter_subreddits),
+    a post listed twice kept once."""
+    results = {sub: {} for sub in subreddits}
+    for sub, _, posts in iter_subreddits(subreddits, http, max_workers, listings):
+        for post in posts:
+            results[sub].setdefault(post['id'], post)
+    return {sub: list(posts.values()) for sub, posts in results.items()}
 
 
 def compute_velocity(score: int, comments: int, upvote_ratio: float, created_utc: float) -> float:
@@ -78,42 +239,87 @@ def compute_velocity(score: int, comments: int, upvote_ratio: float, created_utc
     return round(velocity, 1)
 
 
-def process_reddit_trends():
+def normalize_posts(batch: list[dict]) -> list[dict]:
+    """Posts of one listing page → records above their engagement floor whose
+    engagement moved since they were last written (velocity comes later)."""
+    early = datetime.utcnow().timestamp() - EARLY_HOURS * 3600
+    engaged = [
+        post for post in batch
+        if post['score'] + post['comments'] >= (MIN_ENGAGEMENT_EARLY if post['created_utc'] > early else MIN_ENGAGEMENT)
+    ]
     session = Session()
-    print("🚀 Reddit: démarrage du scan...")
-    total_new = 0
+    try:
+        moved = moved_posts(session, 'reddit', {p['id']: (p['score'], p['comments']) for p in engaged},
+                            MIN_DELTA, MIN_DELTA_RATIO)
+    finally:
+        session.close()
+    records = [
+        {
+            'topic': post['title'],
+            'niche': post['niche'],
+            'platform': 'Reddit',
+            'external_id': post['id'],
+            'volume': post['score'],
+            'comments': post['comments'],
+            'upvote_ratio': post['upvote_ratio'],
+            'created_utc': post['created_utc'],
+        }
+        for post in engaged if post['id'] in moved
+    ]
+    count('rows_skipped', len(batch) - len(records))
+    unchanged = f", {len(engaged) - len(records)} inchangés" if len(engaged) > len(records) else ""
+    print(f"  r/{batch[0]['subreddit']}/{batch[0]['listing']} ({batch[0]['niche']}): "
+          f"{len(batch)} posts → {len(records)} retenus{unchanged}")
+    return records
 
-    for niche, subreddits in SOURCES.items():
-        print(f"\n  --- {niche} ---")
 
-        for sub in subreddits:
-            posts = fetch_subreddit_hot(sub)
-            kept = 0
+def score_posts(batch: list[dict]) -> list[dict]:
+    for rec in batch:
+        rec['velocity_score'] = compute_velocity(
+            rec['volume'], rec['comments'], rec['upvote_ratio'], rec['created_utc']
+        )
+    return batch
 
-            for post in posts:
-                engagement = post['score'] + post['comments']
-                if engagement < MIN_ENGAGEMENT:
-                    continue
 
-                velocity = compute_velocity(
-                    post['score'], post['comments'],
-                    post['upvote_ratio'], post['created_utc']
-                )
+def process_reddit_trends(http=None, listings: dict[str, int] | None = None):
+    print("🚀 Reddit: démarrage du scan...")
+    niche_of = {}
+    for niche, subreddits in SOURCES.items():
+        for sub in subreddits:
+            niche_of.setdefault(sub, niche)
+    started = time.monotonic()
 
-                trend = upsert_trend(session, post['title'], niche, 'Reddit')
-                was_new = trend.first_detected == trend.last_updated
-                add_metric(session, trend, 'Reddit', post['score'], velocity)
+    session = Session()
+    known_until = {sub: get_watermark(session, f"reddit_new:{sub}") for sub in niche_of}
+    session.close()
+    newest = dict(known_until)
 
-                if was_new:
-                    total_new += 1
-                kept += 1
+    def source():
+        seen = set()     # A post in hot and new is handled once
+        for sub, listing, posts in iter_subreddits(list(niche_of), http, listings=listings, known_until=known_until):
+            fresh = [post for post in posts if post['id'] not in seen]
+            seen.update(post['id'] for post in fresh)
+            if listing == "new" and posts:
+                newest[sub] = max(newest[sub], int(max(post['created_utc'] for post in posts)))
+            if not fresh:
+                continue
+            yield [dict(post, subreddit=sub, listing=listing, niche=niche_of[sub]) for post in fresh]
 
-            print(f"  r/{sub}: {len(posts)} posts → {kept} retenus")
-            time.sleep(1.5)  # Rate-limit politeness
+    sink = IngestSink(on_write=lambda session, records: remember_posts(
+        session, 'reddit', {r['external_id']: (r['volume'], r['comments']) for r in records}))
+    run_pipeline(source(), normalize=normalize_posts, score=score_posts, sink=sink)
 
+    # Only once everything is written: a failed scan reads `new` again from the old cursor.
+    session = WriteSession()
+    for sub, created in newest.items():
+        if created > known_until[sub]:
+            set_watermark(session, f"reddit_new:{sub}", created)
     session.commit()
     session.close()
-    print(f"\n✅ Reddit: terminé. {total_new} nouveaux sujets.")
+
+    print(f"\n✅ Reddit: terminé en {time.monotonic() - started:.1f}s. "
+          f"{sink.new_topics} nouveaux sujets ({sink.records} mesures, {sink.commits} commits).")
+    return sink.records
 
 
 if __name__ == "__main__":
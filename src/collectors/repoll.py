@@ -0,0 +1,187 @@
+"""
+Adaptive re-polling — fresh measurements for the trends accelerating right now.
+
+    python -m src.collectors.repoll [--top 20] [--hours 12]
+
+The regular scan measures everything every 4 hours. In between, the engine
+runs this pass every REPOLL_MINUTES: per platform, the TOP_N trends with
+the highest momentum acceleration (src.analysis.momentum) on their latest
+metric are measured again, and only those:
+
+- Reddit: the posts behind them in one /by_id request per 100 posts
+- Google: only the markets they trend in, and only their queries are kept
+
+The long tail stays on the slow cadence, so a re-poll costs a handful of
+requests. Metrics land in the current window (VIRAL_WINDOW_MINUTES, which
+defaults to the re-poll interval), so every re-poll is its own point. The
+engine does not schedule re-polls when the window is set longer.
+"""
+import os
+import argparse
+from datetime import datetime, timedelta
+
+from src.telemetry import count
+from src.collectors import google_trends, reddit_loader
+from src.collectors.http_pool import make_session, TokenBucket
+from src.collectors.pipeline import run_pipeline, IngestSink
+from src.models.base import Session, init_db, moved_posts, remember_posts, remember_items
+from src.models.config import REPOLL_MINUTES
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+TOP_N = int(os.environ.get("VIRAL_REPOLL_TOP", "20"))   # Trends re-polled per platform
+HOT_HOURS = 12         # Only trends whose latest metric is this recent
+GOOGLE_TTL = 60        # Seconds a Google payload is reused without revalidating
+
+# Latest metric of every (trend, platform) measured recently, ranked per
+# platform by acceleration. Reddit trends need the post id to be re-fetched.
+HOT_SQL = """
+    SELECT platform, trend_id, topic, niche, external_id, geo
+    FROM (
+        SELECT m.platform, m.trend_id, t.topic, t.niche, t.external_id, m.geo,
+               ROW_NUMBER() OVER (PARTITION BY m.platform ORDER BY m.acceleration DESC) AS rank
+        FROM trend_metrics m
+        JOIN trends t ON t.id = m.trend_id
+        WHERE m.timestamp > ? AND m.acceleration > 0
+          AND (m.platform = 'Google' OR (m.platform = 'Reddit' AND t.external_id IS NOT NULL))
+          AND m.id = (
+              SELECT x.id FROM trend_metrics x
+              WHERE x.trend_id = m.trend_id AND x.platform = m.platform
+              ORDER BY x.timestamp DESC LIMIT 1
+          )
+    )
+    WHERE rank <= ?
+    ORDER BY platform, rank
+"""
+
+
+def hot_trends(session, top_n: int = TOP_N, hours: float = HOT_HOURS) -> dict[str, list[dict]]:
+    """{platform: [trend, ...]} — the top_n accelerating trends per platform, fastest first."""
+    since = (datetime.utcnow() - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+    hot = {'Reddit': [], 'Google': []}
+    for platform, trend_id, topic, niche, external_id, geo in session.connection().exec_driver_sql(
+            HOT_SQL, (since, top_n)):
+        hot[platform].append({'id': trend_id, 'topic': topic, 'niche': niche, 'external_id': external_id, 'geo': geo})
+    return hot
+
+
+# ─── REDDIT ─────────────────────────────────────────────────────────
+def repoll_reddit(trends: list[dict], http=None) -> int:
+    """Re-fetch the posts behind hot Reddit trends, PAGE_SIZE per request."""
+    if not trends:
+        return 0
+    trend_of = {t['external_id']: t for t in trends}
+    ids = list(trend_of)
+    http = http or make_session(reddit_loader.HEADERS)
+    limiter = TokenBucket(reddit_loader.RATE_PER_SEC, reddit_loader.RATE_BURST)
+
+    def source():
+        for i in range(0, len(ids), reddit_loader.PAGE_SIZE):
+            chunk = ids[i:i + reddit_loader.PAGE_SIZE]
+            for attempt in range(1, reddit_loader.MAX_RETRIES + 1):
+                try:
+                    posts = reddit_loader.fetch_by_id(chunk, http, limiter)
+                    break
+                except reddit_loader.Throttled as e:
+                    limiter.pause(e.retry_after)
+                    reason = f"rate-limited, retry in {e.retry_after:.0f}s"
+                except Exception as e:
+                    reason = f"exception: {e}"
+                if attempt < reddit_loader.MAX_RETRIES:
+                    print(f"  ⚠️ by_id: {reason} ({attempt}/{reddit_loader.MAX_RETRIES})")
+                    count('http_retries')
+            else:
+                print(f"  ❌ by_id: abandon après {reddit_loader.MAX_RETRIES} essais ({reason})")
+                continue
+            yield [post for post in posts if post['id'] in trend_of]
+
+    def normalize(batch: list[dict]) -> list[dict]:
+        # Same "barely moved" rule as the scan: no row for a post that stalled.
+        session = Session()
+        try:
+            moved = moved_posts(session, 'reddit', {p['id']: (p['score'], p['comments']) for p in batch},
+                                reddit_loader.MIN_DELTA, reddit_loader.MIN_DELTA_RATIO)
+        finally:
+            session.close()
+        count('rows_skipped', len(batch) - len(moved))
+        return [
+            {
+                'topic': trend_of[post['id']]['topic'],
+                'niche': trend_of[post['id']]['niche'],
+                'platform': 'Reddit',
+                'external_id': post['id'],
+                'volume': post['score'],
+                'comments': post['comments'],
+                'upvote_ratio': post['upvote_ratio'],
+                'created_utc': post['created_utc'],
+            }
+            for post in batch if post['id'] in moved
+        ]
+
+    sink = IngestSink(on_write=lambda session, records: remember_posts(
+        session, 'reddit', {r['external_id']: (r['volume'], r['comments']) for r in records}))
+    run_pipeline(source(), normalize=normalize, score=reddit_loader.score_posts, sink=sink)
+    print(f"  🔁 Reddit: {len(ids)} posts re-mesurés → {sink.records} mises à jour")
+    return sink.records
+
+
+# ─── GOOGLE ─────────────────────────────────────────────────────────
+def repoll_google(trends: list[dict], http=None) -> int:
+    """Re-fetch the markets hot Google queries trend in; keep only those queries."""
+    if not trends:
+        return 0
+    niche_of = {t['topic']: t['niche'] for t in trends}
+    tags = {label for t in trends for label in (t['geo'] or "").split(",") if label}
+    labels = google_trends.market_labels(google_trends.MARKETS)
+    markets = [market for market in google_trends.MARKETS if labels[market] in tags] or google_trends.MARKETS
+
+    def source():
+        per_geo = google_trends.fetch_all_markets(markets, http, ttl=GOOGLE_TTL)
+        # Scored against the whole market list (rank), then narrowed down.
+        items = [item for item in google_trends.fold_markets(per_geo) if item['topic'] in niche_of]
+        if items:
+            yield items
+
+    def normalize(batch: list[dict]) -> list[dict]:
+        records = google_trends.drop_unchanged(batch)
+        for rec in records:
+            del rec['text']     # Known trends keep their niche, nothing to classify
+            rec['niche'] = niche_of[rec['topic']]
+        return records
+
+    sink = IngestSink(on_write=lambda session, records: remember_items(
+        session, 'google', {r['topic']: r['digest'] for r in records}))
+    run_pipeline(source(), normalize=normalize, sink=sink)
+    print(f"  🔁 Google: {len(niche_of)} requêtes sur {', '.join(labels[market] for market in markets)} "
+          f"→ {sink.records} mises à jour")
+    return sink.records
+
+
+def repoll(top_n: int = TOP_N, hours: float = HOT_HOURS, reddit_http=None, google_http=None) -> dict:
+    """One re-poll pass over the hot set. Returns {'hot': n, 'written': n}."""
+    session = Session()
+    try:
+        hot = hot_trends(session, top_n, hours)
+    finally:
+        session.close()
+    total = sum(len(trends) for trends in hot.values())
+    if not total:
+        print("🔁 Re-poll: aucune tendance en accélération.")
+        return {'hot': 0, 'written': 0}
+
+    print(f"🔁 Re-poll: {len(hot['Reddit'])} Reddit, {len(hot['Google'])} Google en accélération")
+    written = repoll_reddit(hot['Reddit'], reddit_http) + repoll_google(hot['Google'], google_http)
+    return {'hot': total, 'written': written}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-measure the fastest accelerating trends")
+    parser.add_argument("--top", type=int, default=TOP_N, help="trends per platform")
+    parser.add_argument("--hours", type=float, default=HOT_HOURS, help="only trends measured this recently")
+    args = parser.parse_args()
+
+    init_db()
+    repoll(args.top, args.hours)
+
+
+if __name__ == "__main__":
+    main()
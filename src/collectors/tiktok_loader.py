@@ -1,18 +1,19 @@
+import os
 import math
-from playwright.sync_api import sync_playwright
-from src.models.base import Session, init_db, upsert_trend, add_metric
+import asyncio
+import threading
+from src.models.base import init_db
+from src.collectors.niche_classifier import get_classifier
+from src.collectors.pipeline import run_pipeline, classify_with, IngestSink
 
 # ─── CONFIG ──────────────────────────────────────────────────────────
-URL_HASHTAGS = "https://ads.tiktok.com/business/creativecenter/inspiration/popular/hashtag/pc/en"
-URL_SONGS = "https://ads.tiktok.com/business/creativecenter/inspiration/popular/music/pc/en"
-
-NICHE_KEYWORDS = {
-    'Cinema': ['movie', 'netflix', 'film', 'actor', 'cinema', 'disney', 'series', 'show',
-               'marvel', 'trailer', 'premiere', 'oscar', 'hbo', 'anime'],
-    'Sport':  ['football', 'nba', 'sport', 'fitness', 'gym', 'ufc', 'soccer', 'basketball',
-               'f1', 'tennis', 'running', 'workout', 'match', 'goal'],
-    'Music':  ['song', 'music', 'concert', 'lyrics', 'rap', 'pop', 'singer', 'album',
-               'dj', 'beat', 'dance', 'kpop', 'hiphop', 'remix'],
+BASE_URL = os.environ.get("TIKTOK_CC_BASE_URL", "https://ads.tiktok.com")  # Replay: benchmarks.replay
+URL_HASHTAGS = f"{BASE_URL}/business/creativecenter/inspiration/popular/hashtag/pc/en"
+URL_SONGS = f"{BASE_URL}/business/creativecenter/inspiration/popular/music/pc/en"
+
+PAGES = {
+    "hashtag": URL_HASHTAGS,
+    "song": URL_SONGS,
 }
 
 USER_AGENT = (
@@ -20,54 +21,126 @@ USER_AGENT = (
     "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 )
 
+# Never downloaded: the data we want only comes from the JSON API calls.
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+BLOCKED_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "analytics.tiktok.com", "mon.tiktokv.com", "mcs.tiktokv.com",
+    "connect.facebook.net", "sentry",
+)
+
+
+async def _block_heavy_resources(route):
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(h in request.url for h in BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
 
-def intercept_tiktok_data(page_type: str = "hashtag") -> list[dict]:
-    """Launch headless browser, navigate to Creative Center, intercept API JSON."""
+
+async def _capture_page(browser, page_type: str) -> list[dict]:
+    """Load one Creative Center page in its own context and intercept API JSON."""
     data_captured = []
+    context = await browser.new_context(user_agent=USER_AGENT)
+    await context.route("**/*", _block_heavy_resources)
+    page = await context.new_page()
+
+    async def handle_response(response):
+        try:
+            ct = response.headers.get("content-type", "")
+            if "api" in response.url and "json" in ct:
+                body = await response.json()
+                items = body.get("data", {}).get("list", [])
+                if items:
+                    print(f"  ⚡ Intercepté ({page_type}): {len(items)} items")
+                    data_captured.extend(items)
+        except Exception:
+            pass
+
+    page.on("response", handle_response)
+    print(f"🕵️ TikTok: loading {page_type}...")
+
+    try:
+        await page.goto(PAGES[page_type], timeout=60000)
+        await page.wait_for_timeout(5000)
+        # Scroll to trigger lazy-loaded API calls
+        for _ in range(3):
+            await page.mouse.wheel(0, 2000)
+            await page.wait_for_timeout(2000)
+    except Exception as e:
+        print(f"  ❌ TikTok navigation error ({page_type}): {e}")
+    finally:
+        await context.close()
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(user_agent=USER_AGENT)
-        page = context.new_page()
+    return data_captured
 
-        def handle_response(response):
-            try:
-                ct = response.headers.get("content-type", "")
-                if "api" in response.url and "json" in ct:
-                    body = response.json()
-                    items = body.get("data", {}).get("list", [])
-                    if items:
-                        print(f"  ⚡ Intercepté: {len(items)} items")
-                        data_captured.extend(items)
-            except Exception:
-                pass
 
-        page.on("response", handle_response)
+async def capture_pages(browser, page_types=tuple(PAGES)) -> dict[str, list[dict]]:
+    """Load every page type in parallel contexts of an already running browser."""
+    results = await asyncio.gather(*(_capture_page(browser, pt) for pt in page_types))
+    return dict(zip(page_types, results))
 
-        target = URL_HASHTAGS if page_type == "hashtag" else URL_SONGS
-        print(f"🕵️ TikTok: loading {page_type}...")
 
+async def _intercept_all(page_types) -> dict[str, list[dict]]:
+    from playwright.async_api import async_playwright   # heavy: only when scraping
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
         try:
-            page.goto(target, timeout=60000)
-            page.wait_for_timeout(5000)
-            # Scroll to trigger lazy-loaded API calls
-            for _ in range(3):
-                page.mouse.wheel(0, 2000)
-                page.wait_for_timeout(2000)
-        except Exception as e:
-            print(f"  ❌ TikTok navigation error: {e}")
+            return await capture_pages(browser, page_types)
+        finally:
+            await browser.close()
 
-        browser.close()
 
-    return data_captured
+def intercept_tiktok_data(page_types=tuple(PAGES)) -> dict[str, list[dict]]:
+    """Launch one headless browser for the whole run and intercept every page type."""
+    return asyncio.run(_intercept_all(tuple(page_types)))
+
+
+class WarmBrowser:
+    """One Chromium kept alive across runs, driven from its own event-loop thread.
+
+    Long-running processes (see src.engine) call capture() once per scan
+    instead of paying a browser launch every time."""
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="tiktok-browser", daemon=True)
+        self._playwright = None
+        self._browser = None
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _launch(self):
+        from playwright.async_api import async_playwright
+
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+
+    def capture(self, page_types=tuple(PAGES)) -> dict[str, list[dict]]:
+        if not self._thread.is_alive():
+            self._thread.start()
+        if self._browser is None or not self._browser.is_connected():
+            self._run(self._launch())   # first use, or Chromium crashed since last scan
+        return self._run(capture_pages(self._browser, tuple(page_types)))
+
+    async def _shutdown(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._run(self._shutdown())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
 
 
 def classify_niche(name: str) -> str:
-    name_lower = name.lower()
-    for niche, keywords in NICHE_KEYWORDS.items():
-        if any(kw in name_lower for kw in keywords):
-            return niche
-    return 'General'
+    return get_classifier('tiktok').classify(name)
 
 
 def compute_velocity(view_count: int, rank: int, total: int) -> float:
@@ -81,45 +154,71 @@ def compute_velocity(view_count: int, rank: int, total: int) -> float:
     return round(max(base + rank_bonus, 50.0), 1)
 
 
-def process_tiktok_trends():
-    session = Session()
+def _to_int(value) -> int:
+    # Sometimes counts are strings like "1,234+"
+    if isinstance(value, str):
+        return int(value.replace(',', '').replace('+', '') or 0)
+    return int(value or 0)
+
+
+def normalize_items(batch: list[dict]) -> list[dict]:
+    """Captured items of one page (kind, rank, total, raw) → records.
+    Hashtags are classified downstream; trending sounds are their own
+    signal: always 'Music', topic prefixed with ♪."""
+    records = []
+    for item in batch:
+        raw = item['raw']
+        if item['kind'] == 'hashtag':
+            name = raw.get("hashtag_name", "") or raw.get("name", "")
+            if not name:
+                continue
+            topic, niche, text = f"#{name}", None, name
+            volume = _to_int(raw.get("view_count", 0) or raw.get("video_views", 0))
+        else:
+            title = raw.get("title", "") or raw.get("song_name", "")
+            if not title:
+                continue
+            author = raw.get("author", "")
+            topic, niche, text = (f"♪ {title} — {author}" if author else f"♪ {title}"), 'Music', title
+            volume = _to_int(raw.get("user_num", 0) or raw.get("video_views", 0) or raw.get("view_count", 0))
+        records.append({
+            'topic': topic,
+            'niche': niche,
+            'text': text,
+            'platform': 'TikTok',
+            'volume': volume,
+            'rank': item['rank'],
+            'total': item['total'],
+        })
+    return records
+
+
+def score_items(batch: list[dict]) -> list[dict]:
+    for rec in batch:
+        rec['velocity_score'] = compute_velocity(rec['volume'], rec['rank'], rec['total'])
+    return batch
+
+
+def process_tiktok_trends(browser: WarmBrowser | None = None):
     print("🚀 TikTok: démarrage de l'interception...")
-
-    hashtags = intercept_tiktok_data("hashtag")
-
-    if not hashtags:
-        print("  ⚠️ Aucun hashtag intercepté (le DOM a peut-être changé).")
-        session.close()
-        return
-
-    count_new = 0
-    total = len(hashtags)
-
-    for rank, item in enumerate(hashtags):
-        name = item.get("hashtag_name", "") or item.get("name", "")
-        if not name:
-            continue
-
-        view_count = item.get("view_count", 0) or item.get("video_views", 0) or 0
-        # Sometimes view_count is a string
-        if isinstance(view_count, str):
-            view_count = int(view_count.replace(',', '').replace('+', '') or 0)
-
-        niche = classify_niche(name)
-        velocity = compute_velocity(view_count, rank, total)
-        topic_name = f"#{name}"
-
-        trend = upsert_trend(session, topic_name, niche, 'TikTok')
-        was_new = trend.first_detected == trend.last_updated
-        add_metric(session, trend, 'TikTok', view_count, velocity)
-
-        if was_new:
-            count_new += 1
-            print(f"  [+] {topic_name} ({niche}) — Views: {view_count:,} — Vel: {velocity}")
-
-    session.commit()
-    session.close()
-    print(f"✅ TikTok: terminé. {count_new} nouveaux sujets.")
+    found = {}
+
+    def source():
+        captured = browser.capture() if browser else intercept_tiktok_data()
+        for kind, label in (("hashtag", "hashtag"), ("song", "son")):
+            items = captured.get(kind, [])
+            found[kind] = len(items)
+            if not items:
+                print(f"  ⚠️ Aucun {label} intercepté (le DOM a peut-être changé).")
+                continue
+            yield [{'kind': kind, 'rank': rank, 'total': len(items), 'raw': raw} for rank, raw in enumerate(items)]
+
+    sink = IngestSink(describe=lambda rec: f"{rec['topic']} ({rec['niche']}) — Views: {rec['volume']:,} — Vel: {rec['velocity_score']}")
+    run_pipeline(source(), normalize=normalize_items, classify=classify_with('tiktok'), score=score_items, sink=sink)
+    if any(found.values()):
+        print(f"✅ TikTok: terminé. {sink.new_topics} nouveaux sujets "
+              f"({found['hashtag']} hashtags, {found['song']} sons).")
+    return sink.records
 
 
 if __name__ == "__main__":
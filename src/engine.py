@@ -0,0 +1,249 @@
+"""
+Viral Watch Engine — long-running scheduler replacing the per-job cron entries.
+
+    python -m src.engine [--run-now] [--once] [--no-tiktok]
+
+One process keeps the DB engine, the pooled HTTP sessions and a Chromium
+instance warm between runs. Every ingestion cycle runs the collectors
+concurrently, then refreshes momentum (growth / acceleration from the
+metric history) and starts the radar as soon as the last one finishes.
+Between cycles, every REPOLL_MINUTES, the fastest accelerating trends are
+measured again (src.collectors.repoll) and their momentum refreshed. A job
+never overlaps itself: a trigger that fires while the previous run is still
+going is skipped (or queued once, for the radar).
+"""
+import signal
+import argparse
+import threading
+import traceback
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from src.models.base import init_db
+from src.models.config import CANONICALIZE, WINDOW_MINUTES
+from src.telemetry import track_run, stage
+from src.collectors.http_pool import make_session
+from src.collectors import google_trends, reddit_loader, repoll
+
+# ─── CONFIG (local time, TZ=Europe/Paris in the container) ──────────
+INGEST_HOURS = (0, 4, 8, 12, 16, 20)
+BRIEFING_AT = (6, 55)              # Daily
+RETENTION_AT = (6, 3, 30)          # Weekly: Sunday (weekday 6) 03:30
+MAX_SLEEP = 60                     # Re-check the clock at least once a minute
+
+
+def log(msg: str):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {msg}", flush=True)
+
+
+# ─── SCHEDULE HELPERS ───────────────────────────────────────────────
+def next_ingest(now: datetime) -> datetime:
+    for day in range(2):
+        base = (now + timedelta(days=day)).replace(minute=0, second=0, microsecond=0)
+        for hour in INGEST_HOURS:
+            candidate = base.replace(hour=hour)
+            if candidate > now:
+                return candidate
+    raise ValueError("INGEST_HOURS is empty")
+
+
+def next_daily(now: datetime, hour: int, minute: int) -> datetime:
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return candidate if candidate > now else candidate + timedelta(days=1)
+
+
+def next_weekly(now: datetime, weekday: int, hour: int, minute: int) -> datetime:
+    candidate = next_daily(now, hour, minute)
+    return candidate + timedelta(days=(weekday - candidate.weekday()) % 7)
+
+
+class Job:
+    """A named task that never runs twice at once.
+
+    overlap='skip' drops a trigger while a run is in progress;
+    overlap='queue' remembers one and runs it right after."""
+
+    def __init__(self, name: str, func, overlap: str = 'skip'):
+        self.name = name
+        self.func = func
+        self.overlap = overlap
+        self._state = threading.Lock()
+        self._running = False
+        self._queued = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def run(self) -> bool:
+        with self._state:
+            if self._running:
+                if self.overlap == 'queue':
+                    self._queued = True
+                    log(f"⏳ {self.name}: déjà en cours, relancé à la fin")
+                else:
+                    log(f"⏭️ {self.name}: déjà en cours, déclenchement ignoré")
+                return False
+            self._running = True
+
+        while True:
+            started = time.monotonic()
+            log(f"▶️ {self.name}")
+            try:
+                with track_run(self.name):
+                    self.func()
+                log(f"✅ {self.name} ({time.monotonic() - started:.1f}s)")
+            except Exception:
+                log(f"❌ {self.name} a échoué:\n{traceback.format_exc()}")
+
+            with self._state:
+                if not self._queued:
+                    self._running = False
+                    return True
+                self._queued = False
+
+
+class Engine:
+    def __init__(self, tiktok: bool = True):
+        init_db()
+        if CANONICALIZE:
+            from src.models.canonical import backfill
+            backfill()   # Trends ingested before canonicalization was enabled
+        self.reddit_http = make_session(reddit_loader.HEADERS, pool_size=reddit_loader.MAX_WORKERS)
+        self.google_http = make_session(google_trends.HEADERS)
+        self.browser = None
+
+        self.collectors = [
+            Job('google', lambda: google_trends.process_trends(self.google_http)),
+            Job('reddit', lambda: reddit_loader.process_reddit_trends(self.reddit_http)),
+        ]
+        if tiktok:
+            from src.collectors import tiktok_loader
+            self.browser = tiktok_loader.WarmBrowser()
+            self.collectors.append(
+                Job('tiktok', lambda: tiktok_loader.process_tiktok_trends(self.browser))
+            )
+
+        self.momentum = Job('momentum', self._run_momentum, overlap='queue')
+        self.radar = Job('radar', self._run_radar, overlap='queue')
+        self.archive = Job('archive', self._run_archive)
+        self.ingest = Job('ingest', self._ingest_cycle)
+        self.repoll = Job('repoll', self._repoll_cycle)
+        self.briefing = Job('briefing', self._run_briefing)
+        self.retention = Job('retention', self._run_retention)
+
+        self.schedule = {
+            self.ingest: next_ingest,
+            self.briefing: lambda now: next_daily(now, *BRIEFING_AT),
+            self.retention: lambda now: next_weekly(now, *RETENTION_AT),
+        }
+        if 0 < repoll.REPOLL_MINUTES < WINDOW_MINUTES:
+            # Re-polls would land in the window of the previous measurement and overwrite it.
+            log(f"⚠️ repoll désactivé : VIRAL_REPOLL_MINUTES={repoll.REPOLL_MINUTES} < "
+                f"VIRAL_WINDOW_MINUTES={WINDOW_MINUTES}")
+        elif repoll.REPOLL_MINUTES > 0:
+            self.schedule[self.repoll] = lambda now: now + timedelta(minutes=repoll.REPOLL_MINUTES)
+        self._collector_pool = ThreadPoolExecutor(len(self.collectors), thread_name_prefix="collector")
+        self._dispatch_pool = ThreadPoolExecutor(len(self.schedule), thread_name_prefix="job")
+        self._stop = threading.Event()
+
+    # ─── JOBS ────────────────────────────────────────────────────────
+    def _ingest_cycle(self):
+        """All collectors in parallel, then momentum and the radar once ingestion
+        is done; the window that just closed goes to the columnar archive."""
+        wait([self._collector_pool.submit(job.run) for job in self.collectors])
+        self.momentum.run()
+        self.radar.run()
+        self.archive.run()
+
+    def _repoll_cycle(self):
+        """Hot trends only; the full scan already covers them while it runs."""
+        if self.ingest.running:
+            log("⏭️ repoll: scan complet en cours")
+            return
+        stats = repoll.repoll(reddit_http=self.reddit_http, google_http=self.google_http)
+        if stats['written']:
+            self.momentum.run()
+
+    def _run_momentum(self):
+        from src.analysis.momentum import run
+        stats = run()
+        log(f"📈 Momentum: {stats['rows']:,} métriques, {stats['updated']:,} mises à jour")
+
+    def _run_radar(self):
+        from src.analysis.cross_platform_radar import find_cross_platform_opportunities
+        find_cross_platform_opportunities()
+
+    def _run_archive(self):
+        from src.models.archive import export
+        stats = export()
+        log(f"🗄️ Archive: +{stats['rows']:,} lignes ({stats['total']:,} au total)")
+
+    def _run_briefing(self):
+        from src.analysis.discord_briefing import send_briefing
+        send_briefing()
+
+    def _run_retention(self):
+        from src.models.retention import rollup_and_prune, compact
+        with stage('prune'):
+            stats = rollup_and_prune()
+        log(f"🧹 Rétention: {stats['metrics']:,} métriques agrégées, {stats['trends']:,} sujets supprimés")
+        with stage('compact'):
+            compact()
+
+    # ─── LOOP ────────────────────────────────────────────────────────
+    def submit(self, job: Job):
+        self._dispatch_pool.submit(job.run)
+
+    def stop(self, *_):
+        log("🛑 Arrêt demandé...")
+        self._stop.set()
+
+    def run_forever(self, run_now: bool = False):
+        due = {job: next_at(datetime.now()) for job, next_at in self.schedule.items()}
+        for job, when in due.items():
+            log(f"🗓️ {job.name}: prochain passage {when:%Y-%m-%d %H:%M}")
+        if run_now:
+            self.submit(self.ingest)
+
+        while not self._stop.is_set():
+            job, when = min(due.items(), key=lambda kv: kv[1])
+            delay = (when - datetime.now()).total_seconds()
+            if delay > 0:
+                self._stop.wait(min(delay, MAX_SLEEP))
+                continue
+            self.submit(job)
+            due[job] = self.schedule[job](datetime.now())
+
+    def close(self):
+        self._dispatch_pool.shutdown(wait=True)
+        self._collector_pool.shutdown(wait=True)
+        if self.browser is not None:
+            self.browser.close()
+        self.reddit_http.close()
+        self.google_http.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Viral Watch scheduler daemon")
+    parser.add_argument("--run-now", action="store_true", help="start an ingestion cycle immediately")
+    parser.add_argument("--once", action="store_true", help="run one ingestion cycle and exit")
+    parser.add_argument("--no-tiktok", action="store_true", help="skip the Playwright collector")
+    args = parser.parse_args()
+
+    engine = Engine(tiktok=not args.no_tiktok)
+    try:
+        if args.once:
+            engine.ingest.run()
+            return
+        signal.signal(signal.SIGTERM, engine.stop)
+        signal.signal(signal.SIGINT, engine.stop)
+        log("🛰️ Viral Watch Engine démarré")
+        engine.run_forever(run_now=args.run_now)
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
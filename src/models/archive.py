@@ -0,0 +1,329 @@
+"""
+Columnar history archive — sealed scan windows as memory-mapped NumPy columns.
+
+    python -m src.models.archive export
+    python -m src.models.archive stats
+    python -m src.models.archive query --topic "dune" [--platform Reddit] [--days 90]
+
+Layout (VIRAL_ARCHIVE_DIR, default <DB_DIR>/archive):
+
+    schema.json              row count, sealed-through window, dictionary sizes
+    columns/<name>.bin       one fixed-width little-endian array per column
+    dict/<name>.jsonl        one JSON string per line; the line number is the code
+
+Only windows older than the current scan window are exported: they never
+change again, so files are append-only. Rows are appended in time order,
+so time ranges are a binary search. schema.json is replaced last and is the
+commit point: anything past its row count is an unfinished export, cut
+off on the next one.
+"""
+import os
+import json
+import time
+import calendar
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src import telemetry
+from src.models.base import Session, init_db, get_window_bucket
+from src.models.config import DB_DIR
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+ARCHIVE_DIR = os.environ.get("VIRAL_ARCHIVE_DIR", os.path.join(DB_DIR, "archive"))
+FETCH_ROWS = 100_000
+
+COLUMNS = {
+    'metric_id': '<i8',
+    'trend_id': '<i8',
+    'ts': '<i8',             # Epoch seconds (UTC)
+    'window': '<i8',         # Scan window start, epoch seconds
+    'topic': '<i4',          # Dictionary codes
+    'niche': '<i2',
+    'platform': '<i2',
+    'volume': '<i8',
+    'velocity': '<f4',
+    'growth': '<f4',         # NaN where the momentum engine had no value
+    'acceleration': '<f4',
+    'ewma': '<f4',
+}
+DICTIONARIES = ('topic', 'niche', 'platform')
+
+EXPORT_SQL = """
+    SELECT m.id, m.trend_id, m.timestamp, m.window_bucket, t.topic, t.niche, m.platform,
+           m.volume, m.velocity_score, m.growth_rate, m.acceleration, m.ewma_velocity
+    FROM trend_metrics m
+    JOIN trends t ON t.id = m.trend_id
+    WHERE m.window_bucket > ? AND m.window_bucket < ?
+    ORDER BY m.window_bucket, m.timestamp, m.id
+"""
+
+
+def _window_epoch(scan_window: str) -> int:
+    """'2025-02-08_12' (UTC, see get_scan_window) -> epoch seconds."""
+    return calendar.timegm(datetime.strptime(scan_window, "%Y-%m-%d_%H").timetuple())
+
+
+def _sealed_through(schema: dict) -> int:
+    """Last archived window start; archives written before window_bucket hold its label."""
+    sealed = schema['sealed_through']
+    if isinstance(sealed, str):
+        return _window_epoch(sealed) if sealed else 0
+    return sealed
+
+
+def _window_label(epoch: int) -> str:
+    return datetime.utcfromtimestamp(epoch).strftime("%Y-%m-%d %H:%M") if epoch else "—"
+
+
+def _empty_schema() -> dict:
+    return {
+        'version': 1,
+        'rows': 0,
+        'sealed_through': 0,
+        'columns': COLUMNS,
+        'dictionaries': {name: {'entries': 0, 'bytes': 0} for name in DICTIONARIES},
+    }
+
+
+def load_schema(path: str = ARCHIVE_DIR) -> dict:
+    try:
+        with open(os.path.join(path, "schema.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return _empty_schema()
+
+
+def _load_dictionary(path: str, name: str, size: int) -> list[str]:
+    try:
+        with open(os.path.join(path, "dict", f"{name}.jsonl"), "rb") as f:
+            data = f.read(size)
+    except FileNotFoundError:
+        return []
+    return json.loads(b"[" + b",".join(data.splitlines()) + b"]")   # One parse, not one per entry
+
+
+# ─── EXPORT ──────────────────────────────────────────────────────────
+def _truncate(filename: str, size: int):
+    """Cut off what an interrupted export left past the last commit."""
+    if os.path.exists(filename) and os.path.getsize(filename) > size:
+        with open(filename, "r+b") as f:
+            f.truncate(size)
+
+
+def export(path: str = ARCHIVE_DIR) -> dict:
+    """Append every sealed scan window not yet archived. Returns counts."""
+    schema = load_schema(path)
+    os.makedirs(os.path.join(path, "columns"), exist_ok=True)
+    os.makedirs(os.path.join(path, "dict"), exist_ok=True)
+
+    for name, dtype in COLUMNS.items():
+        _truncate(os.path.join(path, "columns", f"{name}.bin"), schema['rows'] * np.dtype(dtype).itemsize)
+    codes = {}
+    for name in DICTIONARIES:
+        meta = schema['dictionaries'][name]
+        _truncate(os.path.join(path, "dict", f"{name}.jsonl"), meta['bytes'])
+        codes[name] = {value: i for i, value in enumerate(_load_dictionary(path, name, meta['bytes']))}
+
+    current = get_window_bucket()
+    session = Session()
+    rows_added = 0
+    last_window = _sealed_through(schema)
+    try:
+        cursor = session.connection().exec_driver_sql(EXPORT_SQL, (last_window, current))
+        files = {name: open(os.path.join(path, "columns", f"{name}.bin"), "ab") for name in COLUMNS}
+        dict_files = {name: open(os.path.join(path, "dict", f"{name}.jsonl"), "ab") for name in DICTIONARIES}
+        try:
+            while True:
+                rows = cursor.fetchmany(FETCH_ROWS)
+                if not rows:
+                    break
+                ids, trend_ids, stamps, windows, topics, niches, platforms, volumes, vel, gr, acc, ew = zip(*rows)
+
+                encoded = {}
+                for name, values in (('topic', topics), ('niche', niches), ('platform', platforms)):
+                    table = codes[name]
+                    out = dict_files[name]
+                    column = np.empty(len(values), dtype=COLUMNS[name])
+                    for i, value in enumerate(values):
+                        value = value or ""
+                        code = table.get(value)
+                        if code is None:
+                            code = table[value] = len(table)
+                            out.write(json.dumps(value, ensure_ascii=False).encode() + b"\n")
+                        column[i] = code
+                    encoded[name] = column
+
+                arrays = {
+                    'metric_id': np.array(ids, dtype=COLUMNS['metric_id']),
+                    'trend_id': np.array(trend_ids, dtype=COLUMNS['trend_id']),
+                    'ts': np.array(stamps, dtype='datetime64[s]').astype(COLUMNS['ts']),
+                    'window': np.array(windows, dtype=COLUMNS['window']),
+                    **encoded,
+                    'volume': np.array([v or 0 for v in volumes], dtype=COLUMNS['volume']),
+                    'velocity': np.array(vel, dtype=float).astype(COLUMNS['velocity']),
+                    'growth': np.array(gr, dtype=float).astype(COLUMNS['growth']),
+                    'acceleration': np.array(acc, dtype=float).astype(COLUMNS['acceleration']),
+                    'ewma': np.array(ew, dtype=float).astype(COLUMNS['ewma']),
+                }
+                for name, array in arrays.items():
+                    files[name].write(array.tobytes())
+                rows_added += len(rows)
+                last_window = windows[-1]
+        finally:
+            for f in (*files.values(), *dict_files.values()):
+                f.close()
+    finally:
+        session.close()
+
+    if rows_added:
+        schema['rows'] += rows_added
+        schema['sealed_through'] = last_window
+        for name in DICTIONARIES:
+            schema['dictionaries'][name] = {
+                'entries': len(codes[name]),
+                'bytes': os.path.getsize(os.path.join(path, "dict", f"{name}.jsonl")),
+            }
+        tmp = os.path.join(path, "schema.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(schema, f, indent=2)
+        os.replace(tmp, os.path.join(path, "schema.json"))
+    telemetry.count('rows_inserted', rows_added)
+    return {'rows': rows_added, 'total': schema['rows'], 'sealed_through': _sealed_through(schema)}
+
+
+# ─── READ ────────────────────────────────────────────────────────────
+class Archive:
+    """Read-only view over the archive; columns are np.memmap, nothing is
+    loaded until touched. Filters return index arrays into the columns."""
+
+    def __init__(self, path: str = ARCHIVE_DIR):
+        self.path = path
+        self.schema = load_schema(path)
+        self.rows = self.schema['rows']
+        self._columns = {}
+        self._dictionaries = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            dtype = np.dtype(self.schema['columns'][name])
+            if self.rows == 0:
+                self._columns[name] = np.empty(0, dtype=dtype)
+            else:
+                filename = os.path.join(self.path, "columns", f"{name}.bin")
+                self._columns[name] = np.memmap(filename, dtype=dtype, mode="r", shape=(self.rows,))
+        return self._columns[name]
+
+    def dictionary(self, name: str) -> list[str]:
+        if name not in self._dictionaries:
+            meta = self.schema['dictionaries'][name]
+            self._dictionaries[name] = _load_dictionary(self.path, name, meta['bytes'])
+        return self._dictionaries[name]
+
+    def codes(self, name: str, match) -> np.ndarray:
+        """Codes of dictionary entries equal to `match` (str), in it (set/list),
+        or for which it returns True (callable)."""
+        entries = self.dictionary(name)
+        if callable(match):
+            hits = [i for i, value in enumerate(entries) if match(value)]
+        elif isinstance(match, str):
+            hits = [i for i, value in enumerate(entries) if value == match]
+        else:
+            wanted = set(match)
+            hits = [i for i, value in enumerate(entries) if value in wanted]
+        return np.array(hits, dtype=np.int64)
+
+    def time_range(self, start: datetime | None = None, end: datetime | None = None) -> slice:
+        """Rows with start <= ts < end (naive UTC), as a slice (rows are in time order)."""
+        ts = self.column('ts')
+        lo = 0 if start is None else int(np.searchsorted(ts, calendar.timegm(start.timetuple()), side='left'))
+        hi = self.rows if end is None else int(np.searchsorted(ts, calendar.timegm(end.timetuple()), side='left'))
+        return slice(lo, hi)
+
+    def select(self, start: datetime | None = None, end: datetime | None = None,
+               topic=None, niche=None, platform=None) -> np.ndarray:
+        """Row indices matching every given filter (see codes() for the matchers)."""
+        window = self.time_range(start, end)
+        mask = np.ones(window.stop - window.start, dtype=bool)
+        for name, match in (('topic', topic), ('niche', niche), ('platform', platform)):
+            if match is not None:
+                mask &= np.isin(self.column(name)[window], self.codes(name, match))
+        return np.flatnonzero(mask) + window.start
+
+    def frame(self, rows: np.ndarray, columns=None) -> dict[str, np.ndarray]:
+        """Gather columns for the given rows (a copy: only the selected rows)."""
+        return {name: self.column(name)[rows] for name in (columns or self.schema['columns'])}
+
+    def decode(self, name: str, codes: np.ndarray) -> list[str]:
+        entries = self.dictionary(name)
+        return [entries[c] for c in codes.tolist()]
+
+
+def daily_profile(archive: Archive, rows: np.ndarray) -> list[tuple[str, int, float, int]]:
+    """(day, max volume, mean velocity, samples) over the selected rows, via bincount."""
+    if len(rows) == 0:
+        return []
+    days = archive.column('ts')[rows] // 86400
+    first = days.min()
+    slots = (days - first).astype(np.int64)
+    samples = np.bincount(slots)
+    velocity = np.bincount(slots, weights=archive.column('velocity')[rows].astype(np.float64))
+    peak = np.zeros(len(samples), dtype=np.int64)
+    np.maximum.at(peak, slots, archive.column('volume')[rows])
+    out = []
+    for i in np.flatnonzero(samples):
+        day = datetime.utcfromtimestamp(int(first + i) * 86400).strftime("%Y-%m-%d")
+        out.append((day, int(peak[i]), float(velocity[i] / samples[i]), int(samples[i])))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar archive of sealed scan windows")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("export", help="append sealed windows not archived yet")
+    sub.add_parser("stats", help="archive size and dictionaries")
+    q = sub.add_parser("query", help="daily profile of the matching rows")
+    q.add_argument("--topic", help="case-insensitive substring of the topic")
+    q.add_argument("--niche")
+    q.add_argument("--platform")
+    q.add_argument("--days", type=int, help="only the last N days")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        init_db()
+        started = time.perf_counter()
+        stats = export()
+        print(f"🗄️ Archive : +{stats['rows']:,} lignes ({stats['total']:,} au total, "
+              f"scellé jusqu'à {_window_label(stats['sealed_through'])}) en {time.perf_counter() - started:.2f}s")
+        return
+
+    archive = Archive()
+    if args.command == "stats":
+        size = sum(os.path.getsize(os.path.join(ARCHIVE_DIR, "columns", f"{n}.bin"))
+                   for n in COLUMNS if os.path.exists(os.path.join(ARCHIVE_DIR, "columns", f"{n}.bin")))
+        print(f"🗄️ {len(archive):,} lignes, {size / 1_048_576:.1f} Mo, "
+              f"scellé jusqu'à {_window_label(_sealed_through(archive.schema))}")
+        for name, meta in archive.schema['dictionaries'].items():
+            print(f"  {name:<9} {meta['entries']:,} entrées")
+        return
+
+    started = time.perf_counter()
+    needle = args.topic.casefold() if args.topic else None
+    rows = archive.select(
+        start=datetime.utcnow() - timedelta(days=args.days) if args.days else None,
+        topic=(lambda value: needle in value.casefold()) if needle else None,
+        niche=args.niche,
+        platform=args.platform,
+    )
+    profile = daily_profile(archive, rows)
+    print(f"🔎 {len(rows):,} lignes sur {len(archive):,} en {(time.perf_counter() - started) * 1000:.1f} ms")
+    for day, peak, velocity, samples in profile:
+        print(f"  {day}  vol max {peak:>12,}  vel moy {velocity:>6.1f}  ({samples})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,23 @@
-import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import (
+    create_engine, event, select, func, Column, Integer, BigInteger, String, Text, Float, DateTime, ForeignKey,
+    UniqueConstraint, Index,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 from datetime import datetime, timedelta
+import os
+import time
+import sqlite3
+import calendar
+from src import telemetry
+# DB location and storage profile live in src.models.config so read-only
+# tools can find the database without importing SQLAlchemy.
+from src.models.config import (
+    DB_DIR, DB_PATH, DATABASE_URL, LEGACY_DB_PATH, JOURNAL_MODE, BUSY_TIMEOUT_MS, CANONICALIZE, WINDOW_MINUTES,
+)
 
 Base = declarative_base()
 
-# ─── ABSOLUTE DB PATH ───────────────────────────────────────────────
-# Cron runs from / so relative paths break. Always use absolute.
-DB_DIR = os.environ.get("VIRAL_DB_DIR", "/app")
-DB_PATH = os.path.join(DB_DIR, "viral_data.db")
-DATABASE_URL = f"sqlite:///{DB_PATH}"
-
 
 class Trend(Base):
     __tablename__ = 'trends'
@@ -19,6 +26,7 @@ class Trend(Base):
     niche = Column(String(50), index=True)          # 'Cinema', 'Sport', 'Music', 'General'
     topic = Column(String(255), unique=True, index=True)
     source_platform = Column(String(50))              # Platform where first detected
+    external_id = Column(String(50), index=True)      # Source's own id (Reddit post id), when it has one
     first_detected = Column(DateTime, default=datetime.utcnow)
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -26,9 +34,10 @@ class Trend(Base):
 
 
 class TrendMetric(Base):
-    """Time-series: one row per (trend, platform, scan_window).
-    The UniqueConstraint prevents duplicate metrics for the same trend+platform
-    within the same 4-hour scan window."""
+    """Time-series: one row per (trend, platform, window).
+    The unique keys prevent duplicate metrics for the same trend+platform
+    within the same window (WINDOW_MINUTES long, the re-poll interval by default).
+    window_bucket and the scan_window label always describe the same window."""
     __tablename__ = 'trend_metrics'
 
     id = Column(Integer, primary_key=True)
@@ -36,33 +45,400 @@ class TrendMetric(Base):
     platform = Column(String(50), nullable=False)
     volume = Column(Integer, default=0)
     velocity_score = Column(Float, default=0.0)
-    scan_window = Column(String(20))                  # e.g. "2025-02-08_12" (date_hour block)
+    scan_window = Column(String(20))                  # e.g. "2025-02-08_12" (see get_scan_window)
+    window_bucket = Column(Integer)                   # Window start, epoch seconds (UTC)
+    geo = Column(String(100))                         # Google markets it trended in, e.g. "FR,BE"
+    growth_rate = Column(Float)                       # Momentum engine (src.analysis.momentum)
+    acceleration = Column(Float)
+    ewma_velocity = Column(Float)
+    revision = Column(Integer, index=True)            # Write that last changed the row (see next_revision)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     trend = relationship("Trend", back_populates="metrics")
 
     __table_args__ = (
         UniqueConstraint('trend_id', 'platform', 'scan_window', name='uq_trend_platform_window'),
+        Index('uq_trend_platform_bucket', 'trend_id', 'platform', 'window_bucket', unique=True),
+    )
+
+
+class TrendDailyAggregate(Base):
+    """Daily rollup of trend_metrics rows past the retention window.
+    Keyed on topic text so the raw Trend row can be pruned."""
+    __tablename__ = 'trend_daily_aggregates'
+
+    id = Column(Integer, primary_key=True)
+    day = Column(String(10), nullable=False, index=True)   # "2025-02-08"
+    topic = Column(String(255), nullable=False)
+    niche = Column(String(50))
+    platform = Column(String(50), nullable=False)
+    max_volume = Column(Integer, default=0)
+    mean_velocity = Column(Float, default=0.0)
+    max_velocity = Column(Float, default=0.0)
+    samples = Column(Integer, default=0)                 # raw rows folded in
+
+    __table_args__ = (
+        UniqueConstraint('topic', 'platform', 'day', name='uq_aggregate_topic_platform_day'),
     )
 
 
+class RadarCluster(Base):
+    """Persistent cross-platform cluster kept by the incremental radar.
+    `signature` holds the seed's sorted tokens so matching never re-tokenizes it."""
+    __tablename__ = 'radar_clusters'
+
+    id = Column(Integer, primary_key=True)
+    niche = Column(String(50), index=True)
+    main_topic = Column(String(255))
+    signature = Column(String(500))                   # space-joined sorted tokens
+    platforms = Column(String(100), default='')       # e.g. "Google,Reddit"
+    platform_count = Column(Integer, default=1, index=True)
+    total_volume = Column(Integer, default=0)
+    score = Column(Float, default=0.0, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    members = relationship("RadarMember", back_populates="cluster", cascade="all, delete-orphan")
+
+
+class RadarMember(Base):
+    """Latest metric of one (trend, platform) inside a radar cluster."""
+    __tablename__ = 'radar_members'
+
+    id = Column(Integer, primary_key=True)
+    cluster_id = Column(Integer, ForeignKey('radar_clusters.id'), nullable=False, index=True)
+    trend_id = Column(Integer, ForeignKey('trends.id'), nullable=False, index=True)
+    metric_id = Column(Integer, nullable=False)
+    platform = Column(String(50), nullable=False)
+    velocity_score = Column(Float, default=0.0)
+    volume = Column(Integer, default=0)
+    timestamp = Column(DateTime, index=True)
+
+    cluster = relationship("RadarCluster", back_populates="members")
+
+    __table_args__ = (
+        UniqueConstraint('cluster_id', 'trend_id', 'platform', name='uq_cluster_trend_platform'),
+    )
+
+
+class RadarKey(Base):
+    """Lookup keys of a radar cluster's seed (clustering.seed_keys): the
+    incremental radar loads only the clusters sharing a key with new signals."""
+    __tablename__ = 'radar_keys'
+
+    cluster_id = Column(Integer, ForeignKey('radar_clusters.id'), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    niche = Column(String(50), nullable=False)
+
+    __table_args__ = (
+        Index('ix_radar_keys_lookup', 'niche', 'key', 'cluster_id'),
+    )
+
+
+class Watermark(Base):
+    """High-water marks for incremental jobs (e.g. last trend_metrics.id seen)."""
+    __tablename__ = 'watermarks'
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ItemFingerprint(Base):
+    """Content digest of each source item at its last ingestion (see unchanged_items)."""
+    __tablename__ = 'item_fingerprints'
+
+    source = Column(String(20), primary_key=True)
+    item_key = Column(String(500), primary_key=True)
+    digest = Column(String(40), nullable=False)
+    seen_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class PostScore(Base):
+    """Engagement of a source post at its last ingestion (see moved_posts)."""
+    __tablename__ = 'post_scores'
+
+    source = Column(String(20), primary_key=True)
+    post_id = Column(String(50), primary_key=True)
+    score = Column(Integer, nullable=False)
+    comments = Column(Integer, nullable=False)
+    seen_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class TopicSignature(Base):
+    """Token set of a canonical trend, for near-duplicate checks (src.models.canonical)."""
+    __tablename__ = 'topic_signatures'
+
+    trend_id = Column(Integer, ForeignKey('trends.id'), primary_key=True)
+    platform = Column(String(50), nullable=False)
+    niche = Column(String(50), nullable=False)
+    tokens = Column(Text, nullable=False)             # Space-joined, sorted
+
+
+class TopicBucket(Base):
+    """Persistent MinHash LSH index: one row per (band key, trend)."""
+    __tablename__ = 'topic_lsh'
+
+    key = Column(BigInteger, primary_key=True)        # Hash of (platform, niche, band, band values)
+    trend_id = Column(Integer, ForeignKey('trends.id'), primary_key=True)
+
+
+class TopicAlias(Base):
+    """A reworded topic mapped onto an existing trend instead of creating one."""
+    __tablename__ = 'topic_aliases'
+
+    alias = Column(String(255), primary_key=True)
+    trend_id = Column(Integer, ForeignKey('trends.id'), nullable=False, index=True)
+    similarity = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class JobRun(Base):
+    """One run of a collector or job: stage timings and counters (src.telemetry)."""
+    __tablename__ = 'job_runs'
+
+    id = Column(Integer, primary_key=True)
+    job = Column(String(50), nullable=False, index=True)
+    started_at = Column(DateTime, default=datetime.utcnow, index=True)
+    duration = Column(Float)                          # Seconds, wall clock
+    status = Column(String(10))                       # 'ok' | 'error'
+    db_seconds = Column(Float)
+    stages = Column(Text)                             # JSON {stage: seconds}
+    counters = Column(Text)                           # JSON {name: count}
+
+
+class SchemaMigration(Base):
+    """Applied entries of MIGRATIONS (see run_migrations)."""
+    __tablename__ = 'schema_migrations'
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String(100))
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+
 # ─── ENGINE & SESSION ───────────────────────────────────────────────
-engine = create_engine(DATABASE_URL, echo=False)
-Session = sessionmaker(bind=engine)
+engine = create_engine(DATABASE_URL, echo=False, connect_args={"timeout": BUSY_TIMEOUT_MS / 1000})
+
+
+@event.listens_for(engine, "connect")
+def _sqlite_on_connect(dbapi_conn, _record):
+    # Let SQLAlchemy emit BEGIN itself (see _sqlite_on_begin).
+    dbapi_conn.isolation_level = None
+    cursor = dbapi_conn.cursor()
+    cursor.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+@event.listens_for(engine, "begin")
+def _sqlite_on_begin(conn):
+    # Writers take the write lock up front: a deferred transaction that reads
+    # then writes can fail with SQLITE_BUSY without ever waiting on busy_timeout.
+    immediate = conn.get_execution_options().get("sqlite_immediate", False)
+    conn.exec_driver_sql("BEGIN IMMEDIATE" if immediate else "BEGIN")
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _db_timer_start(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _db_timer_stop(conn, cursor, statement, parameters, context, executemany):
+    telemetry.add_db_time(time.perf_counter() - conn.info['query_started'])
+
+
+Session = sessionmaker(bind=engine)                                                # readers
+WriteSession = sessionmaker(bind=engine.execution_options(sqlite_immediate=True))  # collectors, jobs
+
+
+# ─── MIGRATIONS ─────────────────────────────────────────────────────
+# create_all() only creates missing tables; anything touching existing tables
+# (columns, indexes) goes here. Append only, never renumber.
+
+def _columns(conn, table: str) -> set[str]:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def _m001_legacy_columns(conn):
+    """Databases created before source_platform / scan_window existed."""
+    if 'source_platform' not in _columns(conn, 'trends'):
+        conn.exec_driver_sql("ALTER TABLE trends ADD COLUMN source_platform VARCHAR(50)")
+    if 'scan_window' not in _columns(conn, 'trend_metrics'):
+        conn.exec_driver_sql("ALTER TABLE trend_metrics ADD COLUMN scan_window VARCHAR(20)")
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_trend_platform_window "
+            "ON trend_metrics (trend_id, platform, scan_window)"
+        )
+
+
+def _m002_window_query_indexes(conn):
+    """Every analysis read is `timestamp > now-24h ORDER BY velocity_score DESC`.
+    The covering index serves the range scan and every selected column,
+    so the query never touches the table and stays flat as history grows."""
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_metrics_window_cover "
+        "ON trend_metrics (timestamp, velocity_score, trend_id, platform, volume)"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_metrics_trend ON trend_metrics (trend_id)")
+    conn.exec_driver_sql("ANALYZE")
+
+
+def _m003_metric_geo(conn):
+    """Markets a Google metric was seen in (multi-geo ingestion)."""
+    if 'geo' not in _columns(conn, 'trend_metrics'):
+        conn.exec_driver_sql("ALTER TABLE trend_metrics ADD COLUMN geo VARCHAR(100)")
+
+
+def _m004_momentum_columns(conn):
+    """Columns written back by the momentum engine."""
+    existing = _columns(conn, 'trend_metrics')
+    for column in ('growth_rate', 'acceleration', 'ewma_velocity'):
+        if column not in existing:
+            conn.exec_driver_sql(f"ALTER TABLE trend_metrics ADD COLUMN {column} FLOAT")
+
+
+def _m005_series_index(conn):
+    """Time-series reads (analysis.timeseries) walk one trend's rows per platform
+    in time order. Covering volume / velocity keeps them off the table; the
+    plain trend_id index is a prefix of it (and of the unique key) and goes."""
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_metrics_trend_platform_ts "
+        "ON trend_metrics (trend_id, platform, timestamp, volume, velocity_score)"
+    )
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_metrics_trend")
+    conn.exec_driver_sql("ANALYZE")
+
+
+def _m006_trend_external_id(conn):
+    """Source post id on trends (Reddit), for re-polling a post by id."""
+    if 'external_id' not in _columns(conn, 'trends'):
+        conn.exec_driver_sql("ALTER TABLE trends ADD COLUMN external_id VARCHAR(50)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_trends_external_id ON trends (external_id)")
+
+
+def _m007_window_bucket(conn):
+    """Integer window start next to the scan_window label, backfilled from it
+    ('2025-02-08_12' -> epoch of 2025-02-08 12:00 UTC)."""
+    if 'window_bucket' not in _columns(conn, 'trend_metrics'):
+        conn.exec_driver_sql("ALTER TABLE trend_metrics ADD COLUMN window_bucket INTEGER")
+    conn.exec_driver_sql("""
+        UPDATE trend_metrics
+        SET window_bucket = CAST(strftime('%s', substr(scan_window, 1, 10) || ' ' || substr(scan_window, 12, 2)
+                                 || ':' || COALESCE(NULLIF(substr(scan_window, 14, 2), ''), '00')) AS INTEGER)
+        WHERE window_bucket IS NULL AND scan_window IS NOT NULL
+    """)
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_trend_platform_bucket "
+        "ON trend_metrics (trend_id, platform, window_bucket)"
+    )
+
+
+def _m008_metric_revision(conn):
+    """Change counter on metrics: upserts rewrite a row in place (same id), so
+    incremental readers follow revision instead of the rowid. Existing rows
+    take their id, which keeps an id watermark valid as a revision one."""
+    if 'revision' not in _columns(conn, 'trend_metrics'):
+        conn.exec_driver_sql("ALTER TABLE trend_metrics ADD COLUMN revision INTEGER")
+    conn.exec_driver_sql("UPDATE trend_metrics SET revision = id WHERE revision IS NULL")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_trend_metrics_revision ON trend_metrics (revision)")
+    conn.exec_driver_sql("""
+        INSERT INTO watermarks (name, value) SELECT 'metric_revision', COALESCE(MAX(id), 0) FROM trend_metrics WHERE 1
+        ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)
+    """)
+
+
+def _m009_radar_keys(conn):
+    """radar_keys is filled as clusters are created; existing clusters have
+    none, so the radar state is dropped and rebuilt from the last 24h of
+    metrics on the next run."""
+    conn.exec_driver_sql("DELETE FROM radar_members")
+    conn.exec_driver_sql("DELETE FROM radar_clusters")
+    conn.exec_driver_sql("DELETE FROM watermarks WHERE name = 'radar_metrics'")
+
+
+def _m010_series_index_growth(conn):
+    """Time-series reads also average growth_rate: without it in the series
+    index every sample went back to the table."""
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_metrics_trend_platform_ts")
+    conn.exec_driver_sql(
+        "CREATE INDEX ix_metrics_trend_platform_ts "
+        "ON trend_metrics (trend_id, platform, timestamp, volume, velocity_score, growth_rate)"
+    )
+    conn.exec_driver_sql("ANALYZE")
+
+
+MIGRATIONS = [
+    (1, "legacy_columns", _m001_legacy_columns),
+    (2, "window_query_indexes", _m002_window_query_indexes),
+    (3, "metric_geo", _m003_metric_geo),
+    (4, "momentum_columns", _m004_momentum_columns),
+    (5, "series_index", _m005_series_index),
+    (6, "trend_external_id", _m006_trend_external_id),
+    (7, "window_bucket", _m007_window_bucket),
+    (8, "metric_revision", _m008_metric_revision),
+    (9, "radar_keys", _m009_radar_keys),
+    (10, "series_index_growth", _m010_series_index_growth),
+]
+
+
+def run_migrations(bind=engine) -> list[str]:
+    """Apply pending MIGRATIONS in order; safe to call from concurrent processes."""
+    applied = []
+    with bind.execution_options(sqlite_immediate=True).begin() as conn:
+        done = set(conn.execute(select(SchemaMigration.version)).scalars())
+        for version, name, migrate in MIGRATIONS:
+            if version in done:
+                continue
+            migrate(conn)
+            conn.execute(SchemaMigration.__table__.insert().values(version=version, name=name))
+            applied.append(name)
+    return applied
+
+
+def adopt_legacy_db(legacy_path: str = LEGACY_DB_PATH) -> bool:
+    """Copy a database left by the old single-file mount into DB_DIR, once:
+    only while DB_PATH does not exist. The legacy file is left untouched."""
+    if not legacy_path or os.path.exists(DB_PATH) or not os.path.isfile(legacy_path):
+        return False
+    os.makedirs(DB_DIR, exist_ok=True)
+    # backup() rather than a file copy: consistent even with a journal pending.
+    source, target = sqlite3.connect(f"file:{legacy_path}?mode=ro", uri=True), sqlite3.connect(DB_PATH)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    print(f"📦 Ancienne DB reprise : {legacy_path} → {DB_PATH}")
+    return True
 
 
 def init_db():
-    """Create all tables if they don't exist."""
+    """Create all tables if they don't exist, then apply pending migrations."""
+    adopt_legacy_db()
     Base.metadata.create_all(engine)
+    for name in run_migrations():
+        print(f"  🔧 Migration appliquée : {name}")
     print(f"✅ DB initialisée : {DB_PATH}")
 
 
-def get_scan_window() -> str:
-    """Returns a string like '2025-02-08_12' representing the current 4h block.
-    Used to deduplicate metrics within the same scan cycle."""
-    now = datetime.utcnow()
-    block = (now.hour // 4) * 4
-    return now.strftime(f"%Y-%m-%d_{block:02d}")
+WINDOW_SECONDS = WINDOW_MINUTES * 60
+
+
+def get_window_bucket(now: datetime | None = None) -> int:
+    """Start of the current metric window, epoch seconds (UTC).
+    Used to deduplicate metrics within the same window."""
+    ts = calendar.timegm((now or datetime.utcnow()).timetuple())
+    return ts - ts % WINDOW_SECONDS
+
+
+def get_scan_window(now: datetime | None = None) -> str:
+    """Label of the current window: '2025-02-08_12' for whole-hour windows,
+    '2025-02-08_1230' otherwise. Derived from the bucket, so the legacy
+    scan_window unique key never disagrees with the window_bucket one."""
+    start = datetime.utcfromtimestamp(get_window_bucket(now))
+    return start.strftime("%Y-%m-%d_%H" if WINDOW_SECONDS % 3600 == 0 else "%Y-%m-%d_%H%M")
 
 
 def upsert_trend(session, topic: str, niche: str, platform: str) -> Trend:
@@ -79,10 +455,11 @@ def upsert_trend(session, topic: str, niche: str, platform: str) -> Trend:
 
 def add_metric(session, trend: Trend, platform: str, volume: int, velocity_score: float):
     """Insert a metric, skipping duplicates for the same scan window."""
-    window = get_scan_window()
+    now = datetime.utcnow()
+    window, bucket = get_scan_window(now), get_window_bucket(now)
 
     existing = session.query(TrendMetric).filter_by(
-        trend_id=trend.id, platform=platform, scan_window=window
+        trend_id=trend.id, platform=platform, window_bucket=bucket
     ).first()
 
     if existing:
@@ -90,6 +467,8 @@ def add_metric(session, trend: Trend, platform: str, volume: int, velocity_score
         if volume > existing.volume:
             existing.volume = volume
             existing.velocity_score = velocity_score
+            existing.timestamp = now
+            existing.revision = next_revision(session)
         return existing
 
     metric = TrendMetric(
@@ -98,6 +477,246 @@ def add_metric(session, trend: Trend, platform: str, volume: int, velocity_score
         volume=volume,
         velocity_score=velocity_score,
         scan_window=window,
+        window_bucket=bucket,
+        revision=next_revision(session),
     )
     session.add(metric)
-    return metric
\ No newline at end of file
+    return metric
+
+
+# ─── BULK INGEST ────────────────────────────────────────────────────
+# SQLite caps bound parameters per statement; keep IN (...) lists well below it.
+LOOKUP_CHUNK = 500
+
+
+def _chunks(items: list, size: int = LOOKUP_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def bulk_ingest(session, records: list[dict], canonicalize: bool = CANONICALIZE) -> set[str]:
+    """Set-based equivalent of upsert_trend() + add_metric() for a whole scan.
+
+    Each record is a dict with 'topic', 'niche', 'platform', 'volume' and
+    'velocity_score', plus an optional 'geo' and 'external_id' (kept from
+    the first record that brings one). Trends are upserted on `topic` and metrics on
+    `uq_trend_platform_bucket` with INSERT ... ON CONFLICT, keeping the
+    higher-volume metric within a window. With `canonicalize`, near
+    duplicates of a known topic are ingested under it (src.models.canonical).
+    Returns the set of topics that did not exist before this call."""
+    if not records:
+        return set()
+
+    canon = None
+    if canonicalize:
+        from src.models.canonical import Canonicalizer   # numpy: only loaded by writers
+        canon = Canonicalizer(session)
+        records = canon.rewrite(records)
+
+    now = datetime.utcnow()
+    window, bucket = get_scan_window(now), get_window_bucket(now)
+    revision = next_revision(session)
+
+    # Collapse duplicates inside the batch: first record wins for the trend,
+    # the higher volume wins for the (topic, platform) metric.
+    trend_rows = {}
+    metric_rows = {}
+    for rec in records:
+        topic = rec['topic']
+        trend_rows.setdefault(topic, {
+            'topic': topic,
+            'niche': rec['niche'],
+            'source_platform': rec['platform'],
+            'external_id': rec.get('external_id'),
+            'first_detected': now,
+            'last_updated': now,
+        })
+        key = (topic, rec['platform'])
+        best = metric_rows.get(key)
+        if best is None or rec['volume'] > best['volume']:
+            metric_rows[key] = rec
+
+    topics = list(trend_rows)
+    existing = set()
+    for chunk in _chunks(topics):
+        existing.update(session.execute(
+            select(Trend.topic).where(Trend.topic.in_(chunk))
+        ).scalars())
+
+    trend_stmt = sqlite_insert(Trend)
+    trend_stmt = trend_stmt.on_conflict_do_update(
+        index_elements=[Trend.topic],
+        set_={
+            'last_updated': trend_stmt.excluded.last_updated,
+            'external_id': func.coalesce(Trend.external_id, trend_stmt.excluded.external_id),
+        },
+    )
+    session.execute(trend_stmt, list(trend_rows.values()))
+
+    ids = {}
+    for chunk in _chunks(topics):
+        ids.update(session.execute(
+            select(Trend.topic, Trend.id).where(Trend.topic.in_(chunk))
+        ).all())
+
+    metric_stmt = sqlite_insert(TrendMetric)
+    metric_stmt = metric_stmt.on_conflict_do_update(
+        index_elements=[TrendMetric.trend_id, TrendMetric.platform, TrendMetric.window_bucket],
+        set_={
+            'volume': metric_stmt.excluded.volume,
+            'velocity_score': metric_stmt.excluded.velocity_score,
+            'geo': metric_stmt.excluded.geo,
+            'timestamp': metric_stmt.excluded.timestamp,   # Momentum measures from the latest sample
+            'revision': metric_stmt.excluded.revision,
+        },
+        where=metric_stmt.excluded.volume > TrendMetric.volume,
+    )
+    session.execute(metric_stmt, [
+        {
+            'trend_id': ids[topic],
+            'platform': platform,
+            'volume': rec['volume'],
+            'velocity_score': rec['velocity_score'],
+            'scan_window': window,
+            'window_bucket': bucket,
+            'revision': revision,
+            'geo': rec.get('geo'),
+            'timestamp': now,
+        }
+        for (topic, platform), rec in metric_rows.items()
+    ])
+
+    if canon is not None:
+        canon.register(ids)
+    bump_watermark(session, 'ingest')
+    telemetry.count('rows_inserted', len(topics) - len(existing))
+    telemetry.count('rows_updated', len(existing))
+    return set(topics) - existing
+
+
+def get_watermark(session, name: str) -> int:
+    mark = session.get(Watermark, name)
+    return mark.value if mark else 0
+
+
+def set_watermark(session, name: str, value: int):
+    mark = session.get(Watermark, name)
+    if mark is None:
+        session.add(Watermark(name=name, value=value))
+    else:
+        mark.value = value
+
+
+# Counters bumped by every write that changes what readers see; the read API
+# (src.api) keys its cache on them.
+DATA_VERSION_MARKS = ('ingest', 'radar', 'momentum', 'retention')
+
+
+def bump_watermark(session, name: str) -> int:
+    value = get_watermark(session, name) + 1
+    set_watermark(session, name, value)
+    return value
+
+
+def next_revision(session) -> int:
+    """Revision for metrics inserted or updated by the current transaction
+    (one per transaction: its rows become visible together). Writers are
+    serialized (WriteSession), so revisions only grow."""
+    transaction = session.get_transaction()
+    cached = session.info.get('metric_revision')
+    if cached is not None and cached[0] is transaction:
+        return cached[1]
+    value = bump_watermark(session, 'metric_revision')
+    session.info['metric_revision'] = (transaction, value)
+    return value
+
+
+def seal_revision(session) -> int:
+    """Latest metric revision, for incremental readers keeping it as a watermark.
+    Writes later in the same transaction get a new revision above it."""
+    session.info.pop('metric_revision', None)
+    return get_watermark(session, 'metric_revision')
+
+
+# ─── ITEM FINGERPRINTS ──────────────────────────────────────────────
+# Unchanged items are still re-ingested once in a while so they keep a
+# metric inside the 24h window every analysis reads.
+FINGERPRINT_REFRESH_HOURS = 12
+
+
+def unchanged_items(session, source: str, digests: dict[str, str],
+                    refresh_hours: float = FINGERPRINT_REFRESH_HOURS) -> set[str]:
+    """Keys of `digests` whose digest matches the one stored by the last
+    ingestion, less than `refresh_hours` ago."""
+    since = datetime.utcnow() - timedelta(hours=refresh_hours)
+    unchanged = set()
+    for chunk in _chunks(list(digests)):
+        rows = session.execute(
+            select(ItemFingerprint.item_key, ItemFingerprint.digest).where(
+                ItemFingerprint.source == source,
+                ItemFingerprint.item_key.in_(chunk),
+                ItemFingerprint.seen_at >= since,
+            )
+        )
+        unchanged.update(key for key, digest in rows if digests[key] == digest)
+    return unchanged
+
+
+def remember_items(session, source: str, digests: dict[str, str]):
+    """Store the digests of items that were just ingested."""
+    if not digests:
+        return
+    now = datetime.utcnow()
+    stmt = sqlite_insert(ItemFingerprint)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ItemFingerprint.source, ItemFingerprint.item_key],
+        set_={'digest': stmt.excluded.digest, 'seen_at': stmt.excluded.seen_at},
+    )
+    session.execute(stmt, [
+        {'source': source, 'item_key': key, 'digest': digest, 'seen_at': now}
+        for key, digest in digests.items()
+    ])
+
+
+# ─── POST SCORES ────────────────────────────────────────────────────
+def moved_posts(session, source: str, scores: dict[str, tuple[int, int]], min_delta: int,
+                min_ratio: float, refresh_hours: float = FINGERPRINT_REFRESH_HOURS) -> set[str]:
+    """Post ids of `scores` ({post_id: (score, comments)}) worth writing again:
+    never stored, stored more than `refresh_hours` ago, or whose score +
+    comments moved by at least `min_delta` and `min_ratio` of the stored value."""
+    since = datetime.utcnow() - timedelta(hours=refresh_hours)
+    stored = {}
+    for chunk in _chunks(list(scores)):
+        stored.update((post_id, (score, comments)) for post_id, score, comments in session.execute(
+            select(PostScore.post_id, PostScore.score, PostScore.comments).where(
+                PostScore.source == source,
+                PostScore.post_id.in_(chunk),
+                PostScore.seen_at >= since,
+            )
+        ))
+    moved = set()
+    for post_id, (score, comments) in scores.items():
+        last = stored.get(post_id)
+        if last is None:
+            moved.add(post_id)
+            continue
+        delta = abs(score - last[0]) + abs(comments - last[1])
+        if delta >= min_delta and delta >= min_ratio * (abs(last[0]) + last[1]):
+            moved.add(post_id)
+    return moved
+
+
+def remember_posts(session, source: str, scores: dict[str, tuple[int, int]]):
+    """Store the engagement of posts that were just ingested."""
+    if not scores:
+        return
+    now = datetime.utcnow()
+    stmt = sqlite_insert(PostScore)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PostScore.source, PostScore.post_id],
+        set_={'score': stmt.excluded.score, 'comments': stmt.excluded.comments, 'seen_at': stmt.excluded.seen_at},
+    )
+    session.execute(stmt, [
+        {'source': source, 'post_id': post_id, 'score': score, 'comments': comments, 'seen_at': now}
+        for post_id, (score, comments) in scores.items()
+    ])
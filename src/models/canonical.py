@@ -0,0 +1,270 @@
+"""
+Ingest-time topic canonicalization — near-duplicate topics map onto one trend.
+
+    python -m src.models.canonical --backfill [--days 7]
+
+Every canonical trend keeps its token set (topic_signatures) and the band
+keys of its MinHash signature (topic_lsh). A new topic is hashed with the
+same permutations; trends sharing at least one band key are candidates,
+and the best one with an exact token Jaccard >= MATCH_THRESHOLD wins. The
+reworded topic is then stored as an alias (topic_aliases) and ingested
+under the canonical trend's topic.
+
+Matching stays within one platform and niche: the radar still sees the
+same story on two platforms as two signals.
+"""
+import re
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src import telemetry
+from src.models.base import WriteSession, init_db, Trend, TopicSignature, TopicAlias, _chunks
+from src.collectors.niche_classifier import fold
+from src.analysis.clustering import STOP_WORDS
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+NUM_PERM = 64
+BANDS = 16               # 16 bands x 4 rows: candidates from Jaccard ~0.5 upwards
+ROWS = NUM_PERM // BANDS
+MATCH_THRESHOLD = 0.7    # Exact Jaccard required to alias a topic
+MIN_TOKENS = 2           # Shorter topics only ever match exactly
+
+MERSENNE = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(20240601)     # Fixed: signatures must be stable across runs
+PERM_A = _rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)[:, None]
+PERM_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)[:, None]
+BAND_MIX = np.uint64(0x9E3779B97F4A7C15)
+TOKEN_RE = re.compile(r"\w+")
+
+# Band keys go in as one JSON array per statement instead of thousands of bound parameters.
+KEY_CHUNK = 20_000
+BUCKET_LOOKUP_SQL = "SELECT key, trend_id FROM topic_lsh WHERE key IN (SELECT value FROM json_each(?))"
+BUCKET_INSERT_SQL = "INSERT OR IGNORE INTO topic_lsh (key, trend_id) VALUES (?, ?)"
+
+
+def tokenize(topic: str) -> frozenset:
+    """Accent-folded words, stop words dropped. Numbers are kept:
+    'Avatar 2 trailer' and 'Avatar 3 trailer' are different stories."""
+    return frozenset(w for w in TOKEN_RE.findall(fold(topic)) if w not in STOP_WORDS)
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "little")
+
+
+def _scope_salt(platform: str, niche: str) -> np.uint64:
+    return np.uint64(int.from_bytes(hashlib.blake2b(f"{platform}\x00{niche}".encode(), digest_size=8).digest(), "little"))
+
+
+def minhash(token_sets: list[frozenset]) -> np.ndarray:
+    """(len(token_sets), NUM_PERM) signatures in one vectorized pass.
+    Every set must be non-empty."""
+    lengths = np.fromiter((len(t) for t in token_sets), dtype=np.int64, count=len(token_sets))
+    hashes = np.fromiter((_token_hash(tok) for t in token_sets for tok in t), dtype=np.uint64)
+    # a < 2^32 and x < 2^32: a*x + b fits in uint64 before the modulo.
+    permuted = (PERM_A * hashes + PERM_B) % MERSENNE
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.minimum.reduceat(permuted, starts, axis=1).T
+
+
+def band_keys(signatures: np.ndarray, salts: np.ndarray) -> np.ndarray:
+    """(n, BANDS) int64 keys: one hash per band, salted with platform+niche."""
+    bands = signatures.reshape(len(signatures), BANDS, ROWS)
+    with np.errstate(over='ignore'):
+        keys = salts[:, None] + np.arange(BANDS, dtype=np.uint64)[None, :] * BAND_MIX
+        for r in range(ROWS):
+            keys = (keys ^ bands[:, :, r]) * BAND_MIX
+            keys ^= keys >> np.uint64(29)
+    return (keys >> np.uint64(1)).astype(np.int64)     # SQLite integers are signed
+
+
+def signature_keys(scopes: list[tuple[str, str]], token_sets: list[frozenset]) -> np.ndarray:
+    """Band keys for topics given their (platform, niche) scope and tokens."""
+    salts = np.array([_scope_salt(p, n) for p, n in scopes], dtype=np.uint64)
+    return band_keys(minhash(token_sets), salts)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class Canonicalizer:
+    """Rewrites a batch of ingest records onto canonical topics, then indexes
+    the trends the batch created (see bulk_ingest)."""
+
+    def __init__(self, session):
+        self.session = session
+        self._pending = {}       # new canonical topic -> (platform, niche, tokens, band keys)
+        self._aliases = {}       # alias -> (canonical topic, similarity)
+
+    def rewrite(self, records: list[dict]) -> list[dict]:
+        session = self.session
+        topics = list({rec['topic'] for rec in records})
+
+        existing = set()
+        aliased = {}
+        for chunk in _chunks(topics):
+            existing.update(session.execute(select(Trend.topic).where(Trend.topic.in_(chunk))).scalars())
+            aliased.update(session.execute(
+                select(TopicAlias.alias, Trend.topic)
+                .join(Trend, Trend.id == TopicAlias.trend_id)
+                .where(TopicAlias.alias.in_(chunk))
+            ).all())
+
+        # Topics never seen before, each with the scope it can match in.
+        fresh = {}
+        for rec in records:
+            topic = rec['topic']
+            if topic in existing or topic in aliased or topic in fresh:
+                continue
+            tokens = tokenize(topic)
+            if len(tokens) >= MIN_TOKENS:
+                fresh[topic] = (rec['platform'], rec['niche'], tokens)
+
+        mapping = dict(aliased)
+        if fresh:
+            mapping.update(self._match(fresh))
+        telemetry.count('topics_aliased', len(mapping))
+
+        out = []
+        for rec in records:
+            canonical = mapping.get(rec['topic'])
+            out.append(rec if canonical is None else dict(rec, topic=canonical))
+        return out
+
+    def _match(self, fresh: dict) -> dict[str, str]:
+        topics = list(fresh)
+        scopes = [fresh[t][:2] for t in topics]
+        token_sets = [fresh[t][2] for t in topics]
+        keys = signature_keys(scopes, token_sets)
+
+        # Candidates already in the DB, one indexed lookup per chunk of keys.
+        by_key = {}
+        conn = self.session.connection()
+        for chunk in _chunks(np.unique(keys).tolist(), KEY_CHUNK):
+            for key, trend_id in conn.exec_driver_sql(BUCKET_LOOKUP_SQL, (json.dumps(chunk),)):
+                by_key.setdefault(key, []).append(trend_id)
+        candidate_ids = {tid for ids in by_key.values() for tid in ids}
+        known = {}
+        for chunk in _chunks(list(candidate_ids)):
+            for trend_id, tokens, topic in self.session.execute(
+                select(TopicSignature.trend_id, TopicSignature.tokens, Trend.topic)
+                .join(Trend, Trend.id == TopicSignature.trend_id)
+                .where(TopicSignature.trend_id.in_(chunk))
+            ):
+                known[trend_id] = (frozenset(tokens.split(" ")), topic)
+
+        mapping = {}
+        batch_buckets = {}      # Near duplicates inside this batch fold onto the first one
+        for i, topic in enumerate(topics):
+            tokens = token_sets[i]
+            best, best_score = None, 0.0
+            seen = set()
+            for key in keys[i].tolist():
+                for tid in by_key.get(key, ()):
+                    if tid in seen or tid not in known:
+                        continue
+                    seen.add(tid)
+                    score = jaccard(tokens, known[tid][0])
+                    if score > best_score:
+                        best, best_score = known[tid][1], score
+                for other in batch_buckets.get(key, ()):
+                    if other in seen:
+                        continue
+                    seen.add(other)
+                    score = jaccard(tokens, fresh[other][2])
+                    if score > best_score:
+                        best, best_score = other, score
+
+            if best_score >= MATCH_THRESHOLD:
+                mapping[topic] = best
+                self._aliases[topic] = (best, best_score)
+                continue
+            self._pending[topic] = (*scopes[i], tokens, keys[i])
+            for key in keys[i].tolist():
+                batch_buckets.setdefault(key, []).append(topic)
+        return mapping
+
+    def add_canonical(self, entries: dict[str, tuple[str, str, frozenset]]):
+        """Queue existing topics {topic: (platform, niche, tokens)} for indexing."""
+        topics = list(entries)
+        if not topics:
+            return
+        keys = signature_keys([entries[t][:2] for t in topics], [entries[t][2] for t in topics])
+        for topic, k in zip(topics, keys):
+            self._pending[topic] = (*entries[topic], k)
+
+    def register(self, ids: dict[str, int]):
+        """Index the canonical trends created by this batch and store the aliases.
+        `ids` maps topic -> trend id for every topic of the batch."""
+        signatures, buckets = [], []
+        for topic, (platform, niche, tokens, keys) in self._pending.items():
+            trend_id = ids.get(topic)
+            if trend_id is None:
+                continue
+            signatures.append({'trend_id': trend_id, 'platform': platform, 'niche': niche,
+                               'tokens': " ".join(sorted(tokens))})
+            buckets.extend((key, trend_id) for key in set(keys.tolist()))
+        if signatures:
+            self.session.execute(sqlite_insert(TopicSignature).on_conflict_do_nothing(), signatures)
+            self.session.connection().exec_driver_sql(BUCKET_INSERT_SQL, buckets)
+
+        aliases = [
+            {'alias': alias, 'trend_id': ids[canonical], 'similarity': round(score, 3),
+             'created_at': datetime.utcnow()}
+            for alias, (canonical, score) in self._aliases.items() if canonical in ids
+        ]
+        if aliases:
+            self.session.execute(sqlite_insert(TopicAlias).on_conflict_do_nothing(), aliases)
+        self._pending.clear()
+        self._aliases.clear()
+
+
+def backfill(days: int = 7) -> int:
+    """Index trends updated in the last `days` that have no signature yet."""
+    since = datetime.utcnow() - timedelta(days=days)
+    session = WriteSession()
+    try:
+        rows = session.execute(
+            select(Trend.id, Trend.topic, Trend.niche, Trend.source_platform)
+            .outerjoin(TopicSignature, TopicSignature.trend_id == Trend.id)
+            .where(TopicSignature.trend_id.is_(None), Trend.last_updated >= since)
+        ).all()
+        entries = {}
+        for _, topic, niche, platform in rows:
+            tokens = tokenize(topic)
+            if len(tokens) >= MIN_TOKENS:
+                entries[topic] = (platform or '', niche or '', tokens)
+
+        canon = Canonicalizer(session)
+        for chunk in _chunks(list(entries), 5000):
+            canon.add_canonical({topic: entries[topic] for topic in chunk})
+        canon.register({topic: trend_id for trend_id, topic, _, _ in rows})
+        session.commit()
+        return len(entries)
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate topic index")
+    parser.add_argument("--backfill", action="store_true", help="index existing trends without a signature")
+    parser.add_argument("--days", type=int, default=7, help="backfill trends updated in the last N days")
+    args = parser.parse_args()
+
+    init_db()
+    if args.backfill:
+        started = time.perf_counter()
+        count = backfill(args.days)
+        print(f"🧬 {count:,} sujets indexés en {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
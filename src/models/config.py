@@ -0,0 +1,27 @@
+import os
+
+# ─── ABSOLUTE DB PATH ───────────────────────────────────────────────
+# Cron runs from / so relative paths break. Always use absolute.
+DB_DIR = os.environ.get("VIRAL_DB_DIR", "/app")
+DB_PATH = os.path.join(DB_DIR, "viral_data.db")
+DATABASE_URL = f"sqlite:///{DB_PATH}"
+# A database from the old single-file mount (./viral_data.db:/app/viral_data.db),
+# copied into DB_DIR by init_db() when DB_DIR has none yet.
+LEGACY_DB_PATH = os.environ.get("VIRAL_LEGACY_DB", "")
+
+# ─── STORAGE PROFILE ────────────────────────────────────────────────
+# WAL lets analysis reads run while a collector writes; the busy timeout makes
+# overlapping writers queue instead of failing with "database is locked".
+# WAL keeps -wal/-shm files next to the DB: mount the directory, not the file.
+JOURNAL_MODE = os.environ.get("VIRAL_DB_JOURNAL_MODE", "WAL")
+BUSY_TIMEOUT_MS = int(os.environ.get("VIRAL_DB_BUSY_TIMEOUT_MS", "30000"))
+
+# ─── INGEST ─────────────────────────────────────────────────────────
+# Map near-duplicate topics onto an existing trend at ingest (src.models.canonical).
+CANONICALIZE = os.environ.get("VIRAL_CANONICALIZE", "1") != "0"
+
+# Metrics are kept per (trend, platform, window). Fast-moving trends are
+# re-polled every REPOLL_MINUTES (src.collectors.repoll, 0 = off); each
+# re-poll needs a window of its own, so the window defaults to that interval.
+REPOLL_MINUTES = int(os.environ.get("VIRAL_REPOLL_MINUTES", "30"))
+WINDOW_MINUTES = int(os.environ.get("VIRAL_WINDOW_MINUTES", str(REPOLL_MINUTES or 240)))
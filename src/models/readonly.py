@@ -0,0 +1,16 @@
+"""
+Read-only access to the DB through the stdlib sqlite3 driver.
+
+For interactive tools that only run a few SELECTs: skipping SQLAlchemy keeps
+their start-up in the tens of milliseconds. Writes always go through base.py.
+"""
+import sqlite3
+
+from src.models.config import DB_PATH, BUSY_TIMEOUT_MS
+
+
+def connect() -> sqlite3.Connection:
+    """Open DB_PATH read-only. Raises sqlite3.OperationalError if it doesn't exist yet."""
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
@@ -0,0 +1,140 @@
+"""
+Retention — rolls old trend_metrics into daily aggregates, prunes, compacts.
+
+    python -m src.models.retention --days 30 [--backup /app/data/backup.db]
+
+1. Rows older than N days are folded into trend_daily_aggregates
+   (max volume, mean/max velocity per topic, platform and day).
+2. Those raw rows are deleted, then every trend left without metrics
+   with their near-duplicate index rows, item fingerprints and post
+   scores not seen since and job_runs metrics older than the cutoff.
+3. The WAL is checkpointed and the file compacted with VACUUM; --backup
+   also writes a compact copy with VACUUM INTO.
+"""
+import os
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import text, bindparam, DateTime
+from src.models.base import WriteSession, engine, init_db, bump_watermark, DB_PATH
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+RETENTION_DAYS = int(os.environ.get("VIRAL_RETENTION_DAYS", "30"))
+MIN_RETENTION_DAYS = 2   # The radar and every analysis read work on the last 24h
+
+ROLLUP_SQL = text("""
+    INSERT INTO trend_daily_aggregates
+        (day, topic, niche, platform, max_volume, mean_velocity, max_velocity, samples)
+    SELECT date(m.timestamp), t.topic, t.niche, m.platform,
+           MAX(m.volume), AVG(m.velocity_score), MAX(m.velocity_score), COUNT(*)
+    FROM trend_metrics m
+    JOIN trends t ON t.id = m.trend_id
+    WHERE m.timestamp < :cutoff
+    GROUP BY date(m.timestamp), t.id, m.platform
+    ON CONFLICT (topic, platform, day) DO UPDATE SET
+        max_volume    = MAX(max_volume, excluded.max_volume),
+        mean_velocity = (mean_velocity * samples + excluded.mean_velocity * excluded.samples)
+                        / (samples + excluded.samples),
+        max_velocity  = MAX(max_velocity, excluded.max_velocity),
+        samples       = samples + excluded.samples
+""").bindparams(bindparam('cutoff', type_=DateTime))
+
+PRUNE_METRICS_SQL = text(
+    "DELETE FROM trend_metrics WHERE timestamp < :cutoff"
+).bindparams(bindparam('cutoff', type_=DateTime))
+
+PRUNE_TRENDS_SQL = text("""
+    DELETE FROM trends
+    WHERE last_updated < :cutoff
+      AND NOT EXISTS (SELECT 1 FROM trend_metrics m WHERE m.trend_id = trends.id)
+      AND NOT EXISTS (SELECT 1 FROM radar_members r WHERE r.trend_id = trends.id)
+""").bindparams(bindparam('cutoff', type_=DateTime))
+
+
+PRUNE_FINGERPRINTS_SQL = text(
+    "DELETE FROM item_fingerprints WHERE seen_at < :cutoff"
+).bindparams(bindparam('cutoff', type_=DateTime))
+
+PRUNE_POST_SCORES_SQL = text(
+    "DELETE FROM post_scores WHERE seen_at < :cutoff"
+).bindparams(bindparam('cutoff', type_=DateTime))
+
+PRUNE_JOB_RUNS_SQL = text(
+    "DELETE FROM job_runs WHERE started_at < :cutoff"
+).bindparams(bindparam('cutoff', type_=DateTime))
+
+
+# Index rows of trends that no longer exist (SQLite does not enforce the foreign keys).
+PRUNE_TOPIC_INDEX_SQL = [
+    text(f"DELETE FROM {table} WHERE trend_id NOT IN (SELECT id FROM trends)")
+    for table in ('topic_lsh', 'topic_signatures', 'topic_aliases')
+]
+
+
+def rollup_and_prune(days: int = RETENTION_DAYS) -> dict:
+    """Fold raw metrics older than `days` into daily aggregates and delete them,
+    along with trends that no longer have any metric. One transaction."""
+    if days < MIN_RETENTION_DAYS:
+        raise ValueError(f"retention must be at least {MIN_RETENTION_DAYS} days")
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    session = WriteSession()
+    try:
+        rolled = session.execute(ROLLUP_SQL, {'cutoff': cutoff}).rowcount
+        metrics = session.execute(PRUNE_METRICS_SQL, {'cutoff': cutoff}).rowcount
+        trends = session.execute(PRUNE_TRENDS_SQL, {'cutoff': cutoff}).rowcount
+        session.execute(PRUNE_FINGERPRINTS_SQL, {'cutoff': cutoff})
+        session.execute(PRUNE_POST_SCORES_SQL, {'cutoff': cutoff})
+        session.execute(PRUNE_JOB_RUNS_SQL, {'cutoff': cutoff})
+        for stmt in PRUNE_TOPIC_INDEX_SQL:
+            session.execute(stmt)
+        bump_watermark(session, 'retention')   # Read API caches drop what was pruned
+        session.commit()
+    finally:
+        session.close()
+    return {'aggregates': rolled, 'metrics': metrics, 'trends': trends}
+
+
+def compact(backup_path: str | None = None):
+    """Checkpoint the WAL, VACUUM in place and optionally write a compact copy.
+    Runs on a raw autocommit connection: VACUUM refuses to run in a transaction."""
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        if backup_path:
+            if os.path.exists(backup_path):
+                os.remove(backup_path)
+            conn.execute("VACUUM INTO ?", (backup_path,))
+    finally:
+        raw.close()
+
+
+def _size_mb(path: str) -> float:
+    return os.path.getsize(path) / 1_048_576 if os.path.exists(path) else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rollup, prune and compact viral_data.db")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS,
+                        help=f"keep raw metrics for N days (default {RETENTION_DAYS})")
+    parser.add_argument("--backup", help="also write a compact copy there (VACUUM INTO)")
+    parser.add_argument("--no-vacuum", action="store_true", help="skip compaction")
+    args = parser.parse_args()
+
+    init_db()
+    before = _size_mb(DB_PATH)
+    stats = rollup_and_prune(args.days)
+    print(f"🧹 Rétention {args.days}j : {stats['metrics']:,} métriques → "
+          f"{stats['aggregates']:,} agrégats journaliers, {stats['trends']:,} sujets orphelins supprimés.")
+
+    if not args.no_vacuum:
+        compact(args.backup)
+        print(f"📦 Compactage : {before:.1f} Mo → {_size_mb(DB_PATH):.1f} Mo")
+        if args.backup:
+            print(f"💾 Sauvegarde : {args.backup} ({_size_mb(args.backup):.1f} Mo)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from src.models import canonical
+from src.models.base import Base, Trend, TopicAlias, TopicSignature, bulk_ingest, run_migrations
+
+TOUR = "Taylor Swift Eras Tour Paris concert"
+TOUR_AGAIN = "Taylor Swift Eras Tour Paris concert tickets"     # Jaccard 6/7 with TOUR
+ALBUM = "Taylor Swift new album announced"
+LYON = "Taylor Swift Eras Tour Lyon stadium"     # Jaccard 0.5: an LSH candidate, below the threshold
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    """Session factory on a fresh, migrated database; backfill() writes there too."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'viral_data.db'}")
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(canonical, 'WriteSession', factory)
+    yield factory
+    engine.dispose()
+
+
+def ingest(factory, topic, platform='Reddit', niche='Music', canonicalize=True):
+    session = factory()
+    try:
+        bulk_ingest(session, [{'topic': topic, 'niche': niche, 'platform': platform,
+                               'volume': 100, 'velocity_score': 1.0}], canonicalize=canonicalize)
+        session.commit()
+    finally:
+        session.close()
+
+
+def topics(factory) -> set[str]:
+    with factory() as session:
+        return set(session.execute(select(Trend.topic)).scalars())
+
+
+def aliases(factory) -> dict[str, str]:
+    with factory() as session:
+        return dict(session.execute(
+            select(TopicAlias.alias, Trend.topic).join(Trend, Trend.id == TopicAlias.trend_id)
+        ).all())
+
+
+def test_near_duplicate_is_aliased(sessions):
+    ingest(sessions, TOUR)
+    ingest(sessions, TOUR_AGAIN)
+    assert topics(sessions) == {TOUR}
+    assert aliases(sessions) == {TOUR_AGAIN: TOUR}
+
+
+@pytest.mark.parametrize("other", [ALBUM, LYON])
+def test_distinct_topic_same_niche_is_kept(sessions, other):
+    ingest(sessions, TOUR)
+    ingest(sessions, other)
+    assert topics(sessions) == {TOUR, other}
+    assert aliases(sessions) == {}
+
+
+@pytest.mark.parametrize("scope", [{'platform': 'Google'}, {'niche': 'Cinema'}])
+def test_other_platform_or_niche_is_kept(sessions, scope):
+    ingest(sessions, TOUR)
+    ingest(sessions, TOUR_AGAIN, **scope)
+    assert topics(sessions) == {TOUR, TOUR_AGAIN}
+    assert aliases(sessions) == {}
+
+
+def test_backfill_is_idempotent(sessions):
+    ingest(sessions, TOUR, canonicalize=False)
+    ingest(sessions, ALBUM, canonicalize=False)
+    assert canonical.backfill() == 2
+    with sessions() as session:
+        indexed = session.scalar(select(func.count()).select_from(TopicSignature))
+        buckets = session.connection().exec_driver_sql("SELECT COUNT(*) FROM topic_lsh").scalar()
+
+    assert canonical.backfill() == 0
+    with sessions() as session:
+        assert session.scalar(select(func.count()).select_from(TopicSignature)) == indexed == 2
+        assert session.connection().exec_driver_sql("SELECT COUNT(*) FROM topic_lsh").scalar() == buckets
+
+    # Backfilled trends are matched like ingested ones.
+    ingest(sessions, TOUR_AGAIN)
+    assert aliases(sessions) == {TOUR_AGAIN: TOUR}
@@ -0,0 +1,301 @@
+"""
+Runtime metrics — per-stage timings and counters of collectors and jobs.
+
+    python -m src.telemetry [--job reddit] [--days 7]
+
+Code running inside track_run('reddit') reports into that run:
+
+- stage timers:  with stage('fetch'): ...   (fetch, parse, classify, score, write)
+- counters:      count('rows_skipped', n); HTTP status codes of the pooled
+                 sessions (http_200, http_429...) and retries
+- DB time:       every statement on the shared engine (see base.py)
+
+The current run lives in a ContextVar, so jobs running side by side in the
+engine never mix their numbers. Worker threads only see it when submitted
+through propagate(). Stage timers are wall-clock spans of the thread that
+opens them; work done in a pool counts towards the stage around the pool.
+
+When a run ends it is appended to job_runs and METRICS_FILE is rewritten
+in Prometheus text format (node_exporter textfile collector) from the
+latest run of every job.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from src.models.config import DB_DIR
+
+# ─── CONFIG ──────────────────────────────────────────────────────────
+METRICS_FILE = os.environ.get("VIRAL_METRICS_FILE", os.path.join(DB_DIR, "metrics", "viral_watch.prom"))
+STAGES = ('fetch', 'parse', 'classify', 'score', 'write')   # Report order; jobs may add their own
+REPORT_DAYS = 7
+
+_current = contextvars.ContextVar('viral_watch_run', default=None)
+
+
+class RunStats:
+    """Numbers collected during one run. Thread-safe: pool workers add to it."""
+
+    def __init__(self, job: str):
+        self.job = job
+        self.started_at = datetime.utcnow()
+        self.duration = 0.0
+        self.status = 'running'
+        self.stages = {}
+        self.counters = {}
+        self.db_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_db_time(self, seconds: float):
+        with self._lock:
+            self.db_seconds += seconds
+
+
+def current() -> RunStats | None:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block into the current run's `name` stage (no-op outside a run)."""
+    run = _current.get()
+    if run is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add_stage(name, time.perf_counter() - started)
+
+
+def count(name: str, n: int = 1):
+    run = _current.get()
+    if run is not None and n:
+        run.count(name, n)
+
+
+def add_db_time(seconds: float):
+    run = _current.get()
+    if run is not None:
+        run.add_db_time(seconds)
+
+
+def http_response_hook(resp, *args, **kwargs):
+    """requests response hook: one http_<status> counter per response."""
+    count(f"http_{resp.status_code}")
+
+
+def propagate(func):
+    """Bind `func` to the caller's context for a pool thread.
+    Call it once per submit: a context can only be entered by one thread."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(func, *args, **kwargs)
+
+
+@contextmanager
+def track_run(job: str, record_run: bool = True):
+    """Collect metrics for the enclosed block, then store them (see record)."""
+    run = RunStats(job)
+    token = _current.set(run)
+    started = time.perf_counter()
+    try:
+        yield run
+        run.status = 'ok'
+    except BaseException:
+        run.status = 'error'
+        raise
+    finally:
+        _current.reset(token)
+        run.duration = time.perf_counter() - started
+        if record_run:
+            try:
+                record(run)
+            except Exception as e:
+                # Metrics never fail the job they describe.
+                print(f"⚠️ Métriques non enregistrées ({job}) : {e}", file=sys.stderr)
+
+
+# ─── STORAGE ────────────────────────────────────────────────────────
+def record(run: RunStats, path: str = METRICS_FILE):
+    """Append the run to job_runs, then refresh the Prometheus textfile."""
+    from src.models.base import WriteSession, JobRun
+
+    session = WriteSession()
+    try:
+        session.add(JobRun(
+            job=run.job,
+            started_at=run.started_at,
+            duration=round(run.duration, 4),
+            status=run.status,
+            db_seconds=round(run.db_seconds, 4),
+            stages=json.dumps({k: round(v, 4) for k, v in run.stages.items()}),
+            counters=json.dumps(run.counters),
+        ))
+        session.commit()
+        if path:
+            write_textfile(session, path)
+    finally:
+        session.close()
+
+
+LATEST_RUNS_SQL = """
+    SELECT job, started_at, duration, status, db_seconds, stages, counters
+    FROM job_runs WHERE id IN (SELECT MAX(id) FROM job_runs GROUP BY job)
+"""
+RUN_TOTALS_SQL = "SELECT job, status, COUNT(*) FROM job_runs GROUP BY job, status"
+LAST_SUCCESS_SQL = "SELECT job, MAX(started_at) FROM job_runs WHERE status = 'ok' GROUP BY job"
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _epoch(value: str) -> float:
+    return (datetime.fromisoformat(value) - datetime(1970, 1, 1)).total_seconds()
+
+
+def write_textfile(session, path: str = METRICS_FILE):
+    """Rewrite `path` atomically: gauges for the latest run of each job,
+    run totals (over the job_runs still retained) and last success time."""
+    conn = session.connection()
+    latest = conn.exec_driver_sql(LATEST_RUNS_SQL).fetchall()
+    totals = conn.exec_driver_sql(RUN_TOTALS_SQL).fetchall()
+    success = conn.exec_driver_sql(LAST_SUCCESS_SQL).fetchall()
+
+    metrics = {
+        'viral_job_duration_seconds': ('gauge', "Wall time of the last run", []),
+        'viral_job_stage_seconds': ('gauge', "Time spent per stage in the last run", []),
+        'viral_job_db_seconds': ('gauge', "Time spent in DB statements in the last run", []),
+        'viral_job_events': ('gauge', "Counters of the last run (HTTP statuses, retries, rows)", []),
+        'viral_job_last_run_timestamp_seconds': ('gauge', "Start of the last run", []),
+        'viral_job_last_success_timestamp_seconds': ('gauge', "Start of the last successful run", []),
+        'viral_job_runs_total': ('counter', "Runs recorded in job_runs", []),
+    }
+    for job, started_at, duration, status, db_seconds, stages, counters in latest:
+        job = _label(job)
+        metrics['viral_job_duration_seconds'][2].append((f'job="{job}",status="{status}"', duration))
+        metrics['viral_job_db_seconds'][2].append((f'job="{job}"', db_seconds))
+        metrics['viral_job_last_run_timestamp_seconds'][2].append((f'job="{job}"', _epoch(started_at)))
+        for name, seconds in json.loads(stages or '{}').items():
+            metrics['viral_job_stage_seconds'][2].append((f'job="{job}",stage="{_label(name)}"', seconds))
+        for name, value in json.loads(counters or '{}').items():
+            metrics['viral_job_events'][2].append((f'job="{job}",name="{_label(name)}"', value))
+    for job, started_at in success:
+        metrics['viral_job_last_success_timestamp_seconds'][2].append((f'job="{_label(job)}"', _epoch(started_at)))
+    for job, status, runs in totals:
+        metrics['viral_job_runs_total'][2].append((f'job="{_label(job)}",status="{status}"', runs))
+
+    lines = []
+    for name, (kind, help_text, samples) in metrics.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{{{labels}}} {float(value)!r}" for labels, value in samples)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)      # Scrapers never read a half-written file
+
+
+# ─── REPORT ─────────────────────────────────────────────────────────
+RUNS_SQL = """
+    SELECT job, date(started_at), duration, db_seconds, stages, counters, status
+    FROM job_runs WHERE started_at >= ? {job_filter}
+    ORDER BY started_at
+"""
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Linear interpolation between closest ranks (numpy's default)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def load_runs(days: int = REPORT_DAYS, job: str | None = None) -> dict:
+    """{job: {'series': {stage: {day: [seconds]}}, 'counters': [{name: value} per run],
+    'runs': n, 'errors': n}} — 'total' and 'db' are reported as stages."""
+    from src.models.readonly import connect
+
+    since = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    sql = RUNS_SQL.format(job_filter="AND job = ?" if job else "")
+    params = (since, job) if job else (since,)
+    conn = connect()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    jobs = {}
+    for name, day, duration, db_seconds, stages, counters, status in rows:
+        entry = jobs.setdefault(name, {'series': {}, 'counters': [], 'runs': 0, 'errors': 0})
+        entry['runs'] += 1
+        entry['errors'] += status != 'ok'
+        timings = dict(json.loads(stages or '{}'), db=db_seconds or 0.0, total=duration or 0.0)
+        for stage_name, seconds in timings.items():
+            entry['series'].setdefault(stage_name, {}).setdefault(day, []).append(seconds)
+        entry['counters'].append(json.loads(counters or '{}'))
+    return jobs
+
+
+def _stage_order(name: str):
+    fixed = (*STAGES, '', 'db', 'total')       # Job-specific stages go in the gap
+    return (fixed.index(name), name) if name in fixed else (len(STAGES), name)
+
+
+def print_report(jobs: dict, days: int):
+    if not jobs:
+        print(f"📭 Aucune exécution enregistrée sur {days} jours.")
+        return
+    for job, entry in sorted(jobs.items()):
+        day_list = sorted({d for series in entry['series'].values() for d in series})
+        print(f"\n📊 {job} — {entry['runs']} exécutions, {entry['errors']} en échec "
+              f"(p50/p95 en secondes, {days} derniers jours)")
+        print(f"  {'stage':<10}" + "".join(f"{d[5:]:>15}" for d in day_list) + f"{'global':>15}")
+        for stage_name in sorted(entry['series'], key=_stage_order):
+            series = entry['series'][stage_name]
+            cells = []
+            for d in day_list:
+                values = series.get(d)
+                cells.append(f"{percentile(values, 0.5):.2f}/{percentile(values, 0.95):.2f}" if values else "-")
+            every = [v for values in series.values() for v in values]
+            cells.append(f"{percentile(every, 0.5):.2f}/{percentile(every, 0.95):.2f}")
+            print(f"  {stage_name:<10}" + "".join(f"{c:>15}" for c in cells))
+        names = sorted({name for run in entry['counters'] for name in run})
+        if names:
+            # A counter missing from a run means nothing happened: it counts as 0.
+            medians = ", ".join(f"{name} {percentile([run.get(name, 0) for run in entry['counters']], 0.5):g}"
+                                for name in names)
+            print(f"  compteurs (médiane par exécution) : {medians}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage p50/p95 of recorded job runs")
+    parser.add_argument("--job", help="only this job (google, reddit, radar...)")
+    parser.add_argument("--days", type=int, default=REPORT_DAYS, help=f"history shown (default {REPORT_DAYS})")
+    args = parser.parse_args()
+    print_report(load_runs(args.days, args.job), args.days)
+
+
+if __name__ == "__main__":
+    main()
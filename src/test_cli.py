@@ -0,0 +1,19 @@
+import pytest
+
+from src.__main__ import build_parser, cmd_collect
+
+
+def test_collect_without_sources_runs_all():
+    args = build_parser().parse_args(["collect"])
+    assert args.func is cmd_collect
+    assert args.sources == []
+
+
+def test_collect_picks_sources():
+    assert build_parser().parse_args(["collect", "reddit", "google"]).sources == ["reddit", "google"]
+
+
+def test_collect_rejects_unknown_source(capsys):
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(["collect", "youtube"])
+    assert "invalid choice: 'youtube'" in capsys.readouterr().err